@@ -1,7 +1,13 @@
 from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
 from sqlalchemy.orm import Session
 from app.database import get_db
-from app.task_queue import get_queue
+from app.services.circuit_breaker import get_all_circuit_breakers
+from app.services.metrics import queue_stats, render_prometheus
+from app.workers.supervisor import live_supervisors
+from app.task_queue import redis_conn
+from rq import Worker
+from app.constants.constants import CircuitState
 from datetime import datetime
 
 router = APIRouter()
@@ -42,11 +48,12 @@ def detailed_health_check(db: Session = Depends(get_db)):
     
     # Check Redis queue
     try:
-        queue = get_queue()
-        job_count = len(queue)
+        classes = queue_stats()
+        job_count = sum(stats["depth"] for stats in classes.values())
         health_status["components"]["queue"] = {
             "status": "healthy",
-            "message": f"Queue operational with {job_count} jobs"
+            "message": f"Queue operational with {job_count} jobs",
+            "classes": {priority: {k: v for k, v in stats.items() if k != "wait_histogram"} for priority, stats in classes.items()}
         }
     except Exception as e:
         health_status["status"] = "degraded"
@@ -55,4 +62,38 @@ def detailed_health_check(db: Session = Depends(get_db)):
             "message": f"Queue error: {str(e)}"
         }
     
-    return health_status 
\ No newline at end of file
+    # Check workers and the supervisors running worker pools
+    try:
+        supervisors = live_supervisors()
+        worker_count = Worker.count(connection=redis_conn)
+        health_status["components"]["workers"] = {
+            "status": "healthy" if worker_count else "degraded",
+            "message": f"{worker_count} workers, {len(supervisors)} supervisors",
+            "supervisors": supervisors
+        }
+        if not worker_count and health_status["status"] == "healthy":
+            health_status["status"] = "degraded"
+    except Exception as e:
+        health_status["components"]["workers"] = {
+            "status": "unhealthy",
+            "message": f"Worker registry error: {str(e)}"
+        }
+    
+    # Check LLM provider circuit breakers
+    providers = {name: breaker.snapshot() for name, breaker in get_all_circuit_breakers().items()}
+    open_circuits = [name for name, state in providers.items() if state["state"] == CircuitState.OPEN.value]
+    health_status["components"]["llm_providers"] = {
+        "status": "degraded" if open_circuits else "healthy",
+        "message": f"Open circuits: {', '.join(open_circuits)}" if open_circuits else "All provider circuits closed",
+        "providers": providers
+    }
+    if open_circuits and health_status["status"] == "healthy":
+        health_status["status"] = "degraded"
+    
+    return health_status
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Queue depth and wait time per priority class, in the Prometheus text format"""
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
@@ -1,16 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks, UploadFile, File, Form, Header, Response
+from fastapi.responses import HTMLResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional, Dict, Any
 from app.database import get_db
+from app.task_queue import normalize_tenant
 from app.schemas.presentation_schema import (
     PresentationCreate, 
     PresentationResponse, 
     PresentationUpdate,
     PresentationStyleConfig,
-    PresentationListResponse
+    PresentationListResponse,
+    PresentationThumbnailResponse,
+    PresentationSearchResult,
+    SlideUpdate,
+    SlideRegenerateRequest,
+    SlideRegenerateResponse
 )
 from app.orchestrator.presentation_orchestrator import PresentationOrchestrator
 from app.services.pptx_creator import PPTXCreator
+from app.services.html_renderer import HTMLPreviewRenderer
+from app.services.thumbnail_renderer import ThumbnailRenderer
+from app.services.storage import get_storage
+from app.utils.theme_resolver import ThemeResolver
+from app.utils.auto_layout import AutoLayout
 from app.models.presentation import Presentation
 from app.constants.constants import (
     PresentationStatus,
@@ -18,17 +30,50 @@ from app.constants.constants import (
     ErrorMessages,
     SuccessMessages,
     PPTXConstants,
-    FilePaths
+    FilePaths,
+    Defaults,
+    IngestionConstants,
+    StorageConstants,
+    ThumbnailConstants,
+    ResponseCacheConstants,
+    SlideStoreConstants,
+    SearchConstants
 )
+from app.services.document_ingestor import UploadTooLargeError
+from app.services.idempotency import IdempotencyKeyReusedError, RequestInProgressError
+from app.services.admission import OverloadedError
+from app.services.response_cache import PresentationCache, presentation_etag, etag_matches
+from app.api.responses import FastJSONResponse, dumps, select_fields, project
+from app.services.slide_store import get_slides, replace_slides
+from app.services.search_index import SearchIndex
 import os
 from datetime import datetime
 
 router = APIRouter()
 
+_ALL_FIELDS = list(PresentationResponse.model_fields)
+
+
+def get_tenant(x_tenant_id: Optional[str] = Header(None, description="Tenant key for fair scheduling of queued jobs")) -> str:
+    try:
+        return normalize_tenant(x_tenant_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _selected_fields(fields: Optional[str], model) -> Optional[List[str]]:
+    try:
+        return select_fields(fields, model)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 
 @router.post(APIRoutes.PRESENTATIONS, response_model=PresentationResponse)
 def create_presentation(
     presentation: PresentationCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, description="Retries with the same key return the same presentation"),
+    tenant: str = Depends(get_tenant),
     db: Session = Depends(get_db)
 ):
     """
@@ -36,35 +81,290 @@ def create_presentation(
     
     The content will be used by an LLM to generate structured slide data,
     which will then be rendered using preset slide templates.
+    
+    Send an Idempotency-Key header to make retries safe: repeated and
+    concurrent requests with the same key return the first request's
+    presentation (marked with an Idempotent-Replayed header) instead of
+    queuing another generation job.
+    
+    Jobs are queued as interactive unless a lower priority is requested or
+    the tenant (X-Tenant-ID) already has a large backlog, in which case they
+    go to the bulk class.
+    
+    Under load, admission control either generates the deck in fast mode
+    (fewer slides, no speaker notes; marked with a Generation-Mode header)
+    or refuses the request with 429 and a Retry-After header.
+    """
+    orchestrator = PresentationOrchestrator(db, tenant)
+    try:
+        created = orchestrator.create_presentation(presentation, idempotency_key)
+    except OverloadedError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except IdempotencyKeyReusedError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except RequestInProgressError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    _set_creation_headers(response, orchestrator)
+    return created
+
+
+def _set_creation_headers(response: Response, orchestrator: PresentationOrchestrator):
+    if orchestrator.last_replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    if orchestrator.last_admission and orchestrator.last_admission.fast:
+        response.headers["Generation-Mode"] = "fast"
+
+
+@router.post(APIRoutes.PRESENTATION_UPLOAD, response_model=PresentationResponse)
+def create_presentation_from_document(
+    response: Response,
+    file: UploadFile = File(..., description="Plain text or Markdown source document"),
+    topic: str = Form(...),
+    num_slides: int = Form(Defaults.DEFAULT_NUM_SLIDES, ge=Defaults.MIN_SLIDES, le=Defaults.MAX_BULK_SLIDES),
+    idempotency_key: Optional[str] = Header(None, description="Retries with the same key return the same presentation"),
+    tenant: str = Depends(get_tenant),
+    db: Session = Depends(get_db)
+):
+    """
+    Create a presentation from a long source document.
+    
+    The upload is streamed to disk, split into token-bounded chunks that are
+    summarized in parallel by the worker, and the combined summary is used to
+    generate the slides. Progress is reported in the job's metadata.
+    
+    Idempotency-Key and admission control work as for JSON requests; a
+    repeated upload of the same document is recognized by its hash.
+    """
+    filename = (file.filename or "").lower()
+    if not filename.endswith(IngestionConstants.ALLOWED_EXTENSIONS):
+        raise HTTPException(status_code=415, detail=ErrorMessages.UNSUPPORTED_UPLOAD)
+    
+    orchestrator = PresentationOrchestrator(db, tenant)
+    try:
+        created = orchestrator.create_presentation_from_document(topic, num_slides, file.file, idempotency_key)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except OverloadedError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except IdempotencyKeyReusedError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except RequestInProgressError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    _set_creation_headers(response, orchestrator)
+    return created
+
+
+# Declared before PRESENTATION_BY_ID so "thumbnails" is not taken for an id
+@router.get(APIRoutes.PRESENTATION_THUMBNAILS, response_model=List[PresentationThumbnailResponse])
+def list_presentation_thumbnails(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    inline: bool = Query(False, description="Embed each deck's title-slide SVG in the response"),
+    db: Session = Depends(get_db)
+):
+    """
+    List decks with their thumbnails.
+    
+    Only the id, topic, status and timestamp columns are loaded and thumbnails
+    come from the pre-rendered SVG files, so no .pptx is opened.
+    """
+    orchestrator = PresentationOrchestrator(db)
+    storage = get_storage()
+    listing = []
+    for presentation in orchestrator.get_thumbnail_listing(skip=skip, limit=limit):
+        slide_count = ThumbnailRenderer.slide_count(presentation.id, storage)
+        item = {
+            "id": presentation.id,
+            "topic": presentation.topic,
+            "status": presentation.status,
+            "slide_count": slide_count,
+            "updated_at": presentation.updated_at
+        }
+        if slide_count:
+            # The version parameter changes whenever the deck is re-rendered
+            version = int(presentation.updated_at.timestamp()) if presentation.updated_at else 0
+            path = APIRoutes.PRESENTATION_SLIDE_THUMBNAIL.format(presentation_id=presentation.id, slide_index=0)
+            item["thumbnail_url"] = f"{APIRoutes.API_PREFIX}{path}?v={version}"
+            if inline:
+                item["svg"] = storage.read_bytes(ThumbnailRenderer.thumbnail_key(presentation.id, 0)).decode("utf-8")
+        listing.append(item)
+    return listing
+
+
+@router.get(APIRoutes.PRESENTATION_SEARCH, response_model=List[PresentationSearchResult])
+def search_presentations(
+    q: str = Query(..., min_length=1, max_length=SearchConstants.MAX_QUERY_LENGTH),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=SearchConstants.MAX_PAGE_SIZE),
+    db: Session = Depends(get_db)
+):
+    """
+    Search decks by topic, generated slide titles and bullets, and source content.
+    
+    Results are ranked by relevance, with matches in the topic counting most
+    and matches in the source content least. Decks are searchable once their
+    slides have been generated.
     """
+    matches = SearchIndex(db).search(q, skip=skip, limit=limit)
+    if not matches:
+        return []
+    fields = [name for name in PresentationSearchResult.model_fields if name != "score"]
     orchestrator = PresentationOrchestrator(db)
-    return orchestrator.create_presentation(presentation)
+    rows = orchestrator.get_presentations([presentation_id for presentation_id, _ in matches], fields)
+    by_id = {row.id: row for row in rows}
+    return FastJSONResponse([
+        {**project(by_id[presentation_id], fields), "score": score}
+        for presentation_id, score in matches if presentation_id in by_id
+    ])
+
+
+@router.get(APIRoutes.PRESENTATION_SLIDE_THUMBNAIL)
+def get_slide_thumbnail(presentation_id: str, slide_index: int):
+    """Serve the SVG thumbnail of one slide; index 0 is the deck thumbnail"""
+    storage = get_storage()
+    key = ThumbnailRenderer.thumbnail_key(presentation_id, slide_index)
+    if slide_index < 0 or not storage.exists(key):
+        raise HTTPException(status_code=404, detail=ErrorMessages.THUMBNAIL_NOT_FOUND)
+    
+    return Response(
+        content=storage.read_bytes(key),
+        media_type=ThumbnailConstants.MEDIA_TYPE,
+        headers={"Cache-Control": ThumbnailConstants.CACHE_CONTROL}
+    )
 
 
 @router.get(APIRoutes.PRESENTATION_BY_ID, response_model=PresentationResponse)
 def get_presentation(
     presentation_id: str,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,status,updated_at"),
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
-    """Get a presentation by ID"""
+    """
+    Get a presentation by ID.
+    
+    The response carries a weak ETag built from the presentation's status and
+    update time, so a poll with If-None-Match gets a 304 after a single-row
+    lookup of those columns. Finished presentations are served from a short
+    TTL cache of the serialized response without touching the database.
+    With fields, only the selected columns are loaded and returned.
+    """
+    selected = _selected_fields(fields, PresentationResponse)
+    cache = PresentationCache()
+    cached = None if selected else cache.get(presentation_id)
+    if cached:
+        etag, body = cached
+    else:
+        # Taken before the row is read, so a change committed after the read stops the cache write
+        generation = cache.generation(presentation_id)
+        orchestrator = PresentationOrchestrator(db)
+        version = orchestrator.get_presentation_version(presentation_id)
+        if not version:
+            raise HTTPException(status_code=404, detail=ErrorMessages.PRESENTATION_NOT_FOUND)
+        etag = presentation_etag(version.id, version.updated_at, version.status, selected)
+        body = None
+    
+    headers = {"ETag": etag, "Cache-Control": ResponseCacheConstants.CACHE_CONTROL}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    
+    if body is None:
+        # Fills in the remaining columns of the row loaded above
+        presentation = orchestrator.get_presentation(presentation_id, selected or _ALL_FIELDS)
+        if not presentation:
+            raise HTTPException(status_code=404, detail=ErrorMessages.PRESENTATION_NOT_FOUND)
+        body = dumps(project(presentation, selected or _ALL_FIELDS))
+        if not selected and PresentationStatus(version.status).value in ResponseCacheConstants.CACHEABLE_STATUSES:
+            cache.put(presentation_id, etag, body, generation)
+    
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@router.get(APIRoutes.PRESENTATION_PREVIEW, response_class=HTMLResponse)
+def preview_presentation(
+    presentation_id: str,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Render a lightweight HTML preview of a presentation.
+    
+    The preview is built straight from slides_data with the same theme colors
+    and fonts as the PowerPoint file, so no .pptx render or download is needed.
+    """
     orchestrator = PresentationOrchestrator(db)
     presentation = orchestrator.get_presentation(presentation_id)
     
     if not presentation:
         raise HTTPException(status_code=404, detail=ErrorMessages.PRESENTATION_NOT_FOUND)
+    if not presentation.slides_data:
+        raise HTTPException(status_code=400, detail=ErrorMessages.PREVIEW_UNAVAILABLE)
     
-    return presentation
+    html, digest = HTMLPreviewRenderer().render(
+        presentation.slides_data,
+        presentation.topic,
+        ThemeResolver.build_render_config(presentation.style_config)
+    )
+    etag = f'"{digest}"'
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return HTMLResponse(content=html, headers={"ETag": etag})
+
+
+@router.get(APIRoutes.PRESENTATION_DOWNLOAD)
+def download_presentation(
+    presentation_id: str,
+    db: Session = Depends(get_db)
+):
+    """
+    Download the .pptx file.
+    
+    The file is streamed from the storage backend in fixed-size chunks, so
+    any API node can serve it and no deck is held in memory.
+    """
+    orchestrator = PresentationOrchestrator(db)
+    presentation = orchestrator.get_presentation(presentation_id)
+    
+    if not presentation:
+        raise HTTPException(status_code=404, detail=ErrorMessages.PRESENTATION_NOT_FOUND)
+    storage = get_storage()
+    if not presentation.file_path or not storage.exists(presentation.file_path):
+        raise HTTPException(status_code=404, detail=ErrorMessages.FILE_NOT_FOUND)
+    
+    filename = os.path.basename(presentation.file_path)
+    return StreamingResponse(
+        storage.iter_chunks(presentation.file_path),
+        media_type=StorageConstants.MEDIA_TYPE,
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "Content-Length": str(storage.size(presentation.file_path))
+        }
+    )
 
 
 @router.get(APIRoutes.PRESENTATIONS, response_model=List[PresentationListResponse])
 def list_presentations(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,topic,status"),
     db: Session = Depends(get_db)
 ):
-    """List all presentations with pagination"""
+    """
+    List all presentations with pagination.
+    
+    Only the columns in fields (by default those of the list schema) are
+    loaded, and rows are encoded straight to JSON without model validation.
+    """
+    selected = _selected_fields(fields, PresentationListResponse) or list(PresentationListResponse.model_fields)
     orchestrator = PresentationOrchestrator(db)
-    return orchestrator.get_all_presentations(skip=skip, limit=limit)
+    presentations = orchestrator.get_all_presentations(skip=skip, limit=limit, fields=selected)
+    return FastJSONResponse([project(presentation, selected) for presentation in presentations])
 
 
 @router.put(APIRoutes.PRESENTATION_BY_ID, response_model=PresentationResponse)
@@ -83,6 +383,92 @@ def update_presentation(
     return presentation
 
 
+@router.get(APIRoutes.PRESENTATION_SLIDES, response_model=List[Dict[str, Any]])
+def list_slides(
+    presentation_id: str,
+    start: int = Query(0, ge=0),
+    count: int = Query(SlideStoreConstants.MAX_PAGE_SIZE, ge=1, le=SlideStoreConstants.MAX_PAGE_SIZE),
+    db: Session = Depends(get_db)
+):
+    """Get a range of a presentation's slides from the slides table, without loading the deck"""
+    slides = get_slides(db, presentation_id, start, count)
+    if slides is None:
+        raise HTTPException(status_code=404, detail=ErrorMessages.PRESENTATION_NOT_FOUND)
+    return slides
+
+
+@router.get(APIRoutes.PRESENTATION_SLIDE, response_model=Dict[str, Any])
+def get_slide(
+    presentation_id: str,
+    slide_index: int,
+    db: Session = Depends(get_db)
+):
+    """Get a single slide"""
+    slides = get_slides(db, presentation_id, slide_index, 1) if slide_index >= 0 else []
+    if slides is None:
+        raise HTTPException(status_code=404, detail=ErrorMessages.PRESENTATION_NOT_FOUND)
+    if not slides:
+        raise HTTPException(status_code=404, detail=ErrorMessages.SLIDE_NOT_FOUND)
+    return slides[0]
+
+
+@router.patch(APIRoutes.PRESENTATION_SLIDE, response_model=PresentationResponse)
+def update_slide(
+    presentation_id: str,
+    slide_index: int,
+    slide_update: SlideUpdate,
+    db: Session = Depends(get_db)
+):
+    """
+    Edit a single slide.
+    
+    Only the changed slide's XML and notes parts are rewritten in the stored
+    .pptx; the rest of the package is copied through. Edits that change the
+    slide's layout fall back to a full re-render.
+    """
+    orchestrator = PresentationOrchestrator(db)
+    presentation = orchestrator.get_presentation(presentation_id)
+    
+    if not presentation:
+        raise HTTPException(status_code=404, detail=ErrorMessages.PRESENTATION_NOT_FOUND)
+    if not presentation.slides_data:
+        raise HTTPException(status_code=400, detail=ErrorMessages.SLIDES_UNAVAILABLE)
+    if not 0 <= slide_index < len(presentation.slides_data):
+        raise HTTPException(status_code=404, detail=ErrorMessages.SLIDE_NOT_FOUND)
+    
+    return orchestrator.update_slide(presentation, slide_index, slide_update)
+
+
+@router.post(APIRoutes.PRESENTATION_SLIDE_REGENERATE, response_model=SlideRegenerateResponse)
+def regenerate_slide(
+    presentation_id: str,
+    slide_index: int,
+    request: Optional[SlideRegenerateRequest] = None,
+    tenant: str = Depends(get_tenant),
+    db: Session = Depends(get_db)
+):
+    """
+    Regenerate a single slide with the LLM.
+    
+    The worker sends a small prompt with the deck title and the neighboring
+    slides' titles, validates the result and merges it back through the
+    partial-render path.
+    """
+    orchestrator = PresentationOrchestrator(db, tenant)
+    presentation = orchestrator.get_presentation(presentation_id)
+    
+    if not presentation:
+        raise HTTPException(status_code=404, detail=ErrorMessages.PRESENTATION_NOT_FOUND)
+    if not presentation.slides_data:
+        raise HTTPException(status_code=400, detail=ErrorMessages.SLIDES_UNAVAILABLE)
+    if not 0 <= slide_index < len(presentation.slides_data):
+        raise HTTPException(status_code=404, detail=ErrorMessages.SLIDE_NOT_FOUND)
+    
+    instructions = request.instructions if request else None
+    job_id = orchestrator.regenerate_slide(presentation, slide_index, instructions)
+    return {"presentation_id": presentation.id, "slide_index": slide_index, "job_id": job_id}
+
+
 @router.post(APIRoutes.PRESENTATION_STYLE, response_model=PresentationResponse)
 def configure_presentation_style(
     presentation_id: str,
@@ -120,44 +506,45 @@ def configure_presentation_style(
     presentation.style_config = new_style_config
     
     # Create complete config for PPTXCreator
-    pptx_config = {
-        "theme": new_style_config.get("theme", PPTXConstants.DEFAULT_THEME),
-        "font": new_style_config.get("font", PPTXConstants.DEFAULT_FONT),
-        "background_color": new_style_config.get("background_color", PPTXConstants.DEFAULT_BACKGROUND_COLOR),
-        "aspect_ratio": PPTXConstants.DEFAULT_ASPECT_RATIO
-    }
-    
-    # Add custom colors if specified
-    if "title_color" in new_style_config:
-        pptx_config["title_color"] = new_style_config["title_color"]
-    if "content_color" in new_style_config:
-        pptx_config["content_color"] = new_style_config["content_color"]
-    if "accent_color" in new_style_config:
-        pptx_config["accent_color"] = new_style_config["accent_color"]
+    pptx_config = ThemeResolver.build_render_config(new_style_config)
     
     print(f"PPTXCreator config: {pptx_config}")
     
     # Regenerate the presentation with new styling
     try:
-        pptx_creator = PPTXCreator()
+        # Refit the text in the new font; splitting would renumber the slides
+        slides_data = AutoLayout(pptx_config["font"]).fit(presentation.slides_data, allow_split=False)
+        presentation.slides_data = slides_data
+        replace_slides(db, presentation.id, slides_data)
         
-        # Delete old file if exists
-        if presentation.file_path and os.path.exists(presentation.file_path):
-            os.remove(presentation.file_path)
+        pptx_creator = PPTXCreator()
         
-        # Generate new presentation with updated styling
+        # Generate new presentation with updated styling; the deck's own file is replaced atomically
         new_file_path = pptx_creator.create_presentation(
-            slides_data=presentation.slides_data,
+            slides_data=slides_data,
             topic=presentation.topic,
-            config=pptx_config
+            config=pptx_config,
+            presentation_id=presentation.id
         )
         
+        # Delete old file if it was stored under another key; decks keyed by topic alone may share it
+        old_file_path = presentation.file_path
+        if old_file_path and old_file_path != new_file_path and not (
+            db.query(Presentation.id)
+            .filter(Presentation.file_path == old_file_path, Presentation.id != presentation.id)
+            .first()
+        ):
+            get_storage().delete(old_file_path)
+        
+        ThumbnailRenderer().write_thumbnails(presentation.id, slides_data, pptx_config)
+        
         # Update presentation record
         presentation.file_path = new_file_path
         presentation.updated_at = datetime.utcnow()
         
         # Commit the changes to the database
         db.commit()
+        PresentationCache().invalidate(presentation.id)
         
         # Refresh to verify the changes were saved
         db.refresh(presentation)
@@ -175,12 +562,35 @@ def configure_presentation_style(
     return presentation
 
 
+@router.post(APIRoutes.PRESENTATION_CANCEL, response_model=PresentationResponse)
+def cancel_presentation(
+    presentation_id: str,
+    db: Session = Depends(get_db)
+):
+    """
+    Cancel a presentation's queued and running jobs.
+    
+    Queued jobs are dropped before they start. Running jobs stop at their
+    next check (between stages, per rendered slide, and while waiting on a
+    provider) and the presentation's status becomes cancelled.
+    """
+    orchestrator = PresentationOrchestrator(db)
+    presentation = orchestrator.get_presentation(presentation_id)
+    
+    if not presentation:
+        raise HTTPException(status_code=404, detail=ErrorMessages.PRESENTATION_NOT_FOUND)
+    if not orchestrator.cancel_presentation(presentation):
+        raise HTTPException(status_code=409, detail=ErrorMessages.NOTHING_TO_CANCEL)
+    
+    return presentation
+
+
 @router.delete(APIRoutes.PRESENTATION_BY_ID)
 def delete_presentation(
     presentation_id: str,
     db: Session = Depends(get_db)
 ):
-    """Delete a presentation"""
+    """Delete a presentation, cancelling any of its jobs that are still queued or running"""
     orchestrator = PresentationOrchestrator(db)
     deleted = orchestrator.delete_presentation(presentation_id)
     
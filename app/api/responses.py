@@ -0,0 +1,60 @@
+import json
+import os
+from typing import Any, Dict, List, Optional, Sequence, Type
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from starlette.middleware.gzip import GZipMiddleware
+from app.constants.constants import ResponseEncodingConstants, ErrorMessages
+
+try:
+    import orjson
+    from fastapi.responses import ORJSONResponse as FastJSONResponse
+except ImportError:  # orjson only makes encoding faster
+    orjson = None
+    FastJSONResponse = JSONResponse
+
+GZIP_MIN_BYTES = int(os.getenv("GZIP_MIN_BYTES", ResponseEncodingConstants.GZIP_MIN_BYTES))
+
+
+def dumps(content: Any) -> bytes:
+    """Encode rows of plain values, datetimes and enums as JSON, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(jsonable_encoder(content), separators=(",", ":")).encode("utf-8")
+
+
+def select_fields(fields: Optional[str], model: Type[BaseModel]) -> Optional[List[str]]:
+    """
+    Parse a comma-separated fields= parameter against a response model.
+    Returns None when no fields were asked for; the required fields are
+    always part of a selection. Unknown names raise ValueError.
+    """
+    if not fields:
+        return None
+    requested = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in requested if name not in model.model_fields]
+    if unknown:
+        raise ValueError(f"{ErrorMessages.UNKNOWN_FIELDS}: {', '.join(unknown)}")
+    selected = list(ResponseEncodingConstants.REQUIRED_FIELDS)
+    selected += [name for name in model.model_fields if name in requested and name not in selected]
+    return selected
+
+
+def project(row: Any, fields: Sequence[str]) -> Dict[str, Any]:
+    """The selected attributes of an ORM row, in response-model order"""
+    return {name: getattr(row, name) for name in fields}
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """Gzip for responses above GZIP_MIN_BYTES, except downloads that are compressed already"""
+
+    def __init__(self, app, minimum_size: int = GZIP_MIN_BYTES,
+                 compresslevel: int = ResponseEncodingConstants.GZIP_LEVEL):
+        super().__init__(app, minimum_size=minimum_size, compresslevel=compresslevel)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].endswith(ResponseEncodingConstants.UNCOMPRESSED_PATH_SUFFIXES):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
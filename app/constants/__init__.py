@@ -3,12 +3,31 @@ from app.constants.constants import (
     PresentationTheme,
     SlideLayoutType,
     LLMProvider,
+    CircuitState,
+    JobPriority,
     DEFAULT_STYLES,
     FilePaths,
+    StorageConstants,
+    SweeperConstants,
+    ThumbnailConstants,
     APIRoutes,
     ErrorMessages,
     PPTXConstants,
     LLMConstants,
+    CircuitBreakerConstants,
+    AutoLayoutConstants,
+    IngestionConstants,
+    IdempotencyConstants,
+    SchedulingConstants,
+    AdmissionConstants,
+    CancellationConstants,
+    SupervisorConstants,
+    WorkerResourceConstants,
+    ResponseCacheConstants,
+    ResponseEncodingConstants,
+    SlideStoreConstants,
+    SearchConstants,
+    ProviderRoutingConstants,
     SuccessMessages,
     Defaults
 )
@@ -18,12 +37,31 @@ __all__ = [
     "PresentationTheme",
     "SlideLayoutType",
     "LLMProvider",
+    "CircuitState",
+    "JobPriority",
     "DEFAULT_STYLES",
     "FilePaths",
+    "StorageConstants",
+    "SweeperConstants",
+    "ThumbnailConstants",
     "APIRoutes",
     "ErrorMessages",
     "PPTXConstants",
     "LLMConstants",
+    "CircuitBreakerConstants",
+    "AutoLayoutConstants",
+    "IngestionConstants",
+    "IdempotencyConstants",
+    "SchedulingConstants",
+    "AdmissionConstants",
+    "CancellationConstants",
+    "SupervisorConstants",
+    "WorkerResourceConstants",
+    "ResponseCacheConstants",
+    "ResponseEncodingConstants",
+    "SlideStoreConstants",
+    "SearchConstants",
+    "ProviderRoutingConstants",
     "SuccessMessages",
     "Defaults"
 ] 
\ No newline at end of file
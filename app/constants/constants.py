@@ -7,6 +7,7 @@ class PresentationStatus(str, Enum):
     PROCESSING = "processing"
     COMPLETED = "completed"
     FAILED = "failed"
+    CANCELLED = "cancelled"
 
 # Presentation Theme Constants
 class PresentationTheme(str, Enum):
@@ -34,6 +35,18 @@ class LLMProvider(str, Enum):
     OLLAMA = "ollama"
     TEMPLATE = "template"
 
+# Circuit Breaker States
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+# Job priority classes, highest first
+class JobPriority(str, Enum):
+    INTERACTIVE = "interactive"
+    STANDARD = "standard"
+    BULK = "bulk"
+
 # Default Style Configurations
 DEFAULT_STYLES: Dict[str, Dict[str, Any]] = {
     "professional": {
@@ -90,6 +103,10 @@ class PPTXConstants:
     
     # Default values
     DEFAULT_ASPECT_RATIO = "16:9"
+    STREAMING_SLIDE_THRESHOLD = 50  # decks larger than this are written slide by slide
+    FAST_RENDER = True  # built-in layouts are written from XML templates
+    COMPRESSION = "deflate"  # "store" or "deflate" for the finished .pptx
+    COMPRESSION_LEVEL = 6  # zlib level used with "deflate"
     DEFAULT_FONT = "Calibri"
     DEFAULT_BACKGROUND_COLOR = "#FFFFFF"
     DEFAULT_THEME = "professional"
@@ -123,18 +140,332 @@ class LLMConstants:
     OLLAMA_DEFAULT_MODEL = "mistral"
     OLLAMA_BASE_URL = "http://localhost:11434"
     
+    # Provider HTTP timeouts; the read timeout applies to each streamed chunk
+    CONNECT_TIMEOUT_SECONDS = 10.0
+    READ_TIMEOUT_SECONDS = 30.0
+    
     # Prompt construction
     SYSTEM_PROMPT = "You are a presentation expert. Output ONLY valid JSON. No markdown, no explanation, just the JSON array."
     SLIDE_TYPES_INSTRUCTION = "slide_type: string (one of: \"title\", \"bullet_points\", \"two_column\", \"content_with_image\")"
     
+    CONTINUATION_PROMPT = "Your previous answer was cut off. Continue the JSON exactly where it stopped. Do not repeat anything already written."
+    
+    # Token budgets (context window per model; prompt + completion must fit)
+    MODEL_CONTEXT_TOKENS = {
+        "gpt-3.5-turbo": 4096,
+        "gpt-3.5-turbo-16k": 16384,
+        "gpt-4": 8192,
+        "gpt-4o": 128000,
+        "gpt-4o-mini": 128000,
+        "mistral": 8192,
+        "llama2": 4096,
+        "mistralai/Mixtral-8x7B-Instruct-v0.1": 32768,
+        "mistralai/Mistral-7B-Instruct-v0.2": 32768
+    }
+    DEFAULT_CONTEXT_TOKENS = 4096
+    MAX_COMPLETION_TOKENS = 4096
+    MIN_COMPLETION_TOKENS = 256
+    PROMPT_SAFETY_MARGIN_TOKENS = 64
+    MAX_CONTINUATIONS = 2
+    
+    # Expected completion tokens per slide field, used to size max_tokens
+    SLIDE_FIELD_TOKENS = {
+        "title": 16,
+        "slide_type": 8,
+        "content": 90,
+        "notes": 45,
+        "reference": 16
+    }
+    SLIDE_OVERHEAD_TOKENS = 12
+    COMPLETION_HEADROOM = 1.2
+    # Larger decks are generated in sections of at most this many slides, one call each
+    SLIDES_PER_CALL = 20
+    SECTION_OUTLINE_TOKENS = 1500  # titles of the slides so far sent with each later section
+    MAX_REFERENCES = 12  # sources listed on a sectioned deck's References slide
+    
+    # Summarization (long-document ingestion)
+    SUMMARY_SYSTEM_PROMPT = "You summarize source material for presentation authors. Output plain text only."
+    
+    # Single-slide regeneration
+    SLIDE_SYSTEM_PROMPT = "You are a presentation expert. Output ONLY one valid JSON object for a single slide. No markdown, no explanation."
+    SLIDE_CONTEXT_TOKENS = 400  # excerpt of the deck content sent as context
+    NEIGHBOR_SLIDES = 2  # titles of this many slides on each side
+    SLIDE_JOB_TIMEOUT = "5m"
+    
     # Formatting
     TITLE_SLIDE_TYPE = "title"
     REFERENCES_TITLE = "References"
     BULLET_POINTS_TYPE = "bullet_points"
 
+# Auto-layout (text fitting before rendering)
+class AutoLayoutConstants:
+    MIN_FONT_SIZE = 14
+    FONT_SIZE_STEP = 2
+    MAX_BULLETS = 8  # readability cap before anything is measured
+    TWO_COLUMN_MIN_BULLETS = 4
+    LINE_SPACING = 1.2  # line height as a multiple of the font size
+    PARAGRAPH_SPACING = 0.2  # space before each paragraph (template spcBef 20%)
+    TEXT_INSET_X = 0.1  # in inches, per side
+    TEXT_INSET_Y = 0.05  # in inches, per side
+    BULLET_INDENT = 0.375  # in inches (template marL)
+    CONTINUATION_SUFFIX = " (cont.)"
+
+# Circuit breaker defaults (overridable via CIRCUIT_* environment variables)
+class CircuitBreakerConstants:
+    REDIS_KEY_PREFIX = "llm:circuit"
+    HEALTH_KEY_PREFIX = "llm:health"
+    
+    # Trip thresholds
+    CONSECUTIVE_FAILURE_THRESHOLD = 3
+    FAILURE_RATE_THRESHOLD = 0.5
+    SLOW_CALL_RATE_THRESHOLD = 0.5
+    SLOW_CALL_SECONDS = 20.0  # below LLMConstants.READ_TIMEOUT_SECONDS, so slow providers trip before they time out
+    MIN_CALLS_IN_WINDOW = 4
+    WINDOW_SECONDS = 60
+    
+    # Backoff while open
+    BASE_BACKOFF_SECONDS = 5.0
+    MAX_BACKOFF_SECONDS = 300.0
+    BACKOFF_JITTER = 0.2  # +/- 20%
+    
+    # TTLs
+    HEALTH_TTL_SECONDS = 30
+    HALF_OPEN_PROBE_TTL_SECONDS = 120
+    STATE_TTL_SECONDS = 3600
+
+# Priority queues and per-tenant fair scheduling
+class SchedulingConstants:
+    QUEUE_NAME = "presentations"  # presentations:<priority>[:<tenant>]
+    DEFAULT_TENANT = "default"
+    TENANT_PATTERN = r"^[A-Za-z0-9_.-]{1,64}$"
+    
+    # Relative dequeue weights; a class's weight is shared by its tenants
+    PRIORITY_WEIGHTS = {
+        "interactive": 100,
+        "standard": 10,
+        "bulk": 1
+    }
+    # Tenants with more queued jobs than this are demoted to bulk
+    BULK_QUEUED_THRESHOLD = 20
+    
+    TENANTS_KEY_PREFIX = "scheduler:tenants"
+    TENANT_IDLE_SECONDS = 3600  # empty tenant queues are forgotten after this
+    REFRESH_SECONDS = 5  # how often an idle worker looks for new tenant queues
+    
+    # Exported metrics
+    METRICS_KEY_PREFIX = "metrics:queue_wait"
+    WAIT_BUCKETS_SECONDS = (1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600)
+
+# LLM provider routing by expected completion time
+class ProviderRoutingConstants:
+    ENABLED = True
+    # Per provider and model EWMAs of call latency, output throughput and errors, shared through Redis
+    STATS_KEY_PREFIX = "llm:route"
+    MODELS_KEY = "llm:route:models"
+    METRICS_KEY = "metrics:routing"
+    ALPHA = 0.2  # weight of the newest call
+    # Priors for a provider that has no measurements yet, so it gets tried
+    DEFAULT_LATENCY_SECONDS = 10.0
+    DEFAULT_TOKENS_PER_SECOND = 40.0
+    MAX_ERROR_RATE = 0.9  # caps the retry penalty of a failing provider
+    # Most preferred first; a provider must be PREFERENCE_MARGIN faster per
+    # step down this list to be picked over a more preferred one
+    PREFERENCE = "openai,huggingface,ollama"
+    PREFERENCE_MARGIN = 0.2
+    # USD per 1K completion tokens; providers above MAX_COST_PER_1K_TOKENS are not used (0 = no limit)
+    COST_PER_1K_TOKENS = {"openai": 0.0006, "huggingface": 0.0, "ollama": 0.0}
+    MAX_COST_PER_1K_TOKENS = 0.0
+    # Share of jobs sent to a random other provider to keep its measurements current
+    EXPLORE_RATE = 0.05
+
+# Admission control on the create endpoint
+class AdmissionConstants:
+    ENABLED = True
+    # Estimated wait before a new job starts (its queue's drain time or oldest job's age)
+    DEGRADE_WAIT_SECONDS = 120  # above this, decks are generated in fast mode
+    REJECT_WAIT_SECONDS = 480  # above this, requests are refused; a deck must finish within its 10m job timeout
+    MAX_QUEUE_DEPTH = 500  # refuse outright beyond this many queued jobs
+    
+    # Drain rate: an EWMA of generation job durations, shared through Redis
+    JOB_SECONDS_KEY = "admission:job_seconds"
+    DEFAULT_JOB_SECONDS = 45
+    JOB_SECONDS_ALPHA = 0.2
+    
+    # Retry-After on a 429
+    MIN_RETRY_AFTER_SECONDS = 5
+    MAX_RETRY_AFTER_SECONDS = 600
+    
+    # Fast mode: fewer slides, no speaker notes, direct XML rendering
+    FAST_MAX_SLIDES = 6
+    
+    METRICS_KEY = "metrics:admission"
+
+# Worker pool supervisor
+class SupervisorConstants:
+    MIN_WORKERS = 1
+    MAX_WORKERS = 0  # 0: one per CPU core
+    INTERVAL_SECONDS = 5
+    
+    # Scale up to keep about this many queued jobs per worker, and by one
+    # more whenever the oldest queued job has waited longer than this
+    JOBS_PER_WORKER = 2
+    SCALE_UP_WAIT_SECONDS = 30
+    # Scale down one worker at a time, once fewer have been needed for this long
+    SCALE_DOWN_DELAY_SECONDS = 120
+    
+    # Headroom needed to add a worker
+    MAX_LOAD_PER_CPU = 1.0
+    WORKER_MEMORY_MB = 300
+    MIN_FREE_MEMORY_MB = 512
+    
+    # Crashed workers are restarted after 1s, 2s, 4s ... up to the max; a
+    # worker that stayed up for STABLE_SECONDS resets the backoff
+    RESTART_BASE_BACKOFF_SECONDS = 1
+    RESTART_MAX_BACKOFF_SECONDS = 60
+    STABLE_SECONDS = 60
+    
+    # Draining workers finish their current job; after this they are killed
+    DRAIN_TIMEOUT_SECONDS = 660
+    
+    REGISTRY_KEY = "supervisors"
+    HEARTBEAT_KEY_PREFIX = "supervisor"
+    HEARTBEAT_TTL_SECONDS = 30
+
+# Per-job resource accounting and memory guards in workers
+class WorkerResourceConstants:
+    # A worker whose job (or own) RSS peaked above the soft limit is
+    # recycled; a job whose RSS passes the hard limit is failed (0 disables)
+    SOFT_LIMIT_MB = 1024
+    HARD_LIMIT_MB = 2048
+    SAMPLE_SECONDS = 0.5
+    # Exit code of a worker process that stopped to be recycled (EX_TEMPFAIL)
+    RECYCLE_EXIT_CODE = 75
+    
+    # Record the largest allocation sites of each job (slows jobs down)
+    TRACEMALLOC = False
+    TRACEMALLOC_TOP = 10
+
+# Cooperative job cancellation
+class CancellationConstants:
+    REDIS_KEY_PREFIX = "cancel"  # cancel:<rq job id>
+    FLAG_TTL_SECONDS = 86400  # longer than any job waits and runs
+    POLL_SECONDS = 1.0  # how often a running job looks for its flag
+
+# Cached GET /presentations/{id} responses
+class ResponseCacheConstants:
+    KEY_PREFIX = "cache:presentation"
+    TTL_SECONDS = 60
+    GENERATION_TTL_SECONDS = 3600  # must outlast any GET that reads a deck and then caches it
+    # Only decks that no worker will touch again are cached
+    CACHEABLE_STATUSES = ("completed", "failed", "cancelled")
+    # Clients must revalidate, which is cheap with If-None-Match
+    CACHE_CONTROL = "private, no-cache"
+
+# JSON encoding and compression of API responses
+class ResponseEncodingConstants:
+    GZIP_MIN_BYTES = 1024  # smaller bodies are sent as they are
+    GZIP_LEVEL = 5
+    # Responses that are already compressed (.pptx files are zip packages)
+    UNCOMPRESSED_PATH_SUFFIXES = ("/download",)
+    # Always returned, whatever fields= selects
+    REQUIRED_FIELDS = ("id",)
+
+# Per-slide rows in the slides table
+class SlideStoreConstants:
+    # SlideData fields with their own columns; any other key goes to extra
+    TYPED_FIELDS = ("title", "slide_type", "content", "notes", "reference")
+    BACKFILL_BATCH_SIZE = 100  # presentations per backfill transaction
+    MAX_PAGE_SIZE = 100  # slides per GET /presentations/{id}/slides page
+
+# Full-text search over presentations
+class SearchConstants:
+    LANGUAGE = "english"  # Postgres text search configuration
+    # Relative weight of a match in the topic, slide titles/bullets and source content
+    TOPIC_WEIGHT = 10.0
+    SLIDES_WEIGHT = 4.0
+    CONTENT_WEIGHT = 1.0
+    MAX_CONTENT_CHARS = 100000  # of the source content indexed per deck
+    MAX_QUERY_LENGTH = 200
+    MAX_PAGE_SIZE = 100
+    REINDEX_BATCH_SIZE = 500
+
+# Idempotent creation requests
+class IdempotencyConstants:
+    REDIS_KEY_PREFIX = "idempotency"
+    KEY_TTL_SECONDS = 86400  # Idempotency-Key replays are honored for a day
+    MAX_KEY_LENGTH = 255
+    
+    # Optional dedup of identical topic/content/num_slides without a key
+    AUTO_DEDUP = False
+    AUTO_DEDUP_WINDOW_SECONDS = 300
+    
+    # How long a duplicate waits for the in-flight request to commit its row
+    SINGLE_FLIGHT_WAIT_SECONDS = 5.0
+    SINGLE_FLIGHT_POLL_SECONDS = 0.05
+
+# Long-document ingestion
+class IngestionConstants:
+    ALLOWED_EXTENSIONS = (".txt", ".md", ".markdown")
+    MAX_UPLOAD_BYTES = 50 * 1024 * 1024
+    READ_CHUNK_BYTES = 64 * 1024
+    EXCERPT_CHARS = 500
+    
+    # Map-reduce summarization
+    CHUNK_TOKENS = 1500
+    SUMMARY_TOKENS = 200
+    REDUCE_TARGET_TOKENS = 1500
+    MAX_PARALLEL = 4
+    MAX_REDUCE_ROUNDS = 3
+    JOB_TIMEOUT = "30m"
+
 # File paths
 class FilePaths:
     PRESENTATIONS_DIR = "presentations"
+    UPLOADS_DIR = "uploads"
+    THUMBNAILS_DIR = "thumbnails"
+    
+# Deck storage
+class StorageConstants:
+    LOCAL = "local"
+    S3 = "s3"
+    BACKEND = LOCAL
+    
+    # Local disk: root/ab/cd/<key>, written via a staging directory on the same filesystem
+    LOCAL_ROOT = FilePaths.PRESENTATIONS_DIR
+    STAGING_DIR = ".staging"
+    SHARD_DEPTH = 2
+    SHARD_WIDTH = 2
+    
+    # S3-compatible object storage
+    S3_BUCKET = "presentations"
+    S3_PREFIX = "decks/"
+    MULTIPART_THRESHOLD = 8 * 1024 * 1024
+    
+    # Streamed reads and multipart uploads
+    CHUNK_SIZE = 1024 * 1024
+    MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+    
+# Retention sweeper
+class SweeperConstants:
+    INTERVAL_SECONDS = 3600
+    RETENTION_DAYS = 0  # decks untouched for longer are deleted; 0 keeps them forever (SWEEP_RETENTION_DAYS)
+    JOB_RETENTION_DAYS = 30  # finished Job rows
+    # Files younger than this may belong to a render whose row is not committed yet
+    ORPHAN_GRACE_SECONDS = 3600
+    
+    # Bounded work per run so the database and disk see no large spikes
+    BATCH_SIZE = 200
+    MAX_BATCHES = 50
+    BATCH_PAUSE_SECONDS = 0.1
+    
+    SCHEDULE_KEY = "sweeper:scheduled"
+    JOB_TIMEOUT = "30m"
+    
+# Thumbnail settings
+class ThumbnailConstants:
+    MEDIA_TYPE = "image/svg+xml"
+    # Listing URLs carry a version parameter, so clients may cache for a day
+    CACHE_CONTROL = "public, max-age=86400"
     
 # API routes
 class APIRoutes:
@@ -142,12 +473,38 @@ class APIRoutes:
     PRESENTATIONS = "/presentations/"
     PRESENTATION_BY_ID = "/presentations/{presentation_id}"
     PRESENTATION_STYLE = "/presentations/{presentation_id}/configure-style"
+    PRESENTATION_UPLOAD = "/presentations/upload"
+    PRESENTATION_PREVIEW = "/presentations/{presentation_id}/preview"
+    PRESENTATION_DOWNLOAD = "/presentations/{presentation_id}/download"
+    PRESENTATION_CANCEL = "/presentations/{presentation_id}/cancel"
+    PRESENTATION_THUMBNAILS = "/presentations/thumbnails"
+    PRESENTATION_SEARCH = "/presentations/search"
+    PRESENTATION_SLIDES = "/presentations/{presentation_id}/slides"
+    PRESENTATION_SLIDE = "/presentations/{presentation_id}/slides/{slide_index}"
+    PRESENTATION_SLIDE_REGENERATE = "/presentations/{presentation_id}/slides/{slide_index}/regenerate"
+    PRESENTATION_SLIDE_THUMBNAIL = "/presentations/{presentation_id}/thumbnails/{slide_index}"
     
 # Error messages
 class ErrorMessages:
     PRESENTATION_NOT_FOUND = "Presentation not found"
     PRESENTATION_INCOMPLETE = "Presentation must be completed before styling can be applied"
     STYLE_APPLICATION_FAILED = "Failed to apply style configuration"
+    UNSUPPORTED_UPLOAD = "Only plain text and Markdown files (.txt, .md, .markdown) are supported"
+    UPLOAD_TOO_LARGE = "Uploaded document exceeds the maximum allowed size"
+    EMPTY_UPLOAD = "Uploaded document is empty"
+    PREVIEW_UNAVAILABLE = "Presentation has no generated slides to preview yet"
+    THUMBNAIL_NOT_FOUND = "Thumbnail not found"
+    SLIDE_NOT_FOUND = "Slide not found"
+    SLIDES_UNAVAILABLE = "Presentation has no generated slides to edit yet"
+    FILE_NOT_FOUND = "Presentation file not found"
+    IDEMPOTENCY_KEY_TOO_LONG = "Idempotency-Key must be at most 255 characters"
+    IDEMPOTENCY_KEY_REUSED = "Idempotency-Key was already used with a different request"
+    REQUEST_IN_PROGRESS = "An identical request is still being processed; retry shortly"
+    OVERLOADED = "The service is overloaded; retry after the time in the Retry-After header"
+    NOTHING_TO_CANCEL = "Presentation has no queued or running jobs to cancel"
+    INVALID_TENANT = "X-Tenant-ID may only contain letters, digits, '_', '.' and '-' (at most 64)"
+    UNKNOWN_FIELDS = "Unknown fields requested"
+    BULK_ONLY_SLIDES = "Decks of more than 20 slides must be requested with priority \"bulk\""
     
 # Success messages
 class SuccessMessages:
@@ -157,4 +514,7 @@ class SuccessMessages:
 class Defaults:
     DEFAULT_NUM_SLIDES = 10
     MAX_SLIDES = 20
-    MIN_SLIDES = 1 
\ No newline at end of file
+    MIN_SLIDES = 1
+    # Larger decks only as bulk requests or from uploaded documents
+    MAX_BULK_SLIDES = 200
+    BULK_JOB_TIMEOUT = "60m" 
\ No newline at end of file
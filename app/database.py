@@ -1,6 +1,7 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from app.models.presentation import Base
+from app.services.search_index import create_search_schema
 import os
 from dotenv import load_dotenv
 
@@ -15,6 +16,9 @@ if DATABASE_URL.startswith("sqlite"):
 else:
     engine = create_engine(DATABASE_URL)
 
+# The full-text index is dialect-specific DDL, created along with the tables
+event.listen(Base.metadata, "after_create", create_search_schema)
+
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -1,6 +1,7 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api import presentation_router, health_router
+from app.api.responses import FastJSONResponse, CompressionMiddleware
 from app.database import engine, Base
 import uvicorn
 
@@ -41,6 +42,7 @@ app = FastAPI(
     },
     docs_url="/docs",
     redoc_url="/redoc",
+    default_response_class=FastJSONResponse,
 )
 
 # Add CORS middleware
@@ -51,6 +53,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(CompressionMiddleware)
 
 # Include routers
 app.include_router(health_router, tags=["health"])
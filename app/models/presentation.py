@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, DateTime, JSON, Enum, ForeignKey, Text
+from sqlalchemy import Column, String, Integer, DateTime, JSON, Enum, ForeignKey, Text, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -34,12 +34,33 @@ class Presentation(Base):
     
     @property
     def has_speaker_notes(self):
-        """Check if the presentation includes speaker notes"""
-        if self.slides_data and 'include_speaker_notes' in self.slides_data:
-            return self.slides_data['include_speaker_notes']
+        """Whether the generated slides have speaker notes (fast-mode decks are generated without)"""
+        if isinstance(self.slides_data, list) and self.slides_data:
+            return any(isinstance(slide, dict) and slide.get("notes") for slide in self.slides_data)
         return True  # Default to include speaker notes
 
 
+class Slide(Base):
+    """
+    One slide of a presentation's slides_data, stored as its own row so
+    single slides can be read, updated and queried without the deck blob.
+    Keys beyond the SlideData fields (layout hints) are kept in extra.
+    """
+    __tablename__ = "slides"
+    
+    presentation_id = Column(String, ForeignKey("presentations.id"), primary_key=True)
+    position = Column(Integer, primary_key=True)
+    title = Column(String, nullable=False, default="")
+    slide_type = Column(String)
+    content = Column(JSON)
+    notes = Column(Text)
+    reference = Column(String)
+    extra = Column(JSON)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (Index("ix_slides_slide_type", "slide_type"),)
+
+
 class Job(Base):
     __tablename__ = "jobs"
     
@@ -1,26 +1,132 @@
-from app.models.presentation import Presentation, PresentationStatus
-from app.schemas.presentation_schema import PresentationCreate, PresentationUpdate
-from app.task_queue import get_queue
-from app.workers.tasks import generate_presentation_task
-from sqlalchemy.orm import Session
-from typing import Optional
+from app.models.presentation import Presentation, PresentationStatus, Job
+from app.schemas.presentation_schema import PresentationCreate, PresentationUpdate, SlideUpdate
+from app.task_queue import get_queue, queued_count, normalize_tenant, redis_conn
+from app.workers.tasks import generate_presentation_task, regenerate_slide_task
+from app.services.document_ingestor import ReceivedUpload, receive_upload, store_upload
+from app.services.slide_patcher import apply_slide_update
+from app.services.artifact_sweeper import delete_artifacts
+from app.services.idempotency import SingleFlight, RequestInProgressError, request_fingerprint, dedup_key
+from app.services.admission import AdmissionController, AdmissionDecision, OverloadedError, REJECT
+from app.services.cancellation import request_cancel
+from app.services.response_cache import PresentationCache
+from app.services.slide_store import delete_slides
+from app.services.search_index import SearchIndex
+from app.constants.constants import (
+    IngestionConstants,
+    LLMConstants,
+    IdempotencyConstants,
+    SchedulingConstants,
+    AdmissionConstants,
+    ErrorMessages,
+    JobPriority,
+    Defaults
+)
+from sqlalchemy.orm import Session, load_only
+from redis.exceptions import RedisError
+from rq.job import Job as QueuedJob, JobStatus
+from rq.exceptions import NoSuchJobError
+from typing import Callable, Optional, BinaryIO, List
+from datetime import datetime
+import os
+import time
 import uuid
 
 
 class PresentationOrchestrator:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, tenant: Optional[str] = None):
         self.db = db
-        self.queue = get_queue()
+        self.tenant = normalize_tenant(tenant)
+        self.last_replayed = False
+        self.last_admission: Optional[AdmissionDecision] = None
+        self.cache = PresentationCache()
     
-    def create_presentation(self, presentation_data: PresentationCreate) -> Presentation:
-        """Create a new presentation and queue it for generation"""
+    def create_presentation(self, presentation_data: PresentationCreate, idempotency_key: Optional[str] = None) -> Presentation:
+        """
+        Create a new presentation and queue it for generation.
+        
+        Requests with the same Idempotency-Key (or, with automatic dedup, the
+        same topic, content and num_slides within the window) get the
+        presentation of the first one; concurrent duplicates wait for it to be
+        committed instead of queuing another LLM job. last_replayed tells the
+        caller which happened.
+        
+        New requests pass admission control first: under load they are
+        generated in fast mode or refused with OverloadedError, and
+        last_admission holds the decision. Replays are never refused.
+        """
+        fingerprint = request_fingerprint(presentation_data.topic, presentation_data.content, presentation_data.num_slides)
+        return self._create_once(
+            fingerprint, idempotency_key,
+            lambda presentation_id: self._create_presentation(presentation_data, presentation_id)
+        )
+    
+    def _create_once(self, fingerprint: str, idempotency_key: Optional[str],
+                     create: Callable[[str], Presentation]) -> Presentation:
+        """Run create(presentation_id) unless an earlier request with the same dedup key did"""
+        self.last_replayed = False
+        self.last_admission = None
+        dedup = dedup_key(fingerprint, idempotency_key, self.tenant)
+        if dedup is None:
+            return create(str(uuid.uuid4()))
+        
+        key, ttl = dedup
+        single_flight = SingleFlight()
+        presentation_id = str(uuid.uuid4())
+        # A second round only happens when the first owner never committed its row
+        for _ in range(2):
+            try:
+                owner_id = single_flight.claim(key, ttl, presentation_id, fingerprint)
+            except RedisError as e:
+                print(f"Idempotency check unavailable, creating without dedup: {str(e)}")
+                return create(presentation_id)
+            
+            if owner_id is None:
+                try:
+                    return create(presentation_id)
+                except Exception:
+                    single_flight.release(key, presentation_id)
+                    raise
+            
+            existing = self._wait_for_presentation(owner_id)
+            if existing:
+                self.last_replayed = True
+                return existing
+            single_flight.release(key, owner_id)
+        
+        raise RequestInProgressError(ErrorMessages.REQUEST_IN_PROGRESS)
+    
+    def _wait_for_presentation(self, presentation_id: str) -> Optional[Presentation]:
+        """The in-flight owner commits its row right after claiming the key, so this is short"""
+        deadline = time.monotonic() + IdempotencyConstants.SINGLE_FLIGHT_WAIT_SECONDS
+        while True:
+            presentation = self.get_presentation(presentation_id)
+            if presentation or time.monotonic() >= deadline:
+                return presentation
+            time.sleep(IdempotencyConstants.SINGLE_FLIGHT_POLL_SECONDS)
+    
+    def _admit(self, priority: str) -> AdmissionDecision:
+        """Admission decision for a new job of the given class; raises OverloadedError when refused"""
+        admission = AdmissionController().check(priority)
+        self.last_admission = admission
+        if admission.action == REJECT:
+            print(f"Refused presentation ({admission.reason}): {admission.signals}")
+            raise OverloadedError(admission.retry_after, admission.reason)
+        return admission
+    
+    def _create_presentation(self, presentation_data: PresentationCreate, presentation_id: str) -> Presentation:
+        priority = self._priority(JobPriority.INTERACTIVE, presentation_data.priority)
+        admission = self._admit(priority)
+        
+        num_slides = presentation_data.num_slides or 10
+        if admission.fast:
+            num_slides = min(num_slides, AdmissionConstants.FAST_MAX_SLIDES)
         
         # Create presentation record
         presentation = Presentation(
-            id=str(uuid.uuid4()),
+            id=presentation_id,
             topic=presentation_data.topic,
             content=presentation_data.content,
-            num_slides=presentation_data.num_slides or 10,
+            num_slides=num_slides,
             status=PresentationStatus.PENDING
         )
         
@@ -29,17 +135,89 @@ class PresentationOrchestrator:
         self.db.refresh(presentation)
         
         # Queue the presentation generation task
-        job = self.queue.enqueue(
+        job = get_queue(priority, self.tenant).enqueue(
+            generate_presentation_task,
+            presentation.id,
+            fast=admission.fast,
+            job_timeout=Defaults.BULK_JOB_TIMEOUT if num_slides > Defaults.MAX_SLIDES else '10m'
+        )
+        self._record_job(job.id, presentation.id)
+        
+        return presentation
+    
+    def create_presentation_from_document(self, topic: str, num_slides: int, source: BinaryIO,
+                                          idempotency_key: Optional[str] = None) -> Presentation:
+        """
+        Store an uploaded source document and queue it for map-reduce
+        summarization and generation. Uploads are deduplicated and pass
+        admission control like create_presentation; the document's hash
+        stands in for the content in the request fingerprint.
+        """
+        upload = receive_upload(source)
+        try:
+            fingerprint = request_fingerprint(topic, f"sha256:{upload.sha256}", num_slides)
+            return self._create_once(
+                fingerprint, idempotency_key,
+                lambda presentation_id: self._create_from_document(topic, num_slides, upload, presentation_id)
+            )
+        finally:
+            # Only left behind when the upload was not stored
+            if os.path.exists(upload.path):
+                os.remove(upload.path)
+    
+    def _create_from_document(self, topic: str, num_slides: int, upload: ReceivedUpload, presentation_id: str) -> Presentation:
+        priority = self._priority(JobPriority.STANDARD)
+        admission = self._admit(priority)
+        if admission.fast:
+            num_slides = min(num_slides, AdmissionConstants.FAST_MAX_SLIDES)
+        key = store_upload(upload, presentation_id)
+        
+        # The excerpt is replaced by the reduced summary once the worker has read the document
+        presentation = Presentation(
+            id=presentation_id,
+            topic=topic,
+            content=upload.excerpt,
+            num_slides=num_slides,
+            status=PresentationStatus.PENDING
+        )
+        
+        self.db.add(presentation)
+        self.db.commit()
+        self.db.refresh(presentation)
+        
+        job = get_queue(priority, self.tenant).enqueue(
             generate_presentation_task,
             presentation.id,
-            job_timeout='10m'
+            key,
+            fast=admission.fast,
+            job_timeout=IngestionConstants.JOB_TIMEOUT
         )
+        self._record_job(job.id, presentation.id)
         
         return presentation
     
-    def get_presentation(self, presentation_id: str) -> Optional[Presentation]:
-        """Get a presentation by ID"""
-        return self.db.query(Presentation).filter(Presentation.id == presentation_id).first()
+    def get_presentation(self, presentation_id: str, fields: Optional[List[str]] = None) -> Optional[Presentation]:
+        """Get a presentation by ID, loading only the given columns if any"""
+        return self._select(fields).filter(Presentation.id == presentation_id).first()
+    
+    def get_presentations(self, presentation_ids: List[str], fields: Optional[List[str]] = None):
+        """Get the presentations with the given IDs, in no particular order"""
+        return self._select(fields).filter(Presentation.id.in_(presentation_ids)).all()
+    
+    def _select(self, fields: Optional[List[str]] = None):
+        query = self.db.query(Presentation)
+        if fields:
+            query = query.options(load_only(*[getattr(Presentation, name) for name in fields]))
+        return query
+    
+    def get_presentation_version(self, presentation_id: str) -> Optional[Presentation]:
+        """Load only the columns a presentation's ETag is built from"""
+        return (
+            self.db.query(Presentation)
+            .options(load_only(Presentation.id, Presentation.status, Presentation.updated_at))
+            .filter(Presentation.id == presentation_id)
+            .first()
+        )
     
     def update_presentation(self, presentation_id: str, update_data: PresentationUpdate) -> Optional[Presentation]:
         """Update presentation configuration"""
@@ -52,21 +230,131 @@ class PresentationOrchestrator:
         if update_data.num_slides is not None:
             presentation.num_slides = update_data.num_slides
         
+        presentation.updated_at = datetime.utcnow()
         self.db.commit()
         self.db.refresh(presentation)
+        self.cache.invalidate(presentation_id)
         
         return presentation
     
-    def get_all_presentations(self, skip: int = 0, limit: int = 100):
-        """Get all presentations with pagination"""
-        return self.db.query(Presentation).offset(skip).limit(limit).all()
+    def update_slide(self, presentation: Presentation, slide_index: int, slide_update: SlideUpdate) -> Presentation:
+        """Merge changes into one slide and rewrite only that slide's parts of the .pptx"""
+        
+        changes = slide_update.dict(exclude_unset=True, exclude_none=True)
+        slide_data = {**presentation.slides_data[slide_index], **changes}
+        
+        patched = apply_slide_update(presentation, slide_index, slide_data)
+        print(f"Updated slide {slide_index} of {presentation.id} ({'patched in place' if patched else 'full render'})")
+        
+        presentation.updated_at = datetime.utcnow()
+        self.db.commit()
+        self.db.refresh(presentation)
+        self.cache.invalidate(presentation.id)
+        
+        return presentation
+    
+    def regenerate_slide(self, presentation: Presentation, slide_index: int, instructions: Optional[str] = None) -> str:
+        """Queue regeneration of a single slide and return the job id"""
+        job = get_queue(self._priority(JobPriority.INTERACTIVE), self.tenant).enqueue(
+            regenerate_slide_task,
+            presentation.id,
+            slide_index,
+            instructions,
+            job_timeout=LLMConstants.SLIDE_JOB_TIMEOUT
+        )
+        self._record_job(job.id, presentation.id)
+        return job.id
+    
+    def _record_job(self, job_id: str, presentation_id: str):
+        """Keep a Job row per queued RQ job so the presentation's jobs can be found and cancelled"""
+        self.db.add(Job(id=job_id, presentation_id=presentation_id, status=PresentationStatus.PENDING.value))
+        self.db.commit()
+    
+    def cancel_presentation(self, presentation: Presentation) -> int:
+        """
+        Cancel a presentation's queued and running jobs and return how many
+        there were. Queued jobs are removed from their queue; running jobs
+        stop at their next cancellation check and mark themselves cancelled.
+        """
+        cancelled = self._cancel_jobs(presentation.id)
+        if cancelled and presentation.status == PresentationStatus.PENDING:
+            presentation.status = PresentationStatus.CANCELLED
+            presentation.updated_at = datetime.utcnow()
+            self.db.commit()
+            self.db.refresh(presentation)
+        return cancelled
+    
+    def _cancel_jobs(self, presentation_id: str) -> int:
+        active = (
+            self.db.query(Job)
+            .filter(Job.presentation_id == presentation_id)
+            .filter(Job.status.in_([PresentationStatus.PENDING.value, PresentationStatus.PROCESSING.value]))
+            .all()
+        )
+        for row in active:
+            try:
+                request_cancel(row.id)
+                queued = QueuedJob.fetch(row.id, connection=redis_conn)
+                if queued.get_status() in (JobStatus.QUEUED, JobStatus.SCHEDULED, JobStatus.DEFERRED):
+                    # Never started, so no task is left to update the row
+                    queued.cancel()
+                    row.status = PresentationStatus.CANCELLED.value
+            except NoSuchJobError:
+                row.status = PresentationStatus.CANCELLED.value
+            except RedisError as e:
+                print(f"Failed to cancel job {row.id}: {str(e)}")
+        self.db.commit()
+        return len(active)
+    
+    def _priority(self, default: JobPriority, requested: Optional[JobPriority] = None) -> str:
+        """
+        Priority class for a job: the default for its kind of request, or a
+        lower class the client asked for. A tenant with a backlog above the
+        bulk threshold is queued as bulk, so a large batch cannot hold up
+        anyone's interactive requests, including the tenant's own later ones.
+        """
+        classes = list(JobPriority)
+        priority = max(default, requested or default, key=classes.index)
+        try:
+            if queued_count(self.tenant) >= SchedulingConstants.BULK_QUEUED_THRESHOLD:
+                priority = JobPriority.BULK
+        except RedisError:
+            pass
+        return priority.value
+    
+    def get_all_presentations(self, skip: int = 0, limit: int = 100, fields: Optional[List[str]] = None):
+        """Get all presentations with pagination, loading only the given columns if any"""
+        return self._select(fields).offset(skip).limit(limit).all()
+    
+    def get_thumbnail_listing(self, skip: int = 0, limit: int = 100):
+        """Load only the columns a thumbnail listing needs, never content or slides_data"""
+        return (
+            self.db.query(Presentation)
+            .options(load_only(Presentation.id, Presentation.topic, Presentation.status, Presentation.updated_at))
+            .order_by(Presentation.updated_at.desc())
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
     
     def delete_presentation(self, presentation_id: str) -> bool:
-        """Delete a presentation"""
+        """Cancel a presentation's jobs, then delete it with its job rows, stored file, thumbnails and upload"""
         presentation = self.get_presentation(presentation_id)
         if not presentation:
             return False
         
+        self._cancel_jobs(presentation_id)
+        file_path = presentation.file_path
+        self.db.query(Job).filter(Job.presentation_id == presentation_id).delete(synchronize_session=False)
+        delete_slides(self.db, [presentation_id])
+        SearchIndex(self.db).remove([presentation_id])
         self.db.delete(presentation)
         self.db.commit()
+        self.cache.invalidate(presentation_id)
+        
+        # Files go after the commit; anything left behind is collected by the sweeper
+        try:
+            delete_artifacts(self.db, presentation_id, file_path)
+        except Exception as e:
+            print(f"Failed to delete files of presentation {presentation_id}: {str(e)}")
         return True 
\ No newline at end of file
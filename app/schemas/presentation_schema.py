@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from typing import Optional, Dict, Any, List
 from datetime import datetime
 from enum import Enum
@@ -6,7 +6,9 @@ from app.constants.constants import (
     PresentationStatus, 
     PresentationTheme, 
     SlideLayoutType,
-    Defaults
+    JobPriority,
+    Defaults,
+    ErrorMessages
 )
 
 
@@ -67,10 +69,21 @@ class PresentationCreate(BaseModel):
     )
     num_slides: int = Field(
         ge=Defaults.MIN_SLIDES, 
-        le=Defaults.MAX_SLIDES, 
-        default=Defaults.DEFAULT_NUM_SLIDES
+        le=Defaults.MAX_BULK_SLIDES, 
+        default=Defaults.DEFAULT_NUM_SLIDES,
+        description=f"Up to {Defaults.MAX_SLIDES}, or {Defaults.MAX_BULK_SLIDES} for bulk requests"
+    )
+    priority: Optional[JobPriority] = Field(
+        None,
+        description="Queue class for the generation job; requests are interactive by default and may only ask for a lower class"
     )
 
+    @model_validator(mode="after")
+    def large_decks_are_bulk(self):
+        if self.num_slides > Defaults.MAX_SLIDES and self.priority != JobPriority.BULK:
+            raise ValueError(ErrorMessages.BULK_ONLY_SLIDES)
+        return self
+
     class Config:
         schema_extra = {
             "example": {
@@ -134,6 +147,39 @@ class SlideData(BaseModel):
     )
 
 
+class SlideUpdate(BaseModel):
+    """Fields to change on a single slide; omitted fields keep their current value"""
+    title: Optional[str] = None
+    slide_type: Optional[SlideLayoutType] = None
+    content: Optional[List[str]] = None
+    notes: Optional[str] = None
+    reference: Optional[str] = None
+
+    class Config:
+        use_enum_values = True
+        schema_extra = {
+            "example": {
+                "title": "What is Machine Learning?",
+                "content": ["Subset of artificial intelligence", "Learns from data"]
+            }
+        }
+
+
+class SlideRegenerateRequest(BaseModel):
+    instructions: Optional[str] = Field(
+        None,
+        max_length=500,
+        description="Optional guidance for the new version of the slide",
+        example="Focus on real-world examples"
+    )
+
+
+class SlideRegenerateResponse(BaseModel):
+    presentation_id: str
+    slide_index: int
+    job_id: str
+
+
 class PresentationResponse(BaseModel):
     id: str
     topic: str
@@ -165,6 +211,25 @@ class PresentationListResponse(BaseModel):
         orm_mode = True
 
 
+class PresentationSearchResult(BaseModel):
+    id: str
+    topic: str
+    status: str
+    num_slides: int
+    updated_at: datetime
+    score: float = Field(..., description="Relevance; higher is a better match")
+
+
+class PresentationThumbnailResponse(BaseModel):
+    id: str
+    topic: str
+    status: str
+    slide_count: int
+    thumbnail_url: Optional[str] = None
+    svg: Optional[str] = None
+    updated_at: datetime
+
+
 class JobResponse(BaseModel):
     id: str
     presentation_id: str
@@ -0,0 +1,119 @@
+import math
+import os
+from dataclasses import dataclass, field
+from typing import Dict, Any, Optional
+from redis.exceptions import RedisError
+from rq import Worker
+from app.task_queue import redis_conn, tenant_queues
+from app.services.circuit_breaker import get_all_circuit_breakers
+from app.services.metrics import oldest_wait, record_admission
+from app.constants.constants import AdmissionConstants, CircuitState, JobPriority, ErrorMessages
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", str(AdmissionConstants.ENABLED)).lower() == "true"
+DEGRADE_WAIT_SECONDS = float(os.getenv("ADMISSION_DEGRADE_WAIT_SECONDS", AdmissionConstants.DEGRADE_WAIT_SECONDS))
+REJECT_WAIT_SECONDS = float(os.getenv("ADMISSION_REJECT_WAIT_SECONDS", AdmissionConstants.REJECT_WAIT_SECONDS))
+MAX_QUEUE_DEPTH = int(os.getenv("ADMISSION_MAX_QUEUE_DEPTH", AdmissionConstants.MAX_QUEUE_DEPTH))
+
+ADMIT = "admit"
+DEGRADE = "degrade"
+REJECT = "reject"
+
+
+class OverloadedError(RuntimeError):
+    """A request was refused by admission control; retry_after is in seconds"""
+
+    def __init__(self, retry_after: int, reason: str):
+        super().__init__(ErrorMessages.OVERLOADED)
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+@dataclass
+class AdmissionDecision:
+    action: str
+    reason: str = ""
+    retry_after: int = 0
+    signals: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def fast(self) -> bool:
+        return self.action == DEGRADE
+
+
+def record_job_duration(seconds: float, connection=None):
+    """Fold a finished generation job's duration into the shared drain-rate estimate"""
+    connection = connection or redis_conn
+    alpha = AdmissionConstants.JOB_SECONDS_ALPHA
+    try:
+        current = connection.get(AdmissionConstants.JOB_SECONDS_KEY)
+        estimate = seconds if current is None else alpha * seconds + (1 - alpha) * float(current)
+        connection.set(AdmissionConstants.JOB_SECONDS_KEY, round(estimate, 3))
+    except RedisError:
+        pass
+
+
+def _retry_after(seconds: float) -> int:
+    return int(min(max(math.ceil(seconds), AdmissionConstants.MIN_RETRY_AFTER_SECONDS),
+                   AdmissionConstants.MAX_RETRY_AFTER_SECONDS))
+
+
+class AdmissionController:
+    """
+    Decides whether a new deck is queued, queued in fast mode or refused,
+    from how long it would wait before a worker picks it up and from the LLM
+    providers' circuits.
+
+    The wait is the larger of the drain time of the jobs ahead of it (jobs
+    of its own and higher priority classes, times the average job duration,
+    over the number of workers) and the age of the oldest of those jobs.
+    Requests are refused when every remote provider's circuit is open, since
+    they would only get placeholder content. Redis errors admit the request.
+    """
+
+    def __init__(self, connection=None):
+        self.redis = connection or redis_conn
+
+    def check(self, priority: str) -> AdmissionDecision:
+        if not ADMISSION_ENABLED:
+            return AdmissionDecision(ADMIT)
+        try:
+            decision = self._decide(priority)
+        except RedisError as e:
+            print(f"Admission control unavailable, admitting request: {str(e)}")
+            return AdmissionDecision(ADMIT)
+        record_admission(decision.action, decision.reason, self.redis)
+        return decision
+
+    def _decide(self, priority: str) -> AdmissionDecision:
+        classes = list(JobPriority)
+        ahead = [queue for p in classes[:classes.index(JobPriority(priority)) + 1]
+                 for queue in tenant_queues(p.value, self.redis)]
+        depth = sum(queue.count for queue in ahead)
+        workers = max(Worker.count(connection=self.redis), 1)
+        job_seconds = float(self.redis.get(AdmissionConstants.JOB_SECONDS_KEY) or AdmissionConstants.DEFAULT_JOB_SECONDS)
+        drain_seconds = (depth + 1) * job_seconds / workers
+        wait_seconds = max(drain_seconds, oldest_wait(ahead))
+        signals = {
+            "queued_ahead": depth,
+            "workers": workers,
+            "job_seconds": round(job_seconds, 1),
+            "estimated_wait_seconds": round(wait_seconds, 1)
+        }
+
+        # Every remote provider unavailable: wait for the first circuit to allow a probe
+        circuits = [breaker.snapshot() for breaker in get_all_circuit_breakers().values()]
+        open_circuits = [c for c in circuits if c["state"] == CircuitState.OPEN.value]
+        if circuits and len(open_circuits) == len(circuits):
+            retry_in = min(c.get("retry_in_seconds", 0) for c in open_circuits)
+            return AdmissionDecision(REJECT, "providers_unavailable", _retry_after(retry_in), signals)
+
+        if depth >= MAX_QUEUE_DEPTH:
+            return AdmissionDecision(REJECT, "queue_depth", _retry_after(wait_seconds - REJECT_WAIT_SECONDS), signals)
+        if wait_seconds > REJECT_WAIT_SECONDS:
+            # Back off until the queue should have drained below the refusal threshold
+            return AdmissionDecision(REJECT, "queue_wait", _retry_after(wait_seconds - REJECT_WAIT_SECONDS), signals)
+        if wait_seconds > DEGRADE_WAIT_SECONDS:
+            return AdmissionDecision(DEGRADE, "queue_wait", signals=signals)
+        if open_circuits:
+            return AdmissionDecision(DEGRADE, "providers_degraded", signals=signals)
+        return AdmissionDecision(ADMIT, signals=signals)
@@ -0,0 +1,246 @@
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Any, Iterable, Iterator, List, Optional
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session, load_only
+from app.constants.constants import SweeperConstants, StorageConstants, PresentationStatus, FilePaths
+from app.models.presentation import Presentation, Job
+from app.services.storage import Storage, get_storage, shard
+from app.services.thumbnail_renderer import ThumbnailRenderer
+from app.services.document_ingestor import upload_key
+from app.services.response_cache import PresentationCache
+from app.services.slide_store import delete_slides
+from app.services.search_index import SearchIndex
+
+RETENTION_DAYS = float(os.getenv("SWEEP_RETENTION_DAYS", SweeperConstants.RETENTION_DAYS))
+JOB_RETENTION_DAYS = float(os.getenv("SWEEP_JOB_RETENTION_DAYS", SweeperConstants.JOB_RETENTION_DAYS))
+BATCH_SIZE = int(os.getenv("SWEEP_BATCH_SIZE", SweeperConstants.BATCH_SIZE))
+
+# Uploads are only needed until their deck has been generated
+_LIVE_UPLOAD_STATUSES = [PresentationStatus.PENDING.value, PresentationStatus.PROCESSING.value]
+_FINISHED_JOB_STATUSES = [
+    PresentationStatus.COMPLETED.value, PresentationStatus.FAILED.value, PresentationStatus.CANCELLED.value
+]
+
+
+def _chunks(items: Iterable, size: int) -> Iterator[List]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _remove_objects(storage: Storage, prefix: str) -> int:
+    """Delete every stored object under a key prefix; returns the bytes they held"""
+    reclaimed = 0
+    for stored in list(storage.iter_objects(prefix)):
+        storage.delete(stored.key)
+        reclaimed += stored.size
+    return reclaimed
+
+
+def delete_artifacts(db: Session, presentation_id: str, file_path: Optional[str],
+                     storage: Optional[Storage] = None) -> int:
+    """
+    Remove a deleted deck's stored file, thumbnails and uploaded source.
+    Call after the row is gone: the file is kept while another deck still
+    points at the same key. Returns the bytes reclaimed.
+    """
+    storage = storage or get_storage()
+    reclaimed = 0
+    if file_path and not db.query(Presentation.id).filter(Presentation.file_path == file_path).first():
+        if storage.exists(file_path):
+            reclaimed += storage.size(file_path)
+            storage.delete(file_path)
+    reclaimed += _remove_objects(storage, ThumbnailRenderer.thumbnail_prefix(presentation_id))
+    reclaimed += _remove_objects(storage, upload_key(presentation_id))
+    return reclaimed
+
+
+class ArtifactSweeper:
+    """
+    Retention and garbage collection for decks. Each run expires decks past
+    the retention age, deletes stored files, thumbnails and uploads that no
+    row refers to, and drops orphaned or old Job rows. Work is done in
+    batches of BATCH_SIZE with a pause between them and a cap on batches per
+    run; whatever is left is picked up by the next run.
+    """
+
+    def __init__(self, db: Session, storage: Optional[Storage] = None, retention_days: float = RETENTION_DAYS,
+                 job_retention_days: float = JOB_RETENTION_DAYS, batch_size: int = BATCH_SIZE):
+        self.db = db
+        self.storage = storage or get_storage()
+        self.retention_days = retention_days
+        self.job_retention_days = job_retention_days
+        self.batch_size = batch_size
+        self.batches = 0
+        self.report: Dict[str, Any] = {}
+
+    def sweep(self) -> Dict[str, Any]:
+        """Run one bounded sweep and return what it reclaimed"""
+        started = time.monotonic()
+        self.batches = 0
+        self.report = {
+            "presentations_expired": 0,
+            "files_deleted": 0,
+            "thumbnails_deleted": 0,
+            "uploads_deleted": 0,
+            "jobs_deleted": 0,
+            "bytes_reclaimed": 0,
+            "truncated": False
+        }
+        orphan_cutoff = time.time() - SweeperConstants.ORPHAN_GRACE_SECONDS
+
+        self._expire_presentations()
+        self._delete_orphaned_files(orphan_cutoff)
+        self._delete_orphaned_objects(f"{FilePaths.THUMBNAILS_DIR}/", orphan_cutoff, "thumbnails_deleted")
+        self._delete_orphaned_objects(f"{FilePaths.UPLOADS_DIR}/", orphan_cutoff, "uploads_deleted", _LIVE_UPLOAD_STATUSES)
+        self._delete_jobs()
+        self.report["bytes_reclaimed"] += self.storage.sweep_scratch(orphan_cutoff)
+
+        self.report["batches"] = self.batches
+        self.report["seconds"] = round(time.monotonic() - started, 2)
+        return self.report
+
+    def _next_batch(self) -> bool:
+        """Spend one batch of this run's budget, pausing after the previous one"""
+        if self.batches >= SweeperConstants.MAX_BATCHES:
+            self.report["truncated"] = True
+            return False
+        if self.batches:
+            time.sleep(SweeperConstants.BATCH_PAUSE_SECONDS)
+        self.batches += 1
+        return True
+
+    # -------------------------------
+    # Expired decks
+    # -------------------------------
+    def _expire_presentations(self):
+        if not self.retention_days:
+            return
+        cutoff = datetime.utcnow() - timedelta(days=self.retention_days)
+
+        while self._next_batch():
+            expired = (
+                self.db.query(Presentation)
+                .options(load_only(Presentation.id, Presentation.file_path))
+                .filter(Presentation.updated_at < cutoff)
+                .order_by(Presentation.updated_at)
+                .limit(self.batch_size)
+                .all()
+            )
+            if not expired:
+                return
+            artifacts = [(presentation.id, presentation.file_path) for presentation in expired]
+
+            # Rows go first; files whose deletion fails are orphans the next run collects
+            ids = [presentation_id for presentation_id, _ in artifacts]
+            self.db.query(Job).filter(Job.presentation_id.in_(ids)).delete(synchronize_session=False)
+            delete_slides(self.db, ids)
+            SearchIndex(self.db).remove(ids)
+            for presentation in expired:
+                self.db.delete(presentation)
+            self.db.commit()
+            self.report["presentations_expired"] += len(expired)
+            cache = PresentationCache()
+            for presentation_id in ids:
+                cache.invalidate(presentation_id)
+
+            for presentation_id, file_path in artifacts:
+                try:
+                    self.report["bytes_reclaimed"] += delete_artifacts(self.db, presentation_id, file_path, self.storage)
+                except Exception as e:
+                    print(f"Failed to delete files of expired presentation {presentation_id}: {str(e)}")
+            if len(expired) < self.batch_size:
+                return
+
+    # -------------------------------
+    # Orphans
+    # -------------------------------
+    def _delete_orphaned_files(self, cutoff: float):
+        """Stored decks no presentation row refers to"""
+        # Thumbnails and uploads are swept by presentation id below
+        grouped = (f"{FilePaths.THUMBNAILS_DIR}/", f"{FilePaths.UPLOADS_DIR}/")
+        candidates = (stored for stored in self.storage.iter_objects()
+                      if stored.modified < cutoff and not stored.key.startswith(grouped))
+        for batch in _chunks(candidates, self.batch_size):
+            if not self._next_batch():
+                return
+            keys = [stored.key for stored in batch]
+            referenced = {row[0] for row in self.db.query(Presentation.file_path).filter(Presentation.file_path.in_(keys))}
+            for stored in batch:
+                if stored.key in referenced:
+                    continue
+                try:
+                    self.storage.delete(stored.key)
+                except Exception as e:
+                    print(f"Failed to delete orphaned file {stored.key}: {str(e)}")
+                    continue
+                self.report["files_deleted"] += 1
+                self.report["bytes_reclaimed"] += stored.size
+
+    def _delete_orphaned_objects(self, prefix: str, cutoff: float, counter: str,
+                                 live_statuses: Optional[List[str]] = None):
+        """
+        Objects under prefix keyed by a presentation id ("<prefix><shard>/<id>/..."
+        or "<prefix><shard>/<id>.txt") whose row is gone, or, with
+        live_statuses, whose row is no longer in one of them
+        """
+        depth = StorageConstants.SHARD_DEPTH
+
+        def presentation_id(key: str) -> str:
+            parts = key[len(prefix):].split("/")
+            candidate = parts[depth].split(".")[0] if len(parts) > depth else None
+            if candidate and "/".join(parts[:depth]) == shard(candidate):
+                return candidate
+            # Stored before ids were sharded: right under the prefix
+            return parts[0].split(".")[0]
+
+        candidates = (stored for stored in self.storage.iter_objects(prefix) if stored.modified < cutoff)
+        for batch in _chunks(candidates, self.batch_size):
+            if not self._next_batch():
+                return
+            ids = {presentation_id(stored.key) for stored in batch}
+            query = self.db.query(Presentation.id).filter(Presentation.id.in_(ids))
+            if live_statuses:
+                query = query.filter(Presentation.status.in_(live_statuses))
+            live = {row[0] for row in query}
+            for stored in batch:
+                if presentation_id(stored.key) in live:
+                    continue
+                try:
+                    self.storage.delete(stored.key)
+                except Exception as e:
+                    print(f"Failed to delete orphaned file {stored.key}: {str(e)}")
+                    continue
+                self.report["bytes_reclaimed"] += stored.size
+                self.report[counter] += 1
+
+    # -------------------------------
+    # Job rows
+    # -------------------------------
+    def _delete_jobs(self):
+        """Job rows whose presentation is gone, and finished ones past the job retention age"""
+        cutoff = datetime.utcnow() - timedelta(days=self.job_retention_days)
+        while self._next_batch():
+            ids = [row[0] for row in (
+                self.db.query(Job.id)
+                .outerjoin(Presentation, Job.presentation_id == Presentation.id)
+                .filter(or_(
+                    Presentation.id.is_(None),
+                    and_(Job.updated_at < cutoff, Job.status.in_(_FINISHED_JOB_STATUSES))
+                ))
+                .limit(self.batch_size)
+            )]
+            if not ids:
+                return
+            self.db.query(Job).filter(Job.id.in_(ids)).delete(synchronize_session=False)
+            self.db.commit()
+            self.report["jobs_deleted"] += len(ids)
+            if len(ids) < self.batch_size:
+                return
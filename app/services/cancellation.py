@@ -0,0 +1,61 @@
+import time
+from typing import Optional
+from redis.exceptions import RedisError
+from rq import get_current_job
+from app.task_queue import redis_conn
+from app.constants.constants import CancellationConstants
+
+
+class JobCancelledError(BaseException):
+    """
+    Raised inside a task once its job has been cancelled. Like
+    asyncio.CancelledError it is not an Exception, so the provider failover
+    and per-chunk error handling let it through instead of retrying.
+    """
+    pass
+
+
+def _flag_key(job_id: str) -> str:
+    return f"{CancellationConstants.REDIS_KEY_PREFIX}:{job_id}"
+
+
+def request_cancel(job_id: str, connection=None):
+    """Ask a queued or running job to stop; the job sees the flag at its next check"""
+    connection = connection or redis_conn
+    connection.set(_flag_key(job_id), 1, ex=CancellationConstants.FLAG_TTL_SECONDS)
+
+
+class CancellationToken:
+    """
+    A running job's view of its cancellation flag. check() raises
+    JobCancelledError once the flag is set and is cheap enough to call per
+    slide: Redis is read at most every POLL_SECONDS. Provider clients check
+    it between streamed chunks and close the connection when it fires, so a
+    cancelled generation is aborted rather than left running. If Redis is
+    unreachable the job simply runs to completion.
+    """
+
+    def __init__(self, job_id: Optional[str], connection=None):
+        self.job_id = job_id
+        self.redis = connection or redis_conn
+        self.cancelled = False
+        self._checked_at = 0.0
+
+    @classmethod
+    def for_current_job(cls, connection=None) -> "CancellationToken":
+        """Token of the RQ job being executed; outside a worker it never fires"""
+        job = get_current_job()
+        return cls(job.id if job else None, connection)
+
+    def check(self):
+        if self.job_id is None:
+            return
+        now = time.monotonic()
+        if not self.cancelled and now - self._checked_at >= CancellationConstants.POLL_SECONDS:
+            self._checked_at = now
+            try:
+                self.cancelled = bool(self.redis.exists(_flag_key(self.job_id)))
+            except RedisError:
+                pass
+        if self.cancelled:
+            raise JobCancelledError(f"Job {self.job_id} was cancelled")
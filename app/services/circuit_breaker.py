@@ -0,0 +1,324 @@
+import os
+import time
+import random
+from datetime import datetime
+from typing import Callable, Dict, Any, Optional, Tuple
+from redis.exceptions import RedisError, WatchError
+from app.task_queue import redis_conn
+from app.constants.constants import CircuitState, CircuitBreakerConstants, LLMProvider
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return float(default)
+
+
+# Thresholds are read once per process so they can be tuned per deployment
+CONSECUTIVE_FAILURE_THRESHOLD = int(_env_float("CIRCUIT_CONSECUTIVE_FAILURES", CircuitBreakerConstants.CONSECUTIVE_FAILURE_THRESHOLD))
+FAILURE_RATE_THRESHOLD = _env_float("CIRCUIT_FAILURE_RATE", CircuitBreakerConstants.FAILURE_RATE_THRESHOLD)
+SLOW_CALL_RATE_THRESHOLD = _env_float("CIRCUIT_SLOW_CALL_RATE", CircuitBreakerConstants.SLOW_CALL_RATE_THRESHOLD)
+SLOW_CALL_SECONDS = _env_float("CIRCUIT_SLOW_CALL_SECONDS", CircuitBreakerConstants.SLOW_CALL_SECONDS)
+MIN_CALLS_IN_WINDOW = int(_env_float("CIRCUIT_MIN_CALLS", CircuitBreakerConstants.MIN_CALLS_IN_WINDOW))
+WINDOW_SECONDS = _env_float("CIRCUIT_WINDOW_SECONDS", CircuitBreakerConstants.WINDOW_SECONDS)
+BASE_BACKOFF_SECONDS = _env_float("CIRCUIT_BASE_BACKOFF_SECONDS", CircuitBreakerConstants.BASE_BACKOFF_SECONDS)
+MAX_BACKOFF_SECONDS = _env_float("CIRCUIT_MAX_BACKOFF_SECONDS", CircuitBreakerConstants.MAX_BACKOFF_SECONDS)
+HEALTH_TTL_SECONDS = int(_env_float("CIRCUIT_HEALTH_TTL_SECONDS", CircuitBreakerConstants.HEALTH_TTL_SECONDS))
+
+
+class CircuitBreaker:
+    """
+    Per-provider circuit breaker whose state lives in Redis so that every
+    worker process sees the same view of a provider's health.
+
+    closed    -> calls flow; failures, slow calls and error rate are tracked
+    open      -> calls are skipped until the backoff (or Retry-After) elapses
+    half_open -> a single worker is allowed a probe call; success closes the
+                 circuit, failure re-opens it with a longer backoff
+
+    Call counters are incremented with HINCRBY and state changes are WATCHed
+    transactions, so concurrent workers neither lose counts nor open the
+    circuit twice for the same burst of failures.
+
+    If Redis is unreachable the breaker fails open (allows every call), so
+    generation never depends on Redis being up.
+    """
+
+    def __init__(self, name: str, connection=None):
+        self.name = name
+        self.redis = connection or redis_conn
+        self.state_key = f"{CircuitBreakerConstants.REDIS_KEY_PREFIX}:{name}"
+        self.probe_key = f"{self.state_key}:probe"
+        self.health_key = f"{CircuitBreakerConstants.HEALTH_KEY_PREFIX}:{name}"
+
+    # -------------------------------
+    # State access
+    # -------------------------------
+    @staticmethod
+    def _decode(raw: Dict[Any, Any]) -> Dict[str, str]:
+        return {k.decode() if isinstance(k, bytes) else k: v.decode() if isinstance(v, bytes) else v
+                for k, v in raw.items()}
+
+    def _load(self) -> Dict[str, str]:
+        return self._decode(self.redis.hgetall(self.state_key))
+
+    def _state(self, data: Dict[str, str]) -> CircuitState:
+        try:
+            return CircuitState(data.get("state", CircuitState.CLOSED.value))
+        except ValueError:
+            return CircuitState.CLOSED
+
+    def _reset_window(self, now: float) -> Dict[str, Any]:
+        return {"window_start": now, "calls": 0, "failures": 0, "slow_calls": 0}
+
+    def _roll_window(self, now: float):
+        """Start a new counting window once the current one is WINDOW_SECONDS old"""
+        with self.redis.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(self.state_key)
+                    window_start = pipe.hget(self.state_key, "window_start")
+                    if window_start is not None and now - float(window_start) <= WINDOW_SECONDS:
+                        return
+                    pipe.multi()
+                    pipe.hset(self.state_key, mapping={k: str(v) for k, v in self._reset_window(now).items()})
+                    pipe.execute()
+                    return
+                except WatchError:
+                    # Another worker counted a call or rolled the window first
+                    continue
+
+    def _count(self, now: float, latency: float, error: Optional[str] = None) -> Dict[str, str]:
+        """
+        Count one call in the current window with HINCRBY and return the
+        counters as they were right after it, read in the same transaction
+        so concurrent workers never overwrite each other's counts
+        """
+        self._roll_window(now)
+        pipe = self.redis.pipeline()
+        pipe.hincrby(self.state_key, "calls", 1)
+        if error is None:
+            pipe.hset(self.state_key, "consecutive_failures", 0)
+        else:
+            pipe.hincrby(self.state_key, "failures", 1)
+            pipe.hincrby(self.state_key, "consecutive_failures", 1)
+            pipe.hset(self.state_key, "last_error", error)
+        if latency > SLOW_CALL_SECONDS:
+            pipe.hincrby(self.state_key, "slow_calls", 1)
+        pipe.hset(self.state_key, "last_latency", round(latency, 3))
+        pipe.expire(self.state_key, CircuitBreakerConstants.STATE_TTL_SECONDS)
+        pipe.hgetall(self.state_key)
+        return self._decode(pipe.execute()[-1])
+
+    def _transition(self, from_states: Tuple[CircuitState, ...],
+                    updates: Callable[[Dict[str, str]], Dict[str, Any]]) -> bool:
+        """
+        Move the circuit to the state given by updates(current data), but
+        only if it is still in one of from_states when the write happens.
+        Returns whether this caller made the change.
+        """
+        with self.redis.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(self.state_key)
+                    data = self._decode(pipe.hgetall(self.state_key))
+                    if self._state(data) not in from_states:
+                        pipe.unwatch()
+                        return False
+                    mapping = updates(data)
+                    pipe.multi()
+                    pipe.hset(self.state_key, mapping={k: str(v) for k, v in mapping.items()})
+                    pipe.expire(self.state_key, CircuitBreakerConstants.STATE_TTL_SECONDS)
+                    if mapping["state"] != CircuitState.HALF_OPEN.value:
+                        pipe.delete(self.probe_key)
+                    pipe.execute()
+                    return True
+                except WatchError:
+                    continue
+
+    # -------------------------------
+    # Decisions
+    # -------------------------------
+    def is_open(self) -> bool:
+        """True while the provider should be skipped without being called"""
+        try:
+            data = self._load()
+            state = self._state(data)
+            if state == CircuitState.OPEN:
+                return time.time() < float(data.get("open_until", 0))
+            if state == CircuitState.HALF_OPEN:
+                # Another worker is already probing the provider
+                return bool(self.redis.exists(self.probe_key))
+            return False
+        except RedisError:
+            return False
+
+    def allow_request(self) -> bool:
+        """Check whether a call may be made now, claiming the half-open probe if needed"""
+        try:
+            data = self._load()
+            state = self._state(data)
+            if state == CircuitState.CLOSED:
+                return True
+            if state == CircuitState.OPEN and time.time() < float(data.get("open_until", 0)):
+                return False
+
+            # Backoff elapsed (or already half-open): only one probe across all workers
+            acquired = self.redis.set(
+                self.probe_key, os.getpid(), nx=True,
+                ex=CircuitBreakerConstants.HALF_OPEN_PROBE_TTL_SECONDS
+            )
+            if acquired and state == CircuitState.OPEN:
+                self._transition((CircuitState.OPEN,), lambda data: {"state": CircuitState.HALF_OPEN.value})
+            return bool(acquired)
+        except RedisError:
+            return True
+
+    def record_success(self, latency: float):
+        """Record a completed call; slow calls count towards the latency threshold"""
+        try:
+            now = time.time()
+            if self._state(self._load()) == CircuitState.HALF_OPEN:
+                self._close(now)
+                return
+
+            counts = self._count(now, latency)
+            if self._should_trip(counts):
+                self._open(now, reason=f"slow calls ({counts['slow_calls']}/{counts['calls']})")
+        except RedisError:
+            pass
+
+    def record_failure(self, error: Exception, latency: float = 0.0):
+        """Record a failed call and open the circuit when a threshold is crossed"""
+        try:
+            now = time.time()
+            retry_after = getattr(error, "retry_after", None)
+            reason = str(error)[:200]
+
+            if retry_after:
+                # The provider said when to come back, whatever state the circuit is in
+                self._open(now, reason=reason, retry_after=retry_after, from_states=tuple(CircuitState))
+                return
+            if self._state(self._load()) == CircuitState.HALF_OPEN:
+                self._open(now, reason=reason, from_states=(CircuitState.HALF_OPEN,))
+                return
+
+            counts = self._count(now, latency, error=reason)
+            if self._should_trip(counts):
+                self._open(now, reason=reason)
+        except RedisError:
+            pass
+
+    def _should_trip(self, counts: Dict[str, str]) -> bool:
+        if int(counts.get("consecutive_failures", 0)) >= CONSECUTIVE_FAILURE_THRESHOLD:
+            return True
+        calls = int(counts.get("calls", 0))
+        if calls < MIN_CALLS_IN_WINDOW:
+            return False
+        return (int(counts.get("failures", 0)) / calls >= FAILURE_RATE_THRESHOLD
+                or int(counts.get("slow_calls", 0)) / calls >= SLOW_CALL_RATE_THRESHOLD)
+
+    def _backoff(self, open_count: int) -> float:
+        """Exponential backoff with +/- jitter so workers don't probe in lockstep"""
+        delay = min(BASE_BACKOFF_SECONDS * (2 ** open_count), MAX_BACKOFF_SECONDS)
+        jitter = CircuitBreakerConstants.BACKOFF_JITTER
+        return delay * random.uniform(1 - jitter, 1 + jitter)
+
+    def _open(self, now: float, reason: str, retry_after: Optional[float] = None,
+              from_states: Tuple[CircuitState, ...] = (CircuitState.CLOSED,)):
+        """Open the circuit, unless another worker already moved it out of from_states"""
+        opened = {}
+
+        def updates(data: Dict[str, str]) -> Dict[str, Any]:
+            open_count = int(data.get("open_count", 0))
+            delay = self._backoff(open_count)
+            if retry_after:
+                delay = max(delay, float(retry_after))
+            opened["delay"] = delay
+            mapping = self._reset_window(now)
+            mapping.update({
+                "state": CircuitState.OPEN.value,
+                "open_until": now + delay,
+                "open_count": open_count + 1,
+                "consecutive_failures": 0,
+                "last_error": reason
+            })
+            return mapping
+
+        if self._transition(from_states, updates):
+            print(f"Circuit for {self.name} opened for {opened['delay']:.1f}s: {reason}")
+
+    def _close(self, now: float):
+        def updates(data: Dict[str, str]) -> Dict[str, Any]:
+            mapping = self._reset_window(now)
+            mapping.update({
+                "state": CircuitState.CLOSED.value,
+                "open_until": 0,
+                "open_count": 0,
+                "consecutive_failures": 0
+            })
+            return mapping
+
+        if self._transition((CircuitState.HALF_OPEN,), updates):
+            print(f"Circuit for {self.name} closed")
+
+    # -------------------------------
+    # TTL'd availability cache
+    # -------------------------------
+    def cached_health(self) -> Optional[bool]:
+        """Last is_available() result if it has not expired, else None"""
+        try:
+            value = self.redis.get(self.health_key)
+        except RedisError:
+            return None
+        if value is None:
+            return None
+        return value in (b"1", "1")
+
+    def cache_health(self, available: bool):
+        try:
+            self.redis.set(self.health_key, "1" if available else "0", ex=HEALTH_TTL_SECONDS)
+        except RedisError:
+            pass
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current breaker state for health reporting"""
+        try:
+            data = self._load()
+        except RedisError as e:
+            return {"state": "unknown", "message": f"Redis error: {str(e)}"}
+
+        state = self._state(data)
+        open_until = float(data.get("open_until", 0))
+        snapshot = {
+            "state": state.value,
+            "calls_in_window": int(data.get("calls", 0)),
+            "failures_in_window": int(data.get("failures", 0)),
+            "slow_calls_in_window": int(data.get("slow_calls", 0)),
+            "last_error": data.get("last_error"),
+            "healthy": self.cached_health()
+        }
+        if state == CircuitState.OPEN:
+            snapshot["open_until"] = datetime.utcfromtimestamp(open_until).isoformat()
+            snapshot["retry_in_seconds"] = max(0.0, round(open_until - time.time(), 1))
+        return snapshot
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    """Get the process-wide breaker for a provider name"""
+    if name not in _breakers:
+        _breakers[name] = CircuitBreaker(name)
+    return _breakers[name]
+
+
+def get_all_circuit_breakers() -> Dict[str, CircuitBreaker]:
+    """Breakers for every remote provider (the template fallback never fails)"""
+    return {
+        provider.value: get_circuit_breaker(provider.value)
+        for provider in LLMProvider
+        if provider != LLMProvider.TEMPLATE
+    }
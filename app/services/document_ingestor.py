@@ -0,0 +1,218 @@
+import hashlib
+import os
+import time
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import BinaryIO, Callable, Dict, Any, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from app.constants.constants import FilePaths, IngestionConstants, ErrorMessages
+from app.services.prompt_builder import estimate_tokens, compact_text, trim_to_tokens
+from app.services.storage import Storage, get_storage, shard
+
+MAX_PARALLEL = int(os.getenv("INGEST_MAX_PARALLEL", IngestionConstants.MAX_PARALLEL))
+
+
+class UploadTooLargeError(ValueError):
+    pass
+
+
+def upload_key(presentation_id: str) -> str:
+    """Storage key of an uploaded source document, kept until it has been summarized"""
+    return f"{FilePaths.UPLOADS_DIR}/{shard(presentation_id)}/{presentation_id}.txt"
+
+
+class ReceivedUpload(NamedTuple):
+    path: str  # scratch file; the caller stores or removes it
+    sha256: str
+    excerpt: str
+
+
+def receive_upload(stream: BinaryIO, storage: Optional[Storage] = None) -> ReceivedUpload:
+    """
+    Copy an upload to a scratch file in fixed-size blocks so memory stays
+    bounded, hashing it on the way so duplicate uploads can be recognized
+    """
+    storage = storage or get_storage()
+    path = storage.scratch_file(".txt")
+    digest = hashlib.sha256()
+    size = 0
+
+    try:
+        with open(path, "wb") as out:
+            while True:
+                block = stream.read(IngestionConstants.READ_CHUNK_BYTES)
+                if not block:
+                    break
+                size += len(block)
+                if size > IngestionConstants.MAX_UPLOAD_BYTES:
+                    raise UploadTooLargeError(ErrorMessages.UPLOAD_TOO_LARGE)
+                digest.update(block)
+                out.write(block)
+        if size == 0:
+            raise ValueError(ErrorMessages.EMPTY_UPLOAD)
+        return ReceivedUpload(path, digest.hexdigest(), read_excerpt(path))
+    except BaseException:
+        os.remove(path)
+        raise
+
+
+def store_upload(upload: ReceivedUpload, presentation_id: str, storage: Optional[Storage] = None) -> str:
+    """Hand a received upload to the storage backend; returns its key"""
+    storage = storage or get_storage()
+    key = upload_key(presentation_id)
+    storage.put_file(key, upload.path)
+    return key
+
+
+@contextmanager
+def local_upload(key: str, storage: Optional[Storage] = None) -> Iterator[str]:
+    """A local copy of a stored upload, removed on exit"""
+    storage = storage or get_storage()
+    path = storage.scratch_file(".txt")
+    try:
+        storage.get_file(key, path)
+        yield path
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def read_excerpt(path: str, max_chars: int = IngestionConstants.EXCERPT_CHARS) -> str:
+    """Short plain-text preview of a source document"""
+    with open(path, encoding="utf-8", errors="replace") as f:
+        return compact_text(f.read(max_chars))
+
+
+def iter_text_chunks(path: str, max_tokens: int = IngestionConstants.CHUNK_TOKENS) -> Iterator[Tuple[str, int]]:
+    """
+    Stream a text or Markdown file as token-bounded chunks, yielding
+    (chunk, characters_read_so_far). Chunks break at paragraph boundaries
+    where possible; lines are read with a size limit so a file without
+    newlines cannot pull everything into memory.
+    """
+    buffer: List[str] = []
+    buffer_tokens = 0
+    consumed = 0
+    piece_chars = max_tokens * 2
+
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for piece in iter(lambda: f.readline(piece_chars), ""):
+            consumed += len(piece)
+            is_break = not piece.strip() or piece.lstrip().startswith("#")
+            tokens = estimate_tokens(piece)
+
+            # Flush on overflow, or at a paragraph/heading once the chunk is mostly full
+            if buffer and (buffer_tokens + tokens > max_tokens or (is_break and buffer_tokens > max_tokens * 0.8)):
+                yield "".join(buffer), consumed - len(piece)
+                buffer, buffer_tokens = [], 0
+
+            if buffer or piece.strip():
+                buffer.append(piece)
+                buffer_tokens += tokens
+
+    if buffer:
+        yield "".join(buffer), consumed
+
+
+def _group_summaries(summaries: List[str], max_tokens: int) -> Iterator[Tuple[str, int]]:
+    """Pack consecutive summaries into reduce-step inputs of at most max_tokens"""
+    group: List[str] = []
+    group_tokens = 0
+    for index, summary in enumerate(summaries):
+        tokens = estimate_tokens(summary)
+        if group and group_tokens + tokens > max_tokens:
+            yield "\n\n".join(group), index
+            group, group_tokens = [], 0
+        group.append(summary)
+        group_tokens += tokens
+    if group:
+        yield "\n\n".join(group), len(summaries)
+
+
+class DocumentSummarizer:
+    """
+    Map-reduce summarization of long source documents.
+
+    Map: chunks are read lazily and summarized concurrently, with at most
+    2 x max_parallel chunks held in memory at any time.
+    Reduce: summaries are packed into groups and summarized again until the
+    combined text fits the slide-generation budget.
+    """
+
+    def __init__(self, llm_client, max_parallel: int = MAX_PARALLEL):
+        self.llm_client = llm_client
+        self.max_parallel = max(1, max_parallel)
+
+    def summarize(self, path: str, topic: str, progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        started = time.monotonic()
+        total_chars = max(1, os.path.getsize(path))
+        usage = {"prompt_tokens": 0, "completion_tokens": 0}
+
+        summaries, timings = self._map(
+            iter_text_chunks(path), topic, "map", total_chars, usage, progress
+        )
+
+        rounds = 0
+        combined = "\n\n".join(summaries)
+        while (estimate_tokens(combined) > IngestionConstants.REDUCE_TARGET_TOKENS
+               and len(summaries) > 1 and rounds < IngestionConstants.MAX_REDUCE_ROUNDS):
+            rounds += 1
+            summaries, _ = self._map(
+                _group_summaries(summaries, IngestionConstants.CHUNK_TOKENS),
+                topic, f"reduce_{rounds}", len(summaries), usage, progress
+            )
+            combined = "\n\n".join(summaries)
+
+        combined, _ = trim_to_tokens(combined, IngestionConstants.REDUCE_TARGET_TOKENS)
+        return {
+            "summary": combined,
+            "chunks": len(timings),
+            "reduce_rounds": rounds,
+            "chunk_timings": timings,
+            "usage": usage,
+            "seconds": round(time.monotonic() - started, 3)
+        }
+
+    def _summarize_chunk(self, index: int, text: str, topic: str) -> Dict[str, Any]:
+        started = time.monotonic()
+        summary, usage = self.llm_client.summarize_text(topic, text)
+        return {
+            "index": index,
+            "summary": summary,
+            "usage": usage,
+            "tokens": estimate_tokens(text),
+            "seconds": round(time.monotonic() - started, 3)
+        }
+
+    def _map(self, items: Iterable[Tuple[str, int]], topic: str, stage: str, total: int,
+             usage: Dict[str, int], progress: Optional[Callable[[Dict[str, Any]], None]]) -> Tuple[List[str], List[Dict[str, Any]]]:
+        results: Dict[int, str] = {}
+        timings: List[Dict[str, Any]] = []
+        state = {"stage": stage, "submitted": 0, "completed": 0, "percent_read": 0.0}
+
+        def collect(futures):
+            for future in futures:
+                result = future.result()
+                results[result["index"]] = result["summary"]
+                timings.append({"index": result["index"], "tokens": result["tokens"], "seconds": result["seconds"]})
+                if result["usage"]:
+                    usage["prompt_tokens"] += result["usage"]["prompt_tokens"]
+                    usage["completion_tokens"] += result["usage"]["completion_tokens"]
+                state["completed"] += 1
+                if progress:
+                    progress(dict(state))
+
+        with ThreadPoolExecutor(max_workers=self.max_parallel) as pool:
+            pending = set()
+            for index, (text, position) in enumerate(items):
+                # Bounded parallelism: wait for a slot before reading further
+                if len(pending) >= self.max_parallel * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+                pending.add(pool.submit(self._summarize_chunk, index, text, topic))
+                state["submitted"] += 1
+                state["percent_read"] = round(min(100.0, 100.0 * position / total), 1)
+            done, _ = wait(pending)
+            collect(done)
+
+        timings.sort(key=lambda t: t["index"])
+        return [results[i] for i in sorted(results)], timings
@@ -0,0 +1,166 @@
+import re
+import json
+import hashlib
+import threading
+from html import escape
+from string import Template
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+from app.constants.constants import PPTXConstants, SlideLayoutType
+from app.utils.theme_resolver import ThemeResolver
+
+PREVIEW_CACHE_SIZE = 256
+
+# Slide geometry in points; one CSS px per point keeps PPTX font sizes unchanged
+_SLIDE_SIZES = {
+    "16:9": (960, 540),
+    "4:3": (720, 540)
+}
+
+_PAGE_TEMPLATE = Template("""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>$title</title>
+<style>
+body { margin: 0; padding: 24px; background: #E7E7E7; font-family: $font_family; }
+.slide { position: relative; box-sizing: border-box; width: ${width}px; height: ${height}px;
+  margin: 0 auto 24px; padding: 36px 48px 40px; overflow: hidden; background: $background;
+  box-shadow: 0 2px 8px rgba(0, 0, 0, 0.25); }
+.slide h1, .slide h2 { margin: 0 0 18px; color: $primary; font-weight: bold; text-align: center; }
+.slide h1 { font-size: ${title_slide_size}px; margin-top: 150px; }
+.slide h2 { font-size: ${title_size}px; }
+.subtitle { color: $secondary; font-size: ${subtitle_size}px; text-align: center; }
+.subtitle p { margin: 6px 0; }
+.slide ul { margin: 0; padding-left: 28px; color: $text; font-size: ${bullet_size}px; }
+.slide li { margin-bottom: 10px; }
+.columns { display: flex; gap: 32px; }
+.columns > * { flex: 1; }
+.image-placeholder { flex: 0 0 40%; border: 2px dashed $accent; border-radius: 4px; }
+.reference { position: absolute; right: 48px; bottom: 12px; color: $reference;
+  font-size: ${reference_size}px; text-align: right; }
+details.notes { width: ${width}px; margin: -16px auto 24px; font-size: 13px; color: #555555; }
+</style>
+</head>
+<body>
+$slides
+</body>
+</html>
+""")
+
+_SLIDE_TEMPLATES = {
+    SlideLayoutType.TITLE.value: Template(
+        '<section class="slide title-slide"><h1>$title</h1>'
+        '<div class="subtitle"$body_style>$subtitle</div>$reference</section>$notes'
+    ),
+    SlideLayoutType.BULLET_POINTS.value: Template(
+        '<section class="slide"><h2>$title</h2>$bullets$reference</section>$notes'
+    ),
+    SlideLayoutType.TWO_COLUMN.value: Template(
+        '<section class="slide"><h2>$title</h2>'
+        '<div class="columns">$left$right</div>$reference</section>$notes'
+    ),
+    SlideLayoutType.CONTENT_WITH_IMAGE.value: Template(
+        '<section class="slide"><h2>$title</h2>'
+        '<div class="columns">$bullets<div class="image-placeholder"></div></div>$reference</section>$notes'
+    )
+}
+
+_UNSAFE_FONT_CHARS = re.compile(r"[^\w \-]")
+
+_preview_cache: "OrderedDict[str, str]" = OrderedDict()
+_preview_cache_lock = threading.Lock()
+
+
+def _css_color(color) -> str:
+    # RGBColor renders as 'RRGGBB'
+    return f"#{color}"
+
+
+def _bullet_list(items: List[str], style: str = "") -> str:
+    if not items:
+        return f"<ul{style}></ul>"
+    return f"<ul{style}>" + "".join(f"<li>{escape(str(item))}</li>" for item in items) + "</ul>"
+
+
+class HTMLPreviewRenderer:
+    """
+    Renders slides_data as a self-contained HTML page that mirrors the PPTX
+    layouts, colors and fonts. Output is cached by a hash of its inputs.
+    """
+
+    @staticmethod
+    def content_hash(slides_data: List[Dict[str, Any]], topic: str, config: Optional[Dict[str, Any]]) -> str:
+        payload = json.dumps(
+            {"slides": slides_data, "topic": topic, "config": config or {}},
+            sort_keys=True, separators=(",", ":"), default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def render(self, slides_data: List[Dict[str, Any]], topic: str, config: Optional[Dict[str, Any]] = None) -> Tuple[str, str]:
+        """Return (html, content_hash), serving repeated requests from the cache"""
+        digest = self.content_hash(slides_data, topic, config)
+        with _preview_cache_lock:
+            cached = _preview_cache.get(digest)
+            if cached is not None:
+                _preview_cache.move_to_end(digest)
+                return cached, digest
+
+        html = self._render(slides_data, topic, config or {})
+        with _preview_cache_lock:
+            _preview_cache[digest] = html
+            if len(_preview_cache) > PREVIEW_CACHE_SIZE:
+                _preview_cache.popitem(last=False)
+        return html, digest
+
+    def _render(self, slides_data: List[Dict[str, Any]], topic: str, config: Dict[str, Any]) -> str:
+        colors = ThemeResolver.get_theme_colors(config)
+        width, height = _SLIDE_SIZES.get(
+            config.get("aspect_ratio", PPTXConstants.DEFAULT_ASPECT_RATIO), _SLIDE_SIZES["16:9"]
+        )
+        # Like the PPTX renderer, only paint a background when one is configured
+        background = ThemeResolver.parse_hex_color(config.get("background_color"))
+
+        slides = "\n".join(self._render_slide(slide) for slide in slides_data)
+        return _PAGE_TEMPLATE.substitute(
+            title=escape(topic),
+            # Entities are not decoded inside <style>, so strip rather than escape
+            font_family=f"'{_UNSAFE_FONT_CHARS.sub('', ThemeResolver.get_font_name(config))}', sans-serif",
+            width=width,
+            height=height,
+            background=_css_color(background) if background else "#FFFFFF",
+            primary=_css_color(colors["primary"]),
+            secondary=_css_color(colors["secondary"]),
+            text=_css_color(colors.get("text", colors["secondary"])),
+            accent=_css_color(colors["accent"]),
+            reference=_css_color(ThemeResolver.get_reference_color(colors)),
+            title_slide_size=PPTXConstants.TITLE_SLIDE_FONT_SIZE,
+            title_size=PPTXConstants.TITLE_FONT_SIZE,
+            subtitle_size=PPTXConstants.SUBTITLE_FONT_SIZE,
+            bullet_size=PPTXConstants.BULLET_FONT_SIZE,
+            reference_size=PPTXConstants.REFERENCE_FONT_SIZE,
+            slides=slides
+        )
+
+    def _render_slide(self, slide_data: Dict[str, Any]) -> str:
+        slide_type = slide_data.get("slide_type", SlideLayoutType.BULLET_POINTS.value)
+        # Unknown types fall back to bullet points, as in PPTXCreator
+        template = _SLIDE_TEMPLATES.get(slide_type, _SLIDE_TEMPLATES[SlideLayoutType.BULLET_POINTS.value])
+        content = slide_data.get("content", []) or []
+        mid_point = len(content) // 2
+
+        reference = slide_data.get("reference")
+        notes = slide_data.get("notes")
+        # Auto-layout may have scaled the body text down to fit
+        font_size = slide_data.get("font_size")
+        style = f' style="font-size: {int(font_size)}px"' if font_size else ""
+        return template.substitute(
+            title=escape(str(slide_data.get("title", ""))),
+            subtitle="".join(f"<p>{escape(str(line))}</p>" for line in content),
+            body_style=style,
+            bullets=_bullet_list(content, style),
+            left=_bullet_list(content[:mid_point], style),
+            right=_bullet_list(content[mid_point:], style),
+            reference=f'<div class="reference">{escape(str(reference))}</div>' if reference else "",
+            notes=f'<details class="notes"><summary>Speaker notes</summary>{escape(str(notes))}</details>' if notes else ""
+        )
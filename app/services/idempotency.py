@@ -0,0 +1,84 @@
+import hashlib
+import json
+import os
+from typing import Optional, Tuple
+from redis.exceptions import RedisError
+from app.task_queue import redis_conn, normalize_tenant
+from app.constants.constants import IdempotencyConstants, ErrorMessages
+
+AUTO_DEDUP = os.getenv("IDEMPOTENCY_AUTO_DEDUP", str(IdempotencyConstants.AUTO_DEDUP)).lower() == "true"
+AUTO_DEDUP_WINDOW_SECONDS = int(os.getenv("IDEMPOTENCY_AUTO_DEDUP_WINDOW", IdempotencyConstants.AUTO_DEDUP_WINDOW_SECONDS))
+
+
+class IdempotencyKeyReusedError(ValueError):
+    pass
+
+
+class RequestInProgressError(RuntimeError):
+    pass
+
+
+def request_fingerprint(topic: str, content: str, num_slides: int) -> str:
+    """Hash of the fields that decide what a creation request generates"""
+    payload = json.dumps([topic, content, num_slides], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def dedup_key(fingerprint: str, idempotency_key: Optional[str] = None,
+              tenant: Optional[str] = None) -> Optional[Tuple[str, int]]:
+    """
+    Redis key and TTL a creation request is deduplicated under: the client's
+    Idempotency-Key if given, else the request fingerprint when automatic
+    dedup is enabled, else None. Keys are per tenant, so tenants never see
+    each other's presentations.
+    """
+    prefix = f"{IdempotencyConstants.REDIS_KEY_PREFIX}:{normalize_tenant(tenant)}"
+    if idempotency_key:
+        if len(idempotency_key) > IdempotencyConstants.MAX_KEY_LENGTH:
+            raise ValueError(ErrorMessages.IDEMPOTENCY_KEY_TOO_LONG)
+        digest = hashlib.sha256(idempotency_key.encode("utf-8")).hexdigest()
+        return f"{prefix}:key:{digest}", IdempotencyConstants.KEY_TTL_SECONDS
+    if AUTO_DEDUP:
+        return f"{prefix}:request:{fingerprint}", AUTO_DEDUP_WINDOW_SECONDS
+    return None
+
+
+class SingleFlight:
+    """
+    Binds a dedup key to the presentation created for it. The first caller
+    to claim a key owns it and creates the presentation; every other caller
+    gets the owner's presentation id back. The key stores the request
+    fingerprint too, so a client reusing an Idempotency-Key for a different
+    request is refused instead of being handed the wrong deck.
+    """
+
+    def __init__(self, connection=None):
+        self.redis = connection or redis_conn
+
+    def claim(self, key: str, ttl: int, presentation_id: str, fingerprint: str) -> Optional[str]:
+        """None if this caller now owns the key, else the presentation id it is bound to"""
+        while True:
+            if self.redis.set(key, f"{presentation_id}:{fingerprint}", nx=True, ex=ttl):
+                return None
+            value = self.redis.get(key)
+            if value is None:
+                # Expired or released between the two calls
+                continue
+            owner_id, owner_fingerprint = value.decode("utf-8").split(":", 1)
+            if owner_fingerprint != fingerprint:
+                raise IdempotencyKeyReusedError(ErrorMessages.IDEMPOTENCY_KEY_REUSED)
+            return owner_id
+
+    def release(self, key: str, presentation_id: str):
+        """Unbind the key, unless it has meanwhile been bound to another presentation"""
+        with self.redis.pipeline() as pipe:
+            try:
+                pipe.watch(key)
+                value = pipe.get(key)
+                if value is not None and value.decode("utf-8").startswith(f"{presentation_id}:"):
+                    pipe.multi()
+                    pipe.delete(key)
+                    pipe.execute()
+            except RedisError:
+                # Best effort: an unreleased key expires with its TTL
+                pass
@@ -1,32 +1,131 @@
 import openai
+import math
 import os
 import json
+import time
 import httpx
-from typing import List, Dict, Any
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, Tuple
 from dotenv import load_dotenv
 from abc import ABC, abstractmethod
+from app.constants.constants import LLMConstants, IngestionConstants, SlideLayoutType, LLMProvider as ProviderName
+from app.schemas.presentation_schema import SlideData
+from app.services.circuit_breaker import get_circuit_breaker
+from app.services.cancellation import CancellationToken
+from app.services.provider_router import ProviderRouter, FAILOVER
+from app.services.prompt_builder import (
+    PromptBuilder,
+    BuiltPrompt,
+    SLIDE_FIELDS,
+    estimate_tokens,
+    compact_text,
+    trim_to_tokens
+)
 
 load_dotenv()
 
+# Responses are streamed, so the read timeout bounds the wait for each chunk
+# and with it how long a cancelled call can take to notice
+PROVIDER_TIMEOUT = httpx.Timeout(
+    float(os.getenv("LLM_READ_TIMEOUT_SECONDS", LLMConstants.READ_TIMEOUT_SECONDS)),
+    connect=LLMConstants.CONNECT_TIMEOUT_SECONDS
+)
+
+# -------------------------------
+# Provider errors
+# -------------------------------
+class ProviderError(Exception):
+    """A provider call failed; carries the HTTP status and any Retry-After hint"""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @staticmethod
+    def parse_retry_after(headers) -> Optional[float]:
+        value = headers.get("retry-after") if headers is not None else None
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            # HTTP-date form
+            from email.utils import parsedate_to_datetime
+            try:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                return None
+
+    @classmethod
+    def from_response(cls, provider: str, response: httpx.Response) -> "ProviderError":
+        return cls(
+            f"{provider} returned HTTP {response.status_code}",
+            status_code=response.status_code,
+            retry_after=cls.parse_retry_after(response.headers)
+        )
+
+
+# -------------------------------
+# Completion result
+# -------------------------------
+@dataclass
+class Completion:
+    """Provider output plus the metadata needed for continuation and accounting"""
+    text: str
+    finish_reason: Optional[str] = None
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+
+    @property
+    def truncated(self) -> bool:
+        return self.finish_reason == "length"
+
+
 # -------------------------------
 # Abstract Base for LLM Providers
 # -------------------------------
 class LLMProvider(ABC):
+    name: str = ""
+    model: str = ""
+
     @abstractmethod
-    def generate_completion(self, prompt: str, system_prompt: str) -> str:
+    def generate_completion(self, prompt: str, system_prompt: str, max_tokens: int = LLMConstants.MAX_COMPLETION_TOKENS, partial: str = "",
+                            cancel_token: Optional[CancellationToken] = None) -> Completion:
+        """
+        Generate a completion. When `partial` is given, the model is asked to
+        continue that earlier (truncated) output rather than start over.
+        The response is streamed and cancel_token is checked between chunks;
+        a cancelled call closes its connection, which stops the generation.
+        """
         pass
 
     @abstractmethod
     def is_available(self) -> bool:
         pass
 
+    @staticmethod
+    def _check_cancelled(cancel_token: Optional[CancellationToken]):
+        if cancel_token:
+            cancel_token.check()
+
+    @staticmethod
+    def _continuation_prompt(prompt: str, partial: str) -> str:
+        """Single-string form of a continuation for non-chat endpoints"""
+        if not partial:
+            return prompt
+        return f"{prompt}\n\n{LLMConstants.CONTINUATION_PROMPT}\n\n{partial}"
+
 # -------------------------------
 # OpenAI Provider
 # -------------------------------
 class OpenAIProvider(LLMProvider):
+    name = ProviderName.OPENAI.value
+
     def __init__(self):
         api_key = os.getenv("OPENAI_API_KEY")
-        self.client = openai.OpenAI(api_key=api_key) if api_key else None
+        self.model = os.getenv("OPENAI_MODEL", LLMConstants.OPENAI_DEFAULT_MODEL)
+        self.client = openai.OpenAI(api_key=api_key, timeout=PROVIDER_TIMEOUT) if api_key else None
 
     def is_available(self) -> bool:
         if not self.client:
@@ -37,26 +136,65 @@ class OpenAIProvider(LLMProvider):
         except Exception:
             return False
 
-    def generate_completion(self, prompt: str, system_prompt: str) -> str:
-        response = self.client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=2000
+    def generate_completion(self, prompt: str, system_prompt: str, max_tokens: int = LLMConstants.MAX_COMPLETION_TOKENS, partial: str = "",
+                            cancel_token: Optional[CancellationToken] = None) -> Completion:
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt}
+        ]
+        if partial:
+            messages.append({"role": "assistant", "content": partial})
+            messages.append({"role": "user", "content": LLMConstants.CONTINUATION_PROMPT})
+
+        try:
+            stream = self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=0.7,
+                max_tokens=max_tokens,
+                stream=True,
+                # The last chunk then carries the token counts
+                extra_body={"stream_options": {"include_usage": True}}
+            )
+        except openai.APIStatusError as e:
+            raise ProviderError(
+                f"openai returned HTTP {e.status_code}",
+                status_code=e.status_code,
+                retry_after=ProviderError.parse_retry_after(e.response.headers)
+            ) from e
+
+        pieces = []
+        finish_reason = None
+        usage = None
+        try:
+            for chunk in stream:
+                self._check_cancelled(cancel_token)
+                if chunk.choices:
+                    pieces.append(chunk.choices[0].delta.content or "")
+                    finish_reason = chunk.choices[0].finish_reason or finish_reason
+                usage = getattr(chunk, "usage", None) or usage
+        finally:
+            stream.response.close()
+
+        if isinstance(usage, dict):
+            usage = openai.types.CompletionUsage(**usage)
+        return Completion(
+            text="".join(pieces),
+            finish_reason=finish_reason,
+            prompt_tokens=usage.prompt_tokens if usage else None,
+            completion_tokens=usage.completion_tokens if usage else None
         )
-        return response.choices[0].message.content
 
 # -------------------------------
 # Ollama Local Provider
 # -------------------------------
 class OllamaProvider(LLMProvider):
+    name = ProviderName.OLLAMA.value
+
     def __init__(self, model: str = "mistral", base_url: str = "http://localhost:11434"):
         self.model = model
         self.base_url = base_url
-        self.client = httpx.Client(timeout=30.0)
+        self.client = httpx.Client(timeout=PROVIDER_TIMEOUT)
 
     def is_available(self) -> bool:
         try:
@@ -65,18 +203,45 @@ class OllamaProvider(LLMProvider):
         except Exception:
             return False
 
-    def generate_completion(self, prompt: str, system_prompt: str) -> str:
-        full_prompt = f"{system_prompt}\n\n{prompt}"
-        response = self.client.post(
+    def generate_completion(self, prompt: str, system_prompt: str, max_tokens: int = LLMConstants.MAX_COMPLETION_TOKENS, partial: str = "",
+                            cancel_token: Optional[CancellationToken] = None) -> Completion:
+        pieces = []
+        result = {}
+        # One JSON object per line; the last one (done) carries the counts
+        with self.client.stream(
+            "POST",
             f"{self.base_url}/api/generate",
-            json={"model": self.model, "prompt": full_prompt, "stream": False}
+            json={
+                "model": self.model,
+                "system": system_prompt,
+                "prompt": self._continuation_prompt(prompt, partial),
+                "stream": True,
+                "options": {"num_predict": max_tokens}
+            }
+        ) as response:
+            if response.status_code >= 400:
+                raise ProviderError.from_response(self.name, response)
+            for line in response.iter_lines():
+                self._check_cancelled(cancel_token)
+                if not line:
+                    continue
+                result = json.loads(line)
+                if result.get("error"):
+                    raise ProviderError(f"ollama returned an error: {result['error']}")
+                pieces.append(result.get("response", ""))
+        return Completion(
+            text="".join(pieces),
+            finish_reason=result.get("done_reason"),
+            prompt_tokens=result.get("prompt_eval_count"),
+            completion_tokens=result.get("eval_count")
         )
-        return response.json()["response"]
 
 # -------------------------------
 # HuggingFace Inference Provider
 # -------------------------------
 class HuggingFaceProvider(LLMProvider):
+    name = ProviderName.HUGGINGFACE.value
+
     def __init__(self, model: str = "mistralai/Mixtral-8x7B-Instruct-v0.1"):
         self.api_key = os.getenv("HUGGINGFACE_API_KEY")
         self.model = model
@@ -86,39 +251,63 @@ class HuggingFaceProvider(LLMProvider):
     def is_available(self) -> bool:
         return bool(self.api_key)
 
-    def generate_completion(self, prompt: str, system_prompt: str) -> str:
-        client = httpx.Client(timeout=60.0)
-        full_prompt = f"{system_prompt}\n\n{prompt}"
-        response = client.post(
+    def generate_completion(self, prompt: str, system_prompt: str, max_tokens: int = LLMConstants.MAX_COMPLETION_TOKENS, partial: str = "",
+                            cancel_token: Optional[CancellationToken] = None) -> Completion:
+        full_prompt = f"{system_prompt}\n\n{self._continuation_prompt(prompt, partial)}"
+        pieces = []
+        details = {}
+        # Server-sent events, one per token; the last one carries the details
+        with httpx.Client(timeout=PROVIDER_TIMEOUT) as client, client.stream(
+            "POST",
             f"{self.base_url}/{self.model}",
             headers=self.headers,
             json={
                 "inputs": full_prompt,
                 "parameters": {
-                    "max_new_tokens": 2000,
+                    "max_new_tokens": max_tokens,
                     "temperature": 0.7,
-                    "return_full_text": False
-                }
+                    "return_full_text": False,
+                    "details": True
+                },
+                "stream": True
             }
+        ) as response:
+            if response.status_code >= 400:
+                raise ProviderError.from_response(self.name, response)
+            for line in response.iter_lines():
+                self._check_cancelled(cancel_token)
+                if not line.startswith("data:"):
+                    continue
+                event = json.loads(line[len("data:"):])
+                if event.get("error"):
+                    raise ProviderError(f"huggingface returned an error: {event['error']}")
+                token = event.get("token") or {}
+                if not token.get("special"):
+                    pieces.append(token.get("text", ""))
+                details = event.get("details") or details
+        return Completion(
+            text="".join(pieces),
+            finish_reason=details.get("finish_reason"),
+            completion_tokens=details.get("generated_tokens")
         )
-        result = response.json()
-        if isinstance(result, list) and result:
-            return result[0].get("generated_text", "")
-        return ""
 
 # -------------------------------
 # LLM Client Wrapper
 # -------------------------------
 class LLMClient:
-    def __init__(self):
+    def __init__(self, cancel_token: Optional[CancellationToken] = None):
+        # Provider calls are aborted once the token's job is cancelled
+        self.cancel_token = cancel_token
         self.providers = [
             OpenAIProvider(),
             HuggingFaceProvider(),
             OllamaProvider()
         ]
+        self.breakers = {p.name: get_circuit_breaker(p.name) for p in self.providers}
+        self.router = ProviderRouter()
         self.active_provider = None
         for provider in self.providers:
-            if provider.is_available():
+            if self._is_provider_healthy(provider):
                 self.active_provider = provider
                 print(f"Using LLM provider: {provider.__class__.__name__}")
                 break
@@ -126,102 +315,125 @@ class LLMClient:
         if not self.active_provider:
             print("Warning: No LLM provider available, using fallback content")
 
-    def generate_slide_content(self, topic: str, content: str, num_slides: int, config: dict = None) -> List[Dict[str, Any]]:
-        actual_slides = max(num_slides, 3)
-
-        # Create example JSON to show expected format
-        example_json = json.dumps([
-            {
-                "title": "Introduction to Machine Learning",
-                "slide_type": "title",
-                "content": ["Understanding AI and ML", "Key concepts and applications", "What we'll cover today"],
-                "notes": "Welcome everyone. Today we'll explore the fundamentals of machine learning.",
-                "reference": "source: Stanford CS229"
-            },
-            {
-                "title": "What is Machine Learning?",
-                "slide_type": "bullet_points",
-                "content": [
-                    "Subset of artificial intelligence",
-                    "Systems learn from data without explicit programming",
-                    "Improves performance through experience",
-                    "Used in recommendation systems, image recognition, and more"
-                ],
-                "notes": "Machine learning is transforming how we interact with technology daily.",
-                "reference": "ref: Mitchell, 1997"
-            },
-            {
-                "title": "References",
-                "slide_type": "bullet_points",
-                "content": ["source: Stanford CS229", "ref: Mitchell, 1997"],
-                "notes": "Sources used in this presentation.",
-                "reference": "Generated by AI"
-            }
-        ], indent=2)
+        self.prompt_builder = PromptBuilder()
+        self.last_usage: Optional[Dict[str, Any]] = None
 
-        prompt = f"""
-Create a presentation on "{topic}" using this content: "{content}".
-Generate exactly {actual_slides} slides.
+    def _is_provider_healthy(self, provider: LLMProvider) -> bool:
+        """Skip providers with an open circuit; otherwise use the TTL'd availability check"""
+        breaker = self.breakers[provider.name]
+        if breaker.is_open():
+            return False
 
-IMPORTANT: Return ONLY a valid JSON array. No explanations, no markdown, just the JSON array.
+        cached = breaker.cached_health()
+        if cached is not None:
+            return cached
 
-Required structure for EVERY slide:
-- title: string
-- slide_type: string (one of: "title", "bullet_points", "two_column", "content_with_image")
-- content: array of strings (bullet points)
-- notes: string (speaker notes)
-- reference: string (source citation, max 50 chars)
+        available = provider.is_available()
+        breaker.cache_health(available)
+        return available
 
-Rules:
-1. First slide: slide_type MUST be "title"
-2. Last slide: title MUST be "References", slide_type MUST be "bullet_points"
-3. Middle slides: vary between "bullet_points", "two_column", "content_with_image"
+    def _call_provider(self, provider: LLMProvider, built: BuiltPrompt, partial: str = "", max_tokens: Optional[int] = None) -> Completion:
+        """Call a provider and report the outcome to its circuit breaker and the router"""
+        breaker = self.breakers[provider.name]
+        started = time.monotonic()
+        LLMProvider._check_cancelled(self.cancel_token)
+        try:
+            completion = provider.generate_completion(
+                built.prompt, built.system_prompt,
+                max_tokens=max_tokens or built.max_tokens,
+                partial=partial,
+                cancel_token=self.cancel_token
+            )
+        except Exception as e:
+            breaker.record_failure(e, time.monotonic() - started)
+            self.router.record(provider.name, provider.model, time.monotonic() - started, 0, success=False)
+            raise
+        elapsed = time.monotonic() - started
+        breaker.record_success(elapsed)
+        self.router.record(provider.name, provider.model, elapsed,
+                           completion.completion_tokens or estimate_tokens(completion.text), success=True)
+        return completion
+
+    def _candidate_providers(self, expected_tokens: int):
+        """
+        Healthy providers in the router's order for a job of expected_tokens
+        output tokens; providers with open circuits are skipped
+        """
+        if not self.active_provider:
+            return
+        healthy = [p for p in self.providers if p == self.active_provider or self._is_provider_healthy(p)]
+        ranked, reason = self.router.rank(healthy, expected_tokens)
+        for provider in ranked:
+            if not self.breakers[provider.name].allow_request():
+                print(f"Skipping {provider.__class__.__name__}: circuit open")
+                continue
+            self.router.record_decision(provider, reason)
+            # Every later provider is only tried after the earlier ones failed
+            reason = FAILOVER
+            yield provider
+
+    def _complete(self, provider: LLMProvider, built: BuiltPrompt) -> Tuple[str, Dict[str, Any]]:
+        """
+        Run a prompt to completion, asking the provider to continue when the
+        output is cut off at max_tokens instead of starting over.
+        """
+        usage = {
+            "provider": provider.name,
+            "model": provider.model,
+            "max_tokens": built.max_tokens,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "continuations": 0,
+            "content_truncated": built.content_truncated
+        }
+        text = ""
+        max_tokens = built.max_tokens
+        for attempt in range(LLMConstants.MAX_CONTINUATIONS + 1):
+            completion = self._call_provider(provider, built, partial=text, max_tokens=max_tokens)
+            text += completion.text
+            usage["prompt_tokens"] += completion.prompt_tokens or (built.prompt_tokens + estimate_tokens(text) - estimate_tokens(completion.text))
+            usage["completion_tokens"] += completion.completion_tokens or estimate_tokens(completion.text)
+            if not completion.truncated:
+                break
+            if attempt == LLMConstants.MAX_CONTINUATIONS:
+                raise ValueError(f"Output still truncated after {attempt} continuations")
+            usage["continuations"] += 1
+            # The remainder is usually small; don't re-request the full budget
+            max_tokens = max(LLMConstants.MIN_COMPLETION_TOKENS, built.max_tokens // 2)
+            print(f"{provider.__class__.__name__} hit max_tokens, requesting continuation {usage['continuations']}")
 
-Example of expected JSON format:
-{example_json}
+        return text, usage
 
-Generate the JSON array now:"""
+    def generate_slide_content(self, topic: str, content: str, num_slides: int, config: dict = None) -> List[Dict[str, Any]]:
+        actual_slides = max(num_slides, 3)
+        config = config or {}
 
-        system_prompt = "You are a presentation expert. Output ONLY valid JSON. No markdown, no explanation, just the JSON array."
+        # Only ask for (and budget tokens for) the fields the deck will use
+        fields = tuple(
+            field for field in SLIDE_FIELDS
+            if field != "notes" or config.get("include_speaker_notes", True)
+        )
+        self.last_usage = None
 
         if not self.active_provider:
             return self._generate_fallback_content(topic, actual_slides)
+        if actual_slides > LLMConstants.SLIDES_PER_CALL:
+            return self._generate_in_sections(topic, content, actual_slides, config)
 
-        for provider in [self.active_provider] + [p for p in self.providers if p != self.active_provider and p.is_available()]:
+        for provider in self._candidate_providers(self.prompt_builder.completion_budget(actual_slides, fields)):
             try:
-                output = provider.generate_completion(prompt, system_prompt).strip()
+                built = self.prompt_builder.build_slides_prompt(
+                    topic, content, actual_slides, fields=fields, model=provider.model
+                )
+                output, self.last_usage = self._complete(provider, built)
+                output = output.strip()
                 
                 # Debug print
                 print(f"Raw output from {provider.__class__.__name__}:")
                 print(output[:500] + "..." if len(output) > 500 else output)
 
-                # Clean up common issues
-                output = output.strip()
-                
-                # Remove markdown code blocks
-                if "```json" in output:
-                    start = output.find("```json") + 7
-                    end = output.rfind("```")
-                    if end > start:
-                        output = output[start:end].strip()
-                elif "```" in output:
-                    start = output.find("```") + 3
-                    end = output.rfind("```")
-                    if end > start:
-                        output = output[start:end].strip()
-                
-                # Remove any text before the first [
-                first_bracket = output.find('[')
-                if first_bracket > 0:
-                    output = output[first_bracket:]
-                
-                # Remove any text after the last ]
-                last_bracket = output.rfind(']')
-                if last_bracket > 0 and last_bracket < len(output) - 1:
-                    output = output[:last_bracket + 1]
-
                 # Try to parse JSON
-                slides = json.loads(output)
+                slides = json.loads(self._extract_json(output, "[", "]"))
                 
                 # Validate it's a list
                 if not isinstance(slides, list):
@@ -257,21 +469,10 @@ Generate the JSON array now:"""
                     })
 
                 # Validate all required fields exist
-                for i, slide in enumerate(slides):
-                    required_fields = ["title", "slide_type", "content", "notes", "reference"]
-                    for field in required_fields:
-                        if field not in slide:
-                            if field == "content":
-                                slide[field] = ["Content placeholder"]
-                            elif field == "notes":
-                                slide[field] = "Speaker notes"
-                            elif field == "reference":
-                                slide[field] = "ref: AI-generated"
-                            else:
-                                slide[field] = f"Slide {i+1}"
+                self._fill_missing_fields(slides, fields)
 
                 self.active_provider = provider
-                print(f"Successfully used provider: {provider.__class__.__name__}")
+                print(f"Successfully used provider: {provider.__class__.__name__} ({self.last_usage})")
                 return slides
 
             except Exception as e:
@@ -281,6 +482,214 @@ Generate the JSON array now:"""
         print("All providers failed, using fallback content")
         return self._generate_fallback_content(topic, actual_slides)
 
+    @staticmethod
+    def _fill_missing_fields(slides: List[Dict[str, Any]], fields: Tuple[str, ...], first_position: int = 0):
+        for i, slide in enumerate(slides, first_position):
+            required_fields = ["title", "slide_type", "content", "notes", "reference"]
+            for field in required_fields:
+                if field not in slide:
+                    if field == "content":
+                        slide[field] = ["Content placeholder"]
+                    elif field == "notes":
+                        slide[field] = "Speaker notes" if "notes" in fields else ""
+                    elif field == "reference":
+                        slide[field] = "ref: AI-generated"
+                    else:
+                        slide[field] = f"Slide {i+1}"
+
+    def _generate_in_sections(self, topic: str, content: str, num_slides: int, config: dict) -> List[Dict[str, Any]]:
+        """
+        Generate a deck too large for one completion in sections of at most
+        SLIDES_PER_CALL slides. The first section is a normal deck opening
+        with the title slide; every later one is asked for body slides only,
+        given the titles written so far so it continues rather than starts
+        over. The References slide is built once, at the end.
+        """
+        fields = tuple(
+            field for field in SLIDE_FIELDS
+            if field != "notes" or config.get("include_speaker_notes", True)
+        )
+        # The first call's References slide is dropped, so it yields SLIDES_PER_CALL - 1 slides
+        remaining = num_slides - LLMConstants.SLIDES_PER_CALL
+        sections = 1 + math.ceil(remaining / LLMConstants.SLIDES_PER_CALL)
+        sizes = [remaining // (sections - 1) + (1 if number < remaining % (sections - 1) else 0)
+                 for number in range(sections - 1)]
+
+        slides = self.generate_slide_content(topic, content, LLMConstants.SLIDES_PER_CALL, config)[:-1]
+        slides[0]["title"] = topic
+        usage = {**self.last_usage, "sections": sections} if self.last_usage else None
+        for number, size in enumerate(sizes, 2):
+            slides.extend(self._generate_section(topic, content, size, slides, number, sections, fields))
+            if self.last_usage and usage is None:
+                usage = {**self.last_usage, "sections": sections}
+            elif self.last_usage:
+                for key in ("prompt_tokens", "completion_tokens", "continuations"):
+                    usage[key] += self.last_usage[key]
+
+        references = list(dict.fromkeys(slide["reference"] for slide in slides if slide.get("reference")))
+        slides.append({
+            "title": LLMConstants.REFERENCES_TITLE,
+            "slide_type": SlideLayoutType.BULLET_POINTS.value,
+            "content": references[:LLMConstants.MAX_REFERENCES] or ["Generated by AI"],
+            "notes": "Sources used in this presentation." if "notes" in fields else "",
+            "reference": "Generated by AI"
+        })
+        self.last_usage = usage
+        return self._unique_titles(slides)
+
+    def _generate_section(self, topic: str, content: str, num_slides: int, previous: List[Dict[str, Any]],
+                          section: int, sections: int, fields: Tuple[str, ...]) -> List[Dict[str, Any]]:
+        """num_slides body slides continuing the previous slides; placeholders if every provider fails"""
+        self.last_usage = None
+        titles = [slide.get("title", "") for slide in previous]
+        body_types = {SlideLayoutType.BULLET_POINTS.value, SlideLayoutType.TWO_COLUMN.value,
+                      SlideLayoutType.CONTENT_WITH_IMAGE.value}
+
+        for provider in self._candidate_providers(self.prompt_builder.completion_budget(num_slides, fields)):
+            try:
+                built = self.prompt_builder.build_section_prompt(
+                    topic, content, num_slides, titles, section, sections, fields=fields, model=provider.model
+                )
+                output, self.last_usage = self._complete(provider, built)
+                slides = json.loads(self._extract_json(output.strip(), "[", "]"))
+                if not isinstance(slides, list):
+                    raise ValueError("Output is not a JSON array")
+
+                # Models sometimes open each part like a deck of its own
+                slides = [
+                    slide for slide in slides
+                    if isinstance(slide, dict)
+                    and slide.get("slide_type") != LLMConstants.TITLE_SLIDE_TYPE
+                    and slide.get("title") != LLMConstants.REFERENCES_TITLE
+                ][:num_slides]
+                for slide in slides:
+                    if slide.get("slide_type") not in body_types:
+                        slide["slide_type"] = SlideLayoutType.BULLET_POINTS.value
+                slides += self._placeholder_slides(topic, num_slides - len(slides), len(previous) + len(slides))
+                self._fill_missing_fields(slides, fields, len(previous))
+
+                print(f"Generated section {section} of {sections} with {provider.__class__.__name__} ({self.last_usage})")
+                return slides
+
+            except Exception as e:
+                print(f"Error generating section {section} with provider {provider.__class__.__name__}: {e}")
+                continue
+
+        print(f"All providers failed for section {section}, using fallback content")
+        slides = self._placeholder_slides(topic, num_slides, len(previous))
+        self._fill_missing_fields(slides, fields, len(previous))
+        return slides
+
+    @staticmethod
+    def _placeholder_slides(topic: str, count: int, first_position: int) -> List[Dict[str, Any]]:
+        """Body slides numbered by their position in the deck, so no two share a title"""
+        return [{
+            "title": f"Key Point {position}",
+            "slide_type": SlideLayoutType.BULLET_POINTS.value,
+            "content": [
+                f"Important aspect of {topic}",
+                "Supporting evidence",
+                "Practical applications"
+            ],
+            "notes": "Additional content for completeness",
+            "reference": "ref: AI-generated"
+        } for position in range(first_position, first_position + count)]
+
+    @staticmethod
+    def _unique_titles(slides: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Number repeated titles ("Benefits (2)"), which sections written apart can still produce"""
+        seen: Dict[str, int] = {}
+        for slide in slides:
+            title = slide.get("title", "")
+            seen[title] = seen.get(title, 0) + 1
+            if seen[title] > 1:
+                slide["title"] = f"{title} ({seen[title]})"
+        return slides
+
+    def regenerate_slide(self, topic: str, content: str, slides: List[Dict[str, Any]], index: int,
+                         instructions: Optional[str] = None, config: dict = None) -> Optional[Dict[str, Any]]:
+        """
+        Regenerate a single slide with a small prompt carrying the deck title and
+        neighboring slide titles. Returns None if no provider produced a valid slide.
+        """
+        config = config or {}
+        fields = tuple(
+            field for field in SLIDE_FIELDS
+            if field != "notes" or config.get("include_speaker_notes", True)
+        )
+        self.last_usage = None
+
+        for provider in self._candidate_providers(self.prompt_builder.completion_budget(1, fields)):
+            try:
+                built = self.prompt_builder.build_slide_prompt(
+                    topic, content, slides, index, instructions, fields=fields, model=provider.model
+                )
+                output, self.last_usage = self._complete(provider, built)
+                slide = json.loads(self._extract_json(output.strip(), "{", "}"))
+                if not isinstance(slide, dict):
+                    raise ValueError("Output is not a JSON object")
+
+                slide.setdefault("notes", "")
+                slide.setdefault("reference", slides[index].get("reference", ""))
+                # Validate against the same schema the API exposes for slides
+                slide = SlideData(**slide).dict()
+                if slide["slide_type"] not in {layout.value for layout in SlideLayoutType}:
+                    slide["slide_type"] = slides[index].get("slide_type", SlideLayoutType.BULLET_POINTS.value)
+
+                print(f"Regenerated slide {index} with {provider.__class__.__name__} ({self.last_usage})")
+                return slide
+
+            except Exception as e:
+                print(f"Error regenerating slide with provider {provider.__class__.__name__}: {e}")
+                continue
+
+        return None
+
+    @staticmethod
+    def _extract_json(output: str, opening: str, closing: str) -> str:
+        """Strip markdown code fences and any text around the outermost JSON value"""
+        if "```json" in output:
+            start = output.find("```json") + 7
+            end = output.rfind("```")
+            if end > start:
+                output = output[start:end].strip()
+        elif "```" in output:
+            start = output.find("```") + 3
+            end = output.rfind("```")
+            if end > start:
+                output = output[start:end].strip()
+
+        # Remove any text before the first opening bracket
+        first_bracket = output.find(opening)
+        if first_bracket > 0:
+            output = output[first_bracket:]
+
+        # Remove any text after the last closing bracket
+        last_bracket = output.rfind(closing)
+        if last_bracket > 0 and last_bracket < len(output) - 1:
+            output = output[:last_bracket + 1]
+        return output
+
+    def summarize_text(self, topic: str, text: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """
+        Summarize one chunk of source material. Safe to call from several
+        threads at once; falls back to an extractive summary when no provider
+        is available.
+        """
+        for provider in self._candidate_providers(IngestionConstants.SUMMARY_TOKENS):
+            try:
+                built = self.prompt_builder.build_summary_prompt(topic, text, model=provider.model)
+                summary, usage = self._complete(provider, built)
+                summary = summary.strip()
+                if summary:
+                    return summary, usage
+            except Exception as e:
+                print(f"Error summarizing with provider {provider.__class__.__name__}: {e}")
+                continue
+
+        summary, _ = trim_to_tokens(compact_text(text), IngestionConstants.SUMMARY_TOKENS)
+        return summary, None
+
     def _generate_fallback_content(self, topic: str, num_slides: int) -> List[Dict[str, Any]]:
         slides = []
 
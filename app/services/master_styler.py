@@ -0,0 +1,162 @@
+from functools import lru_cache
+from typing import Dict, Any, NamedTuple, Optional
+from lxml import etree
+from pptx import Presentation
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from pptx.util import Pt
+from app.constants.constants import PPTXConstants
+from app.utils.theme_resolver import ThemeResolver
+
+_A = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+_P = "{http://schemas.openxmlformats.org/presentationml/2006/main}"
+
+# Scheme slots the theme colors are written to; the clrMap maps tx1 -> dk1 and tx2 -> dk2
+_TITLE_SCHEME_COLOR = "tx2"
+_SUBTITLE_SCHEME_COLOR = "accent2"
+_TEXT_SCHEME_COLOR = "tx1"
+
+
+def _fill(parent, scheme_color: str):
+    """Replace parent's fill with a scheme color reference"""
+    for fill in parent.findall(f"{_A}solidFill"):
+        parent.remove(fill)
+    fill = etree.Element(f"{_A}solidFill")
+    etree.SubElement(fill, f"{_A}schemeClr", val=scheme_color)
+    # Fills precede the font elements in a:defRPr
+    parent.insert(0, fill)
+
+
+def _set_color(scheme, slot: str, rgb: str):
+    slot_element = scheme.find(f"{_A}{slot}")
+    for color in list(slot_element):
+        slot_element.remove(color)
+    etree.SubElement(slot_element, f"{_A}srgbClr", val=rgb)
+
+
+def _level_one_run_properties(placeholder_shape):
+    """a:defRPr of the first list level in a layout placeholder's lstStyle, created if missing"""
+    list_style = placeholder_shape.find(f"{_P}txBody/{_A}lstStyle")
+    level = list_style.find(f"{_A}lvl1pPr")
+    if level is None:
+        level = etree.Element(f"{_A}lvl1pPr")
+        list_style.insert(0, level)
+    run_properties = level.find(f"{_A}defRPr")
+    if run_properties is None:
+        run_properties = etree.SubElement(level, f"{_A}defRPr")
+    return run_properties
+
+
+@lru_cache(maxsize=None)
+def _template_theme() -> bytes:
+    return Presentation().slide_master.part.part_related_by(RT.THEME).blob
+
+
+class MasterStyle(NamedTuple):
+    """
+    A render config's theme, written once into the package instead of on
+    every run: colors go to the theme's color scheme, the font to its font
+    scheme, and sizes, weights and alignment to the slide master text styles
+    and the few layouts PPTXCreator uses. Runs then only carry properties
+    that differ from these defaults, such as an auto-layout font size.
+    """
+    font: str
+    title_color: str
+    subtitle_color: str
+    text_color: str
+    accent_color: str
+    background_color: Optional[str]
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> "MasterStyle":
+        config = config or {}
+        colors = ThemeResolver.get_theme_colors(config)
+        font_name = ThemeResolver.get_font_name(config)
+        background = config.get("background_color")
+        background_rgb = ThemeResolver.parse_hex_color(background) if isinstance(background, str) else None
+        return cls(
+            font=font_name if isinstance(font_name, str) and font_name else PPTXConstants.DEFAULT_FONT,
+            title_color=str(colors["primary"]),
+            subtitle_color=str(colors["secondary"]),
+            text_color=str(colors["text"] if "text" in colors else colors["secondary"]),
+            accent_color=str(colors["accent"]),
+            background_color=str(background_rgb) if background_rgb is not None else None
+        )
+
+    def apply(self, presentation):
+        """Write the style into a new python-pptx Presentation built from the default template"""
+        master = presentation.slide_master
+        theme_part = master.part.part_related_by(RT.THEME)
+        theme_part.blob = self._theme_xml(theme_part.blob)
+        self._style_master(master._element)
+
+        layouts = presentation.slide_layouts
+        self._style_layout(layouts[PPTXConstants.TITLE_LAYOUT_INDEX]._element, {
+            "ctrTitle": (PPTXConstants.TITLE_SLIDE_FONT_SIZE, None),
+            "subTitle": (PPTXConstants.SUBTITLE_FONT_SIZE, _SUBTITLE_SCHEME_COLOR)
+        })
+        # The two-column layout shrinks its bodies below the master size
+        self._style_layout(layouts[PPTXConstants.TWO_COLUMN_LAYOUT_INDEX]._element, {
+            "body": (PPTXConstants.BULLET_FONT_SIZE, None)
+        })
+
+    def theme_xml(self) -> bytes:
+        """The theme part a deck rendered with this style contains"""
+        return self._theme_xml(_template_theme())
+
+    # -------------------------------
+    # Theme part
+    # -------------------------------
+    def _theme_xml(self, blob: bytes) -> bytes:
+        theme = etree.fromstring(blob)
+        elements = theme.find(f"{_A}themeElements")
+
+        scheme = elements.find(f"{_A}clrScheme")
+        _set_color(scheme, "dk1", self.text_color)
+        _set_color(scheme, "dk2", self.title_color)
+        _set_color(scheme, "accent1", self.accent_color)
+        _set_color(scheme, "accent2", self.subtitle_color)
+        if self.background_color:
+            # The master background is bg1, which maps to lt1
+            _set_color(scheme, "lt1", self.background_color)
+
+        fonts = elements.find(f"{_A}fontScheme")
+        for font in ("majorFont", "minorFont"):
+            fonts.find(f"{_A}{font}/{_A}latin").set("typeface", self.font)
+
+        return etree.tostring(theme, xml_declaration=True, encoding="UTF-8", standalone=True)
+
+    # -------------------------------
+    # Slide master and layouts
+    # -------------------------------
+    @staticmethod
+    def _style_master(master):
+        styles = master.find(f"{_P}txStyles")
+
+        title = styles.find(f"{_P}titleStyle/{_A}lvl1pPr")
+        title.set("algn", "ctr")
+        title_run = title.find(f"{_A}defRPr")
+        title_run.set("sz", str(Pt(PPTXConstants.TITLE_FONT_SIZE).centipoints))
+        title_run.set("b", "1")
+        _fill(title_run, _TITLE_SCHEME_COLOR)
+
+        body = styles.find(f"{_P}bodyStyle/{_A}lvl1pPr")
+        body.set("algn", "l")
+        body_run = body.find(f"{_A}defRPr")
+        body_run.set("sz", str(Pt(PPTXConstants.BULLET_FONT_SIZE).centipoints))
+        _fill(body_run, _TEXT_SCHEME_COLOR)
+
+    @staticmethod
+    def _style_layout(layout, placeholders: Dict[str, tuple]):
+        """Set the level-one size (and optionally color) of placeholders keyed by type ("body" when untyped)"""
+        for shape in layout.iter(f"{_P}sp"):
+            placeholder = shape.find(f"{_P}nvSpPr/{_P}nvPr/{_P}ph")
+            if placeholder is None:
+                continue
+            style = placeholders.get(placeholder.get("type", "body"))
+            if style is None:
+                continue
+            size, scheme_color = style
+            run_properties = _level_one_run_properties(shape)
+            run_properties.set("sz", str(Pt(size).centipoints))
+            if scheme_color:
+                _fill(run_properties, scheme_color)
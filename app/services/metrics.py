@@ -0,0 +1,163 @@
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
+from redis.exceptions import RedisError
+from rq.exceptions import NoSuchJobError
+from rq.job import Job
+from app.task_queue import redis_conn, tenant_queues
+from app.constants.constants import JobPriority, SchedulingConstants, AdmissionConstants, ProviderRoutingConstants
+
+
+def _wait_key(priority: str) -> str:
+    return f"{SchedulingConstants.METRICS_KEY_PREFIX}:{priority}"
+
+
+def _bucket_label(bound) -> str:
+    return "+Inf" if bound == "+Inf" else f"{float(bound):g}"
+
+
+def record_queue_wait(priority: str, seconds: float, connection=None):
+    """Add one dequeued job's time in queue to its class's cumulative histogram"""
+    connection = connection or redis_conn
+    try:
+        with connection.pipeline() as pipe:
+            key = _wait_key(priority)
+            for bound in SchedulingConstants.WAIT_BUCKETS_SECONDS:
+                if seconds <= bound:
+                    pipe.hincrby(key, _bucket_label(bound), 1)
+            pipe.hincrby(key, "+Inf", 1)
+            pipe.hincrbyfloat(key, "sum", seconds)
+            pipe.execute()
+    except RedisError:
+        pass
+
+
+def record_admission(action: str, reason: str = "", connection=None):
+    """Count one admission control decision, by action and reason"""
+    connection = connection or redis_conn
+    try:
+        connection.hincrby(AdmissionConstants.METRICS_KEY, f"{action}:{reason}", 1)
+    except RedisError:
+        pass
+
+
+def admission_stats(connection=None) -> Dict[str, int]:
+    """Admission decision counts so far, keyed by action:reason"""
+    connection = connection or redis_conn
+    return {
+        field.decode("utf-8"): int(value)
+        for field, value in connection.hgetall(AdmissionConstants.METRICS_KEY).items()
+    }
+
+
+def record_route(provider: str, model: str, reason: str, connection=None):
+    """Count one provider routing decision"""
+    connection = connection or redis_conn
+    try:
+        connection.hincrby(ProviderRoutingConstants.METRICS_KEY, f"{provider}|{model}|{reason}", 1)
+    except RedisError:
+        pass
+
+
+def routing_stats(connection=None) -> Dict[str, Dict[str, Any]]:
+    """Routing decision counts keyed by provider|model|reason, and each provider and model's EWMAs"""
+    connection = connection or redis_conn
+    routes = {
+        field.decode("utf-8"): int(value)
+        for field, value in connection.hgetall(ProviderRoutingConstants.METRICS_KEY).items()
+    }
+    providers = {}
+    for member in sorted(connection.smembers(ProviderRoutingConstants.MODELS_KEY)):
+        target = member.decode("utf-8")
+        values = connection.hgetall(f"{ProviderRoutingConstants.STATS_KEY_PREFIX}:{target}")
+        if values:
+            providers[target] = {field.decode("utf-8"): float(value) for field, value in values.items()}
+    return {"routes": routes, "providers": providers}
+
+
+def oldest_wait(queues) -> float:
+    """Seconds the oldest job at the head of any of the queues has been waiting"""
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    oldest = 0.0
+    for queue in queues:
+        job_id = queue.get_job_ids(0, 1)
+        if not job_id:
+            continue
+        try:
+            job = Job.fetch(job_id[0], connection=queue.connection)
+        except NoSuchJobError:
+            continue
+        if job.enqueued_at:
+            oldest = max(oldest, (now - job.enqueued_at).total_seconds())
+    return oldest
+
+
+def queue_stats(connection=None) -> Dict[str, Dict[str, Any]]:
+    """Depth, head-of-line wait and tenant count for every priority class"""
+    connection = connection or redis_conn
+    stats = {}
+    for priority in JobPriority:
+        queues = tenant_queues(priority.value, connection)
+        stats[priority.value] = {
+            "depth": sum(queue.count for queue in queues),
+            "oldest_wait_seconds": round(oldest_wait(queues), 3),
+            "tenants": len(queues),
+            "wait_histogram": {
+                field.decode("utf-8"): float(value)
+                for field, value in connection.hgetall(_wait_key(priority.value)).items()
+            }
+        }
+    return stats
+
+
+def render_prometheus(stats: Optional[Dict[str, Dict[str, Any]]] = None,
+                      admissions: Optional[Dict[str, int]] = None,
+                      routing: Optional[Dict[str, Dict[str, Any]]] = None) -> str:
+    """Queue, admission and provider routing metrics in the Prometheus text exposition format"""
+    stats = stats if stats is not None else queue_stats()
+    admissions = admissions if admissions is not None else admission_stats()
+    routing = routing if routing is not None else routing_stats()
+    lines: List[str] = [
+        "# HELP presentation_queue_depth Jobs waiting per priority class",
+        "# TYPE presentation_queue_depth gauge"
+    ]
+    lines += [f'presentation_queue_depth{{priority="{p}"}} {s["depth"]}' for p, s in stats.items()]
+    lines += [
+        "# HELP presentation_queue_oldest_wait_seconds Age of the oldest waiting job per priority class",
+        "# TYPE presentation_queue_oldest_wait_seconds gauge"
+    ]
+    lines += [f'presentation_queue_oldest_wait_seconds{{priority="{p}"}} {s["oldest_wait_seconds"]}' for p, s in stats.items()]
+    lines += [
+        "# HELP presentation_queue_wait_seconds Time jobs spent queued before a worker took them",
+        "# TYPE presentation_queue_wait_seconds histogram"
+    ]
+    for priority, values in stats.items():
+        histogram = values["wait_histogram"]
+        for bound in list(SchedulingConstants.WAIT_BUCKETS_SECONDS) + ["+Inf"]:
+            label = _bucket_label(bound)
+            lines.append(f'presentation_queue_wait_seconds_bucket{{priority="{priority}",le="{label}"}} {int(histogram.get(label, 0))}')
+        lines.append(f'presentation_queue_wait_seconds_sum{{priority="{priority}"}} {histogram.get("sum", 0.0)}')
+        lines.append(f'presentation_queue_wait_seconds_count{{priority="{priority}"}} {int(histogram.get("+Inf", 0))}')
+    lines += [
+        "# HELP presentation_admission_total Create requests by admission control decision",
+        "# TYPE presentation_admission_total counter"
+    ]
+    for decision, count in sorted(admissions.items()):
+        action, _, reason = decision.partition(":")
+        lines.append(f'presentation_admission_total{{action="{action}",reason="{reason}"}} {count}')
+    lines += [
+        "# HELP llm_provider_routed_total Jobs routed to each provider and model, by reason",
+        "# TYPE llm_provider_routed_total counter"
+    ]
+    for route, count in sorted(routing["routes"].items()):
+        provider, model, reason = route.split("|", 2)
+        lines.append(f'llm_provider_routed_total{{provider="{provider}",model="{model}",reason="{reason}"}} {count}')
+    for name, field, description in (
+        ("llm_provider_latency_seconds", "latency", "EWMA of call latency"),
+        ("llm_provider_tokens_per_second", "tokens_per_second", "EWMA of output throughput"),
+        ("llm_provider_error_rate", "error_rate", "EWMA of the share of failed calls")
+    ):
+        lines += [f"# HELP {name} {description} per provider and model", f"# TYPE {name} gauge"]
+        for target, values in routing["providers"].items():
+            provider, _, model = target.partition(":")
+            lines.append(f'{name}{{provider="{provider}",model="{model}"}} {values.get(field, 0.0):g}')
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,216 @@
+import hashlib
+import os
+import posixpath
+import time
+import zipfile
+from typing import Dict, Any, List, Optional, Set
+from lxml import etree
+from app.constants.constants import PPTXConstants
+
+_RELS_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+_CT_NS = "{http://schemas.openxmlformats.org/package/2006/content-types}"
+_P_NS = "{http://schemas.openxmlformats.org/presentationml/2006/main}"
+_R_ID = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id"
+
+_CONTENT_TYPES = "[Content_Types].xml"
+_ROOT_RELS = "_rels/.rels"
+_LAYOUT_REL = "/slideLayout"
+_MEDIA_DIR = "ppt/media/"
+
+# Template leftovers nothing reads: the blank template's preview image and printer settings
+_DROPPED_REL_TYPES = ("/metadata/thumbnail", "/printerSettings")
+
+COMPRESSION_METHODS = {
+    "store": zipfile.ZIP_STORED,
+    "deflate": zipfile.ZIP_DEFLATED
+}
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def _rels_name(part_name: str) -> str:
+    return posixpath.join(posixpath.dirname(part_name), "_rels", posixpath.basename(part_name) + ".rels")
+
+
+def _source_part(rels_name: str) -> str:
+    """Part a rels file belongs to ("" for the package-level rels)"""
+    directory = posixpath.dirname(posixpath.dirname(rels_name))
+    return posixpath.join(directory, posixpath.basename(rels_name)[:-len(".rels")])
+
+
+def _serialize(root) -> bytes:
+    return etree.tostring(root, xml_declaration=True, encoding="UTF-8", standalone=True)
+
+
+class PackageOptimizer:
+    """
+    Post-render pass over a saved .pptx. Slide layouts no slide uses are
+    dropped from the master, parts that become unreachable are removed,
+    identical media parts are stored once, and the package is rewritten with
+    the configured compression ("store" for internal hops, or "deflate" at
+    a chosen level). Parts are copied one at a time, so memory stays flat.
+    """
+
+    def __init__(self, compression: Optional[str] = None, level: Optional[int] = None):
+        self.compression = compression or PPTXConstants.COMPRESSION
+        if self.compression not in COMPRESSION_METHODS:
+            raise ValueError(f"Unknown compression '{self.compression}', expected one of {sorted(COMPRESSION_METHODS)}")
+        self.level = PPTXConstants.COMPRESSION_LEVEL if level is None else level
+
+    def optimize(self, file_path: str) -> Dict[str, Any]:
+        """Rewrite the package in place; returns size and timing stats"""
+        started = time.monotonic()
+        size_before = os.path.getsize(file_path)
+
+        with zipfile.ZipFile(file_path) as package:
+            names = set(package.namelist())
+            rels = {name: etree.fromstring(package.read(name)) for name in names if name.endswith(".rels")}
+            replacements = {}
+
+            layouts_removed = self._drop_unused_layouts(package, rels, replacements)
+            media_deduplicated = self._deduplicate_media(package, names, rels, replacements)
+            for rels_name, root in rels.items():
+                for rel in list(root):
+                    if rel.get("Type", "").endswith(_DROPPED_REL_TYPES):
+                        root.remove(rel)
+                        replacements[rels_name] = root
+
+            keep = self._reachable(rels, names)
+            keep.add(_CONTENT_TYPES)
+            replacements[_CONTENT_TYPES] = self._content_types(etree.fromstring(package.read(_CONTENT_TYPES)), keep)
+
+            partial_path = f"{file_path}.part"
+            try:
+                method = COMPRESSION_METHODS[self.compression]
+                with zipfile.ZipFile(partial_path, "w") as optimized:
+                    # The content types part goes first, as Office writes it
+                    for item in sorted(package.infolist(), key=lambda item: item.filename != _CONTENT_TYPES):
+                        if item.filename not in keep:
+                            continue
+                        data = replacements.get(item.filename)
+                        if data is None:
+                            data = package.read(item)
+                        elif not isinstance(data, bytes):
+                            data = _serialize(data)
+                        optimized.writestr(zipfile.ZipInfo(item.filename, item.date_time), data,
+                                           compress_type=method, compresslevel=self.level)
+                os.replace(partial_path, file_path)
+            finally:
+                if os.path.exists(partial_path):
+                    os.remove(partial_path)
+
+        return {
+            "compression": self.compression,
+            "level": self.level if self.compression != "store" else None,
+            "bytes_before": size_before,
+            "bytes": os.path.getsize(file_path),
+            "layouts_removed": layouts_removed,
+            "parts_removed": len(names) - len(keep),
+            "media_deduplicated": media_deduplicated,
+            "seconds": round(time.monotonic() - started, 4)
+        }
+
+    # -------------------------------
+    # Layouts
+    # -------------------------------
+    @staticmethod
+    def _drop_unused_layouts(package: zipfile.ZipFile, rels: Dict[str, Any], replacements: Dict[str, Any]) -> int:
+        """Remove layouts no slide uses from every slide master and its layout id list"""
+        used = set()
+        for rels_name, root in rels.items():
+            if rels_name.startswith("ppt/slides/_rels/"):
+                for rel in root:
+                    if rel.get("Type", "").endswith(_LAYOUT_REL):
+                        used.add(posixpath.normpath(posixpath.join("ppt/slides", rel.get("Target"))))
+
+        removed = 0
+        for rels_name, root in rels.items():
+            if not rels_name.startswith("ppt/slideMasters/_rels/"):
+                continue
+            master_name = _source_part(rels_name)
+            master_dir = posixpath.dirname(master_name)
+            unused_ids = set()
+            for rel in list(root):
+                target = posixpath.normpath(posixpath.join(master_dir, rel.get("Target")))
+                if rel.get("Type", "").endswith(_LAYOUT_REL) and target not in used:
+                    unused_ids.add(rel.get("Id"))
+                    root.remove(rel)
+            if not unused_ids:
+                continue
+
+            master = etree.fromstring(package.read(master_name))
+            layout_ids = master.find(f"{_P_NS}sldLayoutIdLst")
+            for layout_id in list(layout_ids):
+                if layout_id.get(_R_ID) in unused_ids:
+                    layout_ids.remove(layout_id)
+            replacements[rels_name] = root
+            replacements[master_name] = master
+            removed += len(unused_ids)
+        return removed
+
+    # -------------------------------
+    # Media
+    # -------------------------------
+    @staticmethod
+    def _deduplicate_media(package: zipfile.ZipFile, names: Set[str], rels: Dict[str, Any],
+                           replacements: Dict[str, Any]) -> int:
+        """Point every reference to identical media at one copy; duplicates become unreachable"""
+        canonical = {}
+        duplicates = {}
+        for name in sorted(names):
+            if not name.startswith(_MEDIA_DIR):
+                continue
+            digest = hashlib.sha256()
+            with package.open(name) as media:
+                for chunk in iter(lambda: media.read(HASH_CHUNK_SIZE), b""):
+                    digest.update(chunk)
+            # Same bytes with another extension would need another content type
+            key = (digest.hexdigest(), posixpath.splitext(name)[1])
+            if key in canonical:
+                duplicates[name] = canonical[key]
+            else:
+                canonical[key] = name
+
+        if duplicates:
+            for rels_name, root in rels.items():
+                source_dir = posixpath.dirname(_source_part(rels_name))
+                for rel in root:
+                    if rel.get("TargetMode") == "External":
+                        continue
+                    target = posixpath.normpath(posixpath.join(source_dir, rel.get("Target")))
+                    if target in duplicates:
+                        rel.set("Target", posixpath.relpath(duplicates[target], source_dir))
+                        replacements[rels_name] = root
+        return len(duplicates)
+
+    # -------------------------------
+    # Reachability and content types
+    # -------------------------------
+    @staticmethod
+    def _reachable(rels: Dict[str, Any], names: Set[str]) -> Set[str]:
+        """Parts (and their rels) reachable from the package relationships"""
+        keep = set()
+        pending: List[str] = [_ROOT_RELS]
+        while pending:
+            rels_name = pending.pop()
+            if rels_name in keep or rels_name not in rels:
+                continue
+            keep.add(rels_name)
+            source_dir = posixpath.dirname(_source_part(rels_name))
+            for rel in rels[rels_name]:
+                if rel.get("TargetMode") == "External":
+                    continue
+                target = posixpath.normpath(posixpath.join(source_dir, rel.get("Target"))).lstrip("/")
+                if target in names and target not in keep:
+                    keep.add(target)
+                    pending.append(_rels_name(target))
+        return keep
+
+    @staticmethod
+    def _content_types(root, keep: Set[str]):
+        extensions = {posixpath.splitext(name)[1][1:].lower() for name in keep}
+        for entry in list(root):
+            if entry.tag == f"{_CT_NS}Override" and entry.get("PartName").lstrip("/") not in keep:
+                root.remove(entry)
+            elif entry.tag == f"{_CT_NS}Default" and entry.get("Extension").lower() not in extensions:
+                root.remove(entry)
+        return root
@@ -0,0 +1,138 @@
+import io
+import os
+import zipfile
+from functools import lru_cache
+from typing import Optional, Tuple
+from lxml import etree
+from pptx import Presentation
+from app.services.master_styler import MasterStyle
+
+_CT_NS = "http://schemas.openxmlformats.org/package/2006/content-types"
+_RELS_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+_P_NS = "http://schemas.openxmlformats.org/presentationml/2006/main"
+_R_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_RT = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+
+_SLIDE_CT = "application/vnd.openxmlformats-officedocument.presentationml.slide+xml"
+_NOTES_CT = "application/vnd.openxmlformats-officedocument.presentationml.notesSlide+xml"
+_XML_DECL = b"<?xml version='1.0' encoding='UTF-8' standalone='yes'?>\n"
+
+# Written last, once every slide is known
+_MANIFEST_PARTS = ("[Content_Types].xml", "ppt/presentation.xml", "ppt/_rels/presentation.xml.rels")
+_FIRST_SLIDE_ID = 256
+
+
+@lru_cache(maxsize=32)
+def base_package(slide_width: int, slide_height: int, master_style: MasterStyle) -> bytes:
+    """
+    The default template with the requested slide size, theme and a notes
+    master, saved once per style. Every streamed deck starts from these parts.
+    """
+    presentation = Presentation()
+    presentation.slide_width = slide_width
+    presentation.slide_height = slide_height
+    master_style.apply(presentation)
+    presentation.notes_master  # created on first access
+    buffer = io.BytesIO()
+    presentation.save(buffer)
+    return buffer.getvalue()
+
+
+def _rels_xml(rels) -> bytes:
+    items = "".join(f'<Relationship Id="{rid}" Type="{_RT}/{rel_type}" Target="{target}"/>' for rid, rel_type, target in rels)
+    return _XML_DECL + f'<Relationships xmlns="{_RELS_NS}">{items}</Relationships>'.encode("utf-8")
+
+
+class PackageWriter:
+    """
+    Writes a .pptx incrementally. The template parts are copied when the
+    writer opens, each slide is written to the zip as soon as it is added,
+    and the content types and presentation part are finalized on close.
+    Only the slide ids are kept in memory, so memory stays flat however
+    many slides are written.
+
+    Slides must be text-only, like those PPTXCreator produces: their only
+    relationships are to a layout and optionally a notes slide.
+    """
+
+    def __init__(self, path: str, slide_width: int, slide_height: int, master_style: MasterStyle):
+        self.path = path
+        self.partial_path = f"{path}.part"
+        self.base = zipfile.ZipFile(io.BytesIO(base_package(slide_width, slide_height, master_style)))
+        # Stored, not deflated: PackageOptimizer compresses the finished package in one pass
+        self.zip = zipfile.ZipFile(self.partial_path, "w", zipfile.ZIP_STORED)
+        self.slide_count = 0
+        self.notes_count = 0
+
+        for item in self.base.infolist():
+            if item.filename not in _MANIFEST_PARTS:
+                self.zip.writestr(item, self.base.read(item))
+
+    def add_slide(self, slide_xml: bytes, layout: str, notes_xml: Optional[bytes] = None) -> int:
+        """Write one slide (and its notes) to the package; returns its 1-based number"""
+        self.slide_count += 1
+        number = self.slide_count
+        slide_rels = [("rId1", "slideLayout", f"../slideLayouts/{layout}")]
+
+        if notes_xml is not None:
+            self.notes_count += 1
+            notes_name = f"notesSlide{self.notes_count}.xml"
+            slide_rels.append(("rId2", "notesSlide", f"../notesSlides/{notes_name}"))
+            self.zip.writestr(f"ppt/notesSlides/{notes_name}", notes_xml)
+            self.zip.writestr(f"ppt/notesSlides/_rels/{notes_name}.rels", _rels_xml([
+                ("rId1", "notesMaster", "../notesMasters/notesMaster1.xml"),
+                ("rId2", "slide", f"../slides/slide{number}.xml")
+            ]))
+
+        self.zip.writestr(f"ppt/slides/slide{number}.xml", slide_xml)
+        self.zip.writestr(f"ppt/slides/_rels/slide{number}.xml.rels", _rels_xml(slide_rels))
+        return number
+
+    def close(self):
+        """Write the manifest parts and move the finished file into place"""
+        try:
+            self.zip.writestr("[Content_Types].xml", self._content_types())
+            presentation_xml, presentation_rels = self._presentation_parts()
+            self.zip.writestr("ppt/presentation.xml", presentation_xml)
+            self.zip.writestr("ppt/_rels/presentation.xml.rels", presentation_rels)
+            self.zip.close()
+            os.replace(self.partial_path, self.path)
+        finally:
+            self.abort()
+
+    def abort(self):
+        """Discard a partially written package"""
+        self.zip.close()
+        self.base.close()
+        if os.path.exists(self.partial_path):
+            os.remove(self.partial_path)
+
+    def _content_types(self) -> bytes:
+        root = etree.fromstring(self.base.read("[Content_Types].xml"))
+        for i in range(1, self.slide_count + 1):
+            etree.SubElement(root, f"{{{_CT_NS}}}Override", PartName=f"/ppt/slides/slide{i}.xml", ContentType=_SLIDE_CT)
+        for i in range(1, self.notes_count + 1):
+            etree.SubElement(root, f"{{{_CT_NS}}}Override", PartName=f"/ppt/notesSlides/notesSlide{i}.xml", ContentType=_NOTES_CT)
+        return etree.tostring(root, xml_declaration=True, encoding="UTF-8", standalone=True)
+
+    def _presentation_parts(self) -> Tuple[bytes, bytes]:
+        rels = etree.fromstring(self.base.read("ppt/_rels/presentation.xml.rels"))
+        next_rid = 1 + max(int(rel.get("Id")[3:]) for rel in rels)
+
+        presentation = etree.fromstring(self.base.read("ppt/presentation.xml"))
+        slide_ids = presentation.find(f"{{{_P_NS}}}sldIdLst")
+        if slide_ids is None:
+            slide_ids = etree.Element(f"{{{_P_NS}}}sldIdLst")
+            # sldIdLst goes right after the master id lists
+            anchor = presentation.find(f"{{{_P_NS}}}sldSz")
+            anchor.addprevious(slide_ids)
+
+        for i in range(self.slide_count):
+            rid = f"rId{next_rid + i}"
+            etree.SubElement(rels, f"{{{_RELS_NS}}}Relationship", Id=rid, Type=f"{_RT}/slide", Target=f"slides/slide{i + 1}.xml")
+            etree.SubElement(slide_ids, f"{{{_P_NS}}}sldId", id=str(_FIRST_SLIDE_ID + i), attrib={f"{{{_R_NS}}}id": rid})
+
+        return (
+            etree.tostring(presentation, xml_declaration=True, encoding="UTF-8", standalone=True),
+            etree.tostring(rels, xml_declaration=True, encoding="UTF-8", standalone=True)
+        )
@@ -1,20 +1,46 @@
 from pptx import Presentation
 from pptx.util import Inches, Pt
-from pptx.dml.color import RGBColor
 from pptx.enum.text import PP_ALIGN
 from typing import List, Dict, Any, Optional
 import os
 import re
-from app.constants.constants import PPTXConstants, FilePaths, SlideLayoutType, PresentationTheme
+import time
+from app.constants.constants import PPTXConstants, SlideLayoutType
+from app.utils.theme_resolver import ThemeResolver
+from app.services.package_writer import PackageWriter
+from app.services.package_optimizer import PackageOptimizer
+from app.services.master_styler import MasterStyle
+from app.services.slide_xml_renderer import SlideXMLRenderer
+from app.services.storage import get_storage
+from app.services.cancellation import CancellationToken
+
+STREAMING_SLIDE_THRESHOLD = int(os.getenv("PPTX_STREAMING_THRESHOLD", PPTXConstants.STREAMING_SLIDE_THRESHOLD))
+FAST_RENDER = os.getenv("PPTX_FAST_RENDER", str(PPTXConstants.FAST_RENDER)).lower() == "true"
+COMPRESSION = os.getenv("PPTX_COMPRESSION", PPTXConstants.COMPRESSION)
+COMPRESSION_LEVEL = int(os.getenv("PPTX_COMPRESSION_LEVEL", PPTXConstants.COMPRESSION_LEVEL))
 
 
 class PPTXCreator:
-    def __init__(self):
+    def __init__(self, cancel_token: Optional[CancellationToken] = None):
+        # Checked per slide so a cancelled job stops rendering promptly
+        self.cancel_token = cancel_token
         self.presentation = None
         self.config = None
+        self.master_style = None
+        self.font_size = None
+        self.last_report = None
+        self.storage = get_storage()
     
-    def create_presentation(self, slides_data: List[Dict[str, Any]], topic: str, config: Optional[Dict[str, Any]] = None) -> str:
-        """Create a PowerPoint presentation from slide data with configuration options"""
+    def create_presentation(self, slides_data: List[Dict[str, Any]], topic: str, config: Optional[Dict[str, Any]] = None,
+                            streaming: Optional[bool] = None, fast: Optional[bool] = None,
+                            compression: Optional[str] = None, presentation_id: Optional[str] = None) -> str:
+        """
+        Create a PowerPoint presentation from slide data with configuration options.
+        The deck is rendered to a scratch file and handed to the storage
+        backend; the returned value is its storage key. Decks of a stored
+        presentation are keyed by its id, so decks with the same topic never
+        share a file; standalone renders are keyed by topic only.
+        """
         
         # Store config for use throughout the presentation creation
         self.config = config or {}
@@ -30,27 +56,108 @@ class PPTXCreator:
         elif aspect_ratio == '4:3':
             self.presentation.slide_width = Inches(10)
             self.presentation.slide_height = Inches(7.5)
-            
-        # Process each slide according to its type
-        for slide_data in slides_data:
-            self._create_slide(slide_data)
         
-        # Save presentation
+        # Theme colors, font and text styles live in the theme and slide master
+        self.master_style = MasterStyle.from_config(self.config)
+        self.master_style.apply(self.presentation)
+            
+        key = self._output_key(topic, presentation_id)
+        filepath = self.storage.scratch_file(".pptx")
+        try:
+            self._render(slides_data, filepath, streaming, fast, compression)
+            self._check_cancelled()
+            started = time.monotonic()
+            self.storage.put_file(key, filepath)
+            self.last_report["store_seconds"] = round(time.monotonic() - started, 4)
+        finally:
+            if os.path.exists(filepath):
+                os.remove(filepath)
+        return key
+    
+    def _render(self, slides_data: List[Dict[str, Any]], filepath: str, streaming: Optional[bool],
+                fast: Optional[bool], compression: Optional[str]):
+        if fast is None:
+            fast = FAST_RENDER
+        # Large decks are streamed slide by slide so memory stays flat
+        if streaming is None:
+            streaming = len(slides_data) > STREAMING_SLIDE_THRESHOLD
+        started = time.monotonic()
+        if fast or streaming:
+            self._write_package(slides_data, filepath, SlideXMLRenderer(self.config) if fast else None)
+        else:
+            # Process each slide according to its type
+            for slide_data in slides_data:
+                self._check_cancelled()
+                self._create_slide(slide_data)
+            self.presentation.save(filepath)
+        render_seconds = round(time.monotonic() - started, 4)
+        
+        # Prune and recompress the finished package, and keep its stats for the job record
+        optimizer = PackageOptimizer(compression or COMPRESSION, COMPRESSION_LEVEL)
+        self.last_report = {
+            "slides": len(slides_data),
+            "writer": "fast" if fast else "streaming" if streaming else "full",
+            "render_seconds": render_seconds,
+            **optimizer.optimize(filepath)
+        }
+    
+    def _check_cancelled(self):
+        if self.cancel_token:
+            self.cancel_token.check()
+    
+    @staticmethod
+    def _output_key(topic: str, presentation_id: Optional[str] = None) -> str:
         sanitized_topic = re.sub(r'[^\w\s-]', '', topic).strip().replace(' ', '_').lower()
-        filename = f"{sanitized_topic}.pptx"
-        filepath = os.path.join(FilePaths.PRESENTATIONS_DIR, filename)
-        
-        # Ensure presentations directory exists
-        os.makedirs(FilePaths.PRESENTATIONS_DIR, exist_ok=True)
-        
-        self.presentation.save(filepath)
+        if presentation_id:
+            return f"{sanitized_topic}-{presentation_id}.pptx"
+        return f"{sanitized_topic}.pptx"
+    
+    def _write_package(self, slides_data: List[Dict[str, Any]], filepath: str,
+                       renderer: Optional[SlideXMLRenderer] = None) -> str:
+        """
+        Write the deck slide by slide so at most one slide is held in memory.
+        Slides come from the XML renderer when one is given; anything it
+        cannot render is built in the scratch presentation and then dropped.
+        """
+        writer = PackageWriter(filepath, self.presentation.slide_width, self.presentation.slide_height, self.master_style)
+        try:
+            for slide_data in slides_data:
+                self._check_cancelled()
+                parts = renderer.render(slide_data) if renderer else None
+                if parts is None:
+                    self._create_slide(slide_data)
+                    parts = self._flush_slides()
+                for slide_xml, layout, notes_xml in parts:
+                    writer.add_slide(slide_xml, layout, notes_xml)
+        except BaseException:
+            writer.abort()
+            raise
+        
+        writer.close()
         return filepath
     
+    def _flush_slides(self):
+        """Serialize every slide in the scratch presentation, then remove them so their parts can be freed"""
+        # Some slide types add a fallback slide, so there can be more than one
+        parts = []
+        for slide in self.presentation.slides:
+            notes_xml = slide.notes_slide.part.blob if slide.has_notes_slide else None
+            parts.append((slide.part.blob, os.path.basename(slide.slide_layout.part.partname), notes_xml))
+        
+        slide_ids = self.presentation.slides._sldIdLst
+        for slide_id in list(slide_ids):
+            self.presentation.part.drop_rel(slide_id.rId)
+            slide_ids.remove(slide_id)
+        return parts
+    
     def _create_slide(self, slide_data: Dict[str, Any]):
         """Create a single slide based on slide data and type"""
         
         slide_type = slide_data.get("slide_type", SlideLayoutType.BULLET_POINTS.value)
         
+        # Body text size chosen by auto-layout, if it had to scale the text down
+        self.font_size = slide_data.get("font_size")
+        
         if slide_type == SlideLayoutType.TITLE.value:
             self._create_title_slide(slide_data)
         elif slide_type == SlideLayoutType.BULLET_POINTS.value:
@@ -70,13 +177,9 @@ class PPTXCreator:
         slide_layout = self.presentation.slide_layouts[PPTXConstants.TITLE_LAYOUT_INDEX]  # Title slide layout
         slide = self.presentation.slides.add_slide(slide_layout)
         
-        # Apply background color if specified
-        self._apply_background(slide)
-        
         # Set title
         title = slide.shapes.title
         title.text = slide_data["title"]
-        self._format_title(title, is_title_slide=True)
         
         # Set subtitle with content
         if slide.placeholders[1]:
@@ -100,13 +203,9 @@ class PPTXCreator:
         slide_layout = self.presentation.slide_layouts[PPTXConstants.CONTENT_LAYOUT_INDEX]  # Title and content layout
         slide = self.presentation.slides.add_slide(slide_layout)
         
-        # Apply background color if specified
-        self._apply_background(slide)
-        
         # Set title
         title = slide.shapes.title
         title.text = slide_data["title"]
-        self._format_title(title)
         
         # Set content
         content_placeholder = slide.placeholders[1]
@@ -139,13 +238,9 @@ class PPTXCreator:
         slide_layout = self.presentation.slide_layouts[PPTXConstants.TWO_COLUMN_LAYOUT_INDEX]  # Comparison layout (usually)
         slide = self.presentation.slides.add_slide(slide_layout)
         
-        # Apply background color if specified
-        self._apply_background(slide)
-        
         # Set title
         title = slide.shapes.title
         title.text = slide_data["title"]
-        self._format_title(title)
         
         # Get content - split it for the two columns
         all_content = slide_data.get("content", [])
@@ -208,13 +303,9 @@ class PPTXCreator:
         slide_layout = self.presentation.slide_layouts[PPTXConstants.PICTURE_LAYOUT_INDEX]  # Usually picture with caption
         slide = self.presentation.slides.add_slide(slide_layout)
         
-        # Apply background color if specified
-        self._apply_background(slide)
-        
         # Set title
         title = slide.shapes.title
         title.text = slide_data["title"]
-        self._format_title(title)
         
         # Try to find content and picture placeholders
         placeholders = slide.placeholders
@@ -252,21 +343,6 @@ class PPTXCreator:
             notes_slide = slide.notes_slide
             notes_slide.notes_text_frame.text = slide_data["notes"]
     
-    def _apply_background(self, slide):
-        """Apply background color to slide if specified in config"""
-        if 'background_color' in self.config:
-            bg_color = self.config['background_color'].lstrip('#')
-            if len(bg_color) == 6:
-                try:
-                    r = int(bg_color[0:2], 16)
-                    g = int(bg_color[2:4], 16)
-                    b = int(bg_color[4:6], 16)
-                    slide.background.fill.solid()
-                    slide.background.fill.fore_color.rgb = RGBColor(r, g, b)
-                except ValueError:
-                    # If there's a problem with the hex color, just skip it
-                    pass
-    
     def _add_reference(self, slide, reference_text):
         """Add a reference to the bottom of the slide"""
         left = Inches(PPTXConstants.REFERENCE_LEFT)
@@ -283,169 +359,29 @@ class PPTXCreator:
         p.text = reference_text
         p.alignment = PP_ALIGN.RIGHT  # Right-align the reference
         
-        # Format the text to be smaller and lighter
+        # Format the text to be smaller and lighter; the font comes from the theme
         run = p.runs[0]
         run.font.size = Pt(PPTXConstants.REFERENCE_FONT_SIZE)
-        run.font.name = self._get_font_name()
         
         # Use a lighter color for the reference text
-        colors = self._get_theme_colors()
-        if 'text' in colors:
-            # Make it slightly lighter than normal text
-            text_color = colors['text']
-            # RGBColor is a tuple, so access values by index
-            r = min(255, text_color[0] + 40)
-            g = min(255, text_color[1] + 40)
-            b = min(255, text_color[2] + 40)
-            run.font.color.rgb = RGBColor(r, g, b)
-        else:
-            run.font.color.rgb = colors['secondary']
+        run.font.color.rgb = ThemeResolver.get_reference_color(self._get_theme_colors())
     
     def _get_theme_colors(self):
         """Get theme colors based on config or defaults"""
-        theme_name = self.config.get('theme', PresentationTheme.PROFESSIONAL.value)
-        
-        # Default professional colors
-        colors = {
-            'primary': RGBColor(31, 73, 125),     # Dark blue
-            'secondary': RGBColor(68, 114, 196),  # Medium blue
-            'accent': RGBColor(237, 125, 49),     # Orange
-            'text': RGBColor(68, 84, 106),        # Dark gray-blue
-            'background': RGBColor(255, 255, 255) # White
-        }
-        
-        # Apply theme-specific colors first
-        if isinstance(theme_name, str):
-            theme_lower = theme_name.lower()
-            if theme_lower == PresentationTheme.CORPORATE.value:
-                colors['primary'] = RGBColor(0, 50, 98)      # Dark blue
-                colors['secondary'] = RGBColor(0, 118, 189)  # Medium blue
-                colors['accent'] = RGBColor(242, 80, 34)     # Red/orange
-            elif theme_lower == PresentationTheme.CREATIVE.value:
-                colors['primary'] = RGBColor(185, 9, 11)     # Dark red
-                colors['secondary'] = RGBColor(247, 150, 70) # Orange
-                colors['accent'] = RGBColor(75, 172, 198)    # Light blue
-            elif theme_lower == PresentationTheme.ACADEMIC.value:
-                colors['primary'] = RGBColor(80, 16, 22)     # Maroon
-                colors['secondary'] = RGBColor(155, 155, 155) # Gray
-                colors['accent'] = RGBColor(200, 178, 115)   # Gold
-            elif theme_lower == PresentationTheme.DARK.value or 'dark mode' in theme_lower:
-                colors['primary'] = RGBColor(45, 45, 45)     # Dark gray
-                colors['secondary'] = RGBColor(210, 210, 210) # Light gray
-                colors['accent'] = RGBColor(52, 152, 219)    # Blue
-                colors['text'] = RGBColor(240, 240, 240)     # Almost white
-                colors['background'] = RGBColor(25, 25, 25)  # Almost black
-            elif theme_lower == PresentationTheme.MINIMAL.value:
-                colors['primary'] = RGBColor(40, 40, 40)     # Dark gray
-                colors['secondary'] = RGBColor(120, 120, 120) # Medium gray
-                colors['accent'] = RGBColor(200, 200, 200)   # Light gray
-            elif PresentationTheme.MODERN_STARTUP.value in theme_lower:
-                colors['primary'] = RGBColor(41, 128, 185)   # Bright blue
-                colors['secondary'] = RGBColor(52, 73, 94)   # Dark blue-gray
-                colors['accent'] = RGBColor(243, 156, 18)    # Orange
-            elif PresentationTheme.YOUTHFUL.value in theme_lower:
-                colors['primary'] = RGBColor(155, 89, 182)   # Purple
-                colors['secondary'] = RGBColor(52, 152, 219) # Blue
-                colors['accent'] = RGBColor(46, 204, 113)    # Green
-        
-        # Override with custom colors if specified
-        if 'background_color' in self.config:
-            bg_color = self.config['background_color'].lstrip('#')
-            if len(bg_color) == 6:
-                try:
-                    r = int(bg_color[0:2], 16)
-                    g = int(bg_color[2:4], 16)
-                    b = int(bg_color[4:6], 16)
-                    colors['background'] = RGBColor(r, g, b)
-                    
-                    # If background is dark, use light text by default
-                    brightness = (r * 299 + g * 587 + b * 114) / 1000
-                    if brightness < 128:  # Dark background
-                        colors['text'] = RGBColor(240, 240, 240)  # Light text
-                except ValueError:
-                    pass
-        
-        # Apply custom title color (maps to primary)
-        if 'title_color' in self.config:
-            title_color = self.config['title_color'].lstrip('#')
-            if len(title_color) == 6:
-                try:
-                    r = int(title_color[0:2], 16)
-                    g = int(title_color[2:4], 16)
-                    b = int(title_color[4:6], 16)
-                    colors['primary'] = RGBColor(r, g, b)
-                except ValueError:
-                    pass
-        
-        # Apply custom content color (maps to text)
-        if 'content_color' in self.config:
-            content_color = self.config['content_color'].lstrip('#')
-            if len(content_color) == 6:
-                try:
-                    r = int(content_color[0:2], 16)
-                    g = int(content_color[2:4], 16)
-                    b = int(content_color[4:6], 16)
-                    colors['text'] = RGBColor(r, g, b)
-                    colors['secondary'] = RGBColor(r, g, b)  # Also update secondary
-                except ValueError:
-                    pass
-        
-        # Apply custom accent color
-        if 'accent_color' in self.config:
-            accent_color = self.config['accent_color'].lstrip('#')
-            if len(accent_color) == 6:
-                try:
-                    r = int(accent_color[0:2], 16)
-                    g = int(accent_color[2:4], 16)
-                    b = int(accent_color[4:6], 16)
-                    colors['accent'] = RGBColor(r, g, b)
-                except ValueError:
-                    pass
-        
-        return colors
-    
-    def _get_font_name(self):
-        """Get font name from config or default"""
-        return self.config.get('font', self.config.get('font_name', PPTXConstants.DEFAULT_FONT))
-    
-    def _format_title(self, title_shape, is_title_slide=False):
-        """Format title text based on theme and config"""
-        if title_shape.has_text_frame:
-            colors = self._get_theme_colors()
-            font_name = self._get_font_name()
-            
-            text_frame = title_shape.text_frame
-            for paragraph in text_frame.paragraphs:
-                paragraph.alignment = PP_ALIGN.CENTER
-                for run in paragraph.runs:
-                    run.font.name = font_name
-                    run.font.size = Pt(PPTXConstants.TITLE_SLIDE_FONT_SIZE if is_title_slide else PPTXConstants.TITLE_FONT_SIZE)
-                    run.font.bold = True
-                    run.font.color.rgb = colors['primary']
+        return ThemeResolver.get_theme_colors(self.config)
     
     def _format_subtitle(self, subtitle_shape):
-        """Format subtitle text based on theme and config"""
-        if subtitle_shape.has_text_frame:
-            colors = self._get_theme_colors()
-            font_name = self._get_font_name()
-            
-            text_frame = subtitle_shape.text_frame
-            for paragraph in text_frame.paragraphs:
-                paragraph.alignment = PP_ALIGN.CENTER
+        """Subtitles are styled by the title layout; only a fitted font size is set per run"""
+        if subtitle_shape.has_text_frame and self.font_size and self.font_size != PPTXConstants.SUBTITLE_FONT_SIZE:
+            for paragraph in subtitle_shape.text_frame.paragraphs:
                 for run in paragraph.runs:
-                    run.font.name = font_name
-                    run.font.size = Pt(PPTXConstants.SUBTITLE_FONT_SIZE)
-                    run.font.color.rgb = colors['secondary']
+                    run.font.size = Pt(self.font_size)
     
     def _format_bullet_point(self, paragraph, is_conclusion=False):
-        """Format bullet point text based on theme and config"""
-        colors = self._get_theme_colors()
-        font_name = self._get_font_name()
-        
-        paragraph.alignment = PP_ALIGN.LEFT
+        """Bullets are styled by the slide master; runs only carry sizes and weights that differ from it"""
+        size = PPTXConstants.CONCLUSION_FONT_SIZE if is_conclusion else self.font_size
         for run in paragraph.runs:
-            run.font.name = font_name
-            run.font.size = Pt(PPTXConstants.CONCLUSION_FONT_SIZE if is_conclusion else PPTXConstants.BULLET_FONT_SIZE)
-            run.font.color.rgb = colors['text'] if 'text' in colors else colors['secondary']
+            if size and size != PPTXConstants.BULLET_FONT_SIZE:
+                run.font.size = Pt(size)
             if is_conclusion:
-                run.font.bold = True 
\ No newline at end of file
+                run.font.bold = True
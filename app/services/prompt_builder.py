@@ -0,0 +1,365 @@
+import re
+import json
+import math
+from string import Template
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Tuple, Optional, List, Dict, Any
+from app.constants.constants import LLMConstants, IngestionConstants
+
+SLIDE_FIELDS: Tuple[str, ...] = ("title", "slide_type", "content", "notes", "reference")
+
+# Rough BPE approximation: one token per short word or punctuation mark,
+# plus one for every further 6 characters of a long word
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+_WHITESPACE_RE = re.compile(r"[ \t\r\f\v]+")
+_BLANK_LINES_RE = re.compile(r"\n\s*\n+")
+_SENTENCE_END_RE = re.compile(r"[.!?](?=\s)")
+
+_FIELD_DESCRIPTIONS = {
+    "title": "- title: string",
+    "slide_type": "- " + LLMConstants.SLIDE_TYPES_INSTRUCTION,
+    "content": "- content: array of strings (bullet points)",
+    "notes": "- notes: string (speaker notes)",
+    "reference": "- reference: string (source citation, max 50 chars)"
+}
+
+_EXAMPLE_SLIDES = [
+    {
+        "title": "Introduction to Machine Learning",
+        "slide_type": "title",
+        "content": ["Understanding AI and ML", "Key concepts and applications", "What we'll cover today"],
+        "notes": "Welcome everyone. Today we'll explore the fundamentals of machine learning.",
+        "reference": "source: Stanford CS229"
+    },
+    {
+        "title": "What is Machine Learning?",
+        "slide_type": "bullet_points",
+        "content": [
+            "Subset of artificial intelligence",
+            "Systems learn from data without explicit programming",
+            "Improves performance through experience",
+            "Used in recommendation systems, image recognition, and more"
+        ],
+        "notes": "Machine learning is transforming how we interact with technology daily.",
+        "reference": "ref: Mitchell, 1997"
+    },
+    {
+        "title": "References",
+        "slide_type": "bullet_points",
+        "content": ["source: Stanford CS229", "ref: Mitchell, 1997"],
+        "notes": "Sources used in this presentation.",
+        "reference": "Generated by AI"
+    }
+]
+
+_SLIDES_PROMPT = """
+Create a presentation on "$topic" using this content: "$content".
+Generate exactly $num_slides slides.
+
+IMPORTANT: Return ONLY a valid JSON array. No explanations, no markdown, just the JSON array.
+
+Required structure for EVERY slide:
+$fields
+
+Rules:
+1. First slide: slide_type MUST be "title"
+2. Last slide: title MUST be "References", slide_type MUST be "bullet_points"
+3. Middle slides: vary between "bullet_points", "two_column", "content_with_image"
+
+Example of expected JSON format:
+$example
+
+Generate the JSON array now:"""
+
+
+_SECTION_PROMPT = """
+You are writing part $section of $sections of a presentation on "$topic" using this content: "$content".
+Slides written so far:
+$outline
+
+Generate exactly $num_slides slides that continue the presentation from there.
+Cover material the slides so far have not covered and do not repeat their titles.
+
+IMPORTANT: Return ONLY a valid JSON array. No explanations, no markdown, just the JSON array.
+
+Required structure for EVERY slide:
+$fields
+
+Rules:
+1. No title slide and no References slide: the deck already has them
+2. Vary slide_type between "bullet_points", "two_column", "content_with_image"
+
+Example of expected JSON format:
+$example
+
+Generate the JSON array now:"""
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap local token estimate; deliberately errs on the high side"""
+    if not text:
+        return 0
+    return sum(1 + len(token) // 6 for token in _TOKEN_RE.findall(text))
+
+
+def compact_text(text: str) -> str:
+    """Collapse runs of whitespace and blank lines without changing the words"""
+    text = _WHITESPACE_RE.sub(" ", text or "")
+    text = _BLANK_LINES_RE.sub("\n\n", text)
+    return "\n".join(line.strip() for line in text.split("\n")).strip()
+
+
+def trim_to_tokens(text: str, max_tokens: int) -> Tuple[str, bool]:
+    """Trim text to fit a token budget, preferring to cut at a sentence boundary"""
+    if estimate_tokens(text) <= max_tokens:
+        return text, False
+    if max_tokens <= 0:
+        return "", True
+
+    # Tokens are roughly proportional to characters, so binary search the cut point.
+    # After compaction no token spans more than ~7 characters, which bounds the search.
+    low, high = 0, min(len(text), max_tokens * 8)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if estimate_tokens(text[:mid]) <= max_tokens:
+            low = mid
+        else:
+            high = mid - 1
+    cut = text[:low]
+
+    sentence_ends = [m.end() for m in _SENTENCE_END_RE.finditer(cut)]
+    if sentence_ends and sentence_ends[-1] > len(cut) // 2:
+        cut = cut[:sentence_ends[-1]]
+    return cut.rstrip() + " ...", True
+
+
+def context_window(model: Optional[str]) -> int:
+    return LLMConstants.MODEL_CONTEXT_TOKENS.get(model or "", LLMConstants.DEFAULT_CONTEXT_TOKENS)
+
+
+_SUMMARY_PROMPT = Template("""
+Summarize the following excerpt from source material for a presentation on "$topic".
+Keep the key facts, figures, names and conclusions. Use at most $max_words words.
+
+Excerpt:
+$text
+
+Summary:""")
+_SUMMARY_STATIC_TOKENS = (
+    estimate_tokens(_SUMMARY_PROMPT.safe_substitute(topic="", text="", max_words=""))
+    + estimate_tokens(LLMConstants.SUMMARY_SYSTEM_PROMPT)
+)
+
+
+_SLIDE_PROMPT = Template("""
+You are revising slide $position of $slide_count in a presentation titled "$topic".
+Deck outline around this slide:
+$outline
+
+Current version of the slide:
+$current
+
+$instructions
+Background content: "$content"
+
+Return ONE JSON object with these fields:
+$fields
+
+Keep it consistent with the neighboring slides and do not repeat their points.
+Generate the JSON object now:""")
+
+
+@dataclass
+class BuiltPrompt:
+    """A prompt ready to send along with its token accounting"""
+    prompt: str
+    system_prompt: str
+    max_tokens: int
+    prompt_tokens: int
+    content_truncated: bool = False
+
+
+@dataclass
+class _CompiledSlidesPrompt:
+    template: Template
+    static_tokens: int
+
+
+@lru_cache(maxsize=None)
+def _compile_slides_prompt(fields: Tuple[str, ...], section: bool = False) -> _CompiledSlidesPrompt:
+    """Render the static parts of the slides (or section) prompt once per field set per process"""
+    # A section continues a deck, so its example has neither a title nor a References slide
+    examples = _EXAMPLE_SLIDES[1:-1] if section else _EXAMPLE_SLIDES
+    example = json.dumps(
+        [{field: slide[field] for field in fields} for slide in examples],
+        indent=2
+    )
+    # Escape '$' in static text so only the per-request placeholders remain
+    static = Template(_SECTION_PROMPT if section else _SLIDES_PROMPT).safe_substitute(
+        fields="\n".join(_FIELD_DESCRIPTIONS[field] for field in fields),
+        example=example.replace("$", "$$")
+    )
+    template = Template(static)
+    static_tokens = estimate_tokens(template.safe_substitute(
+        topic="", content="", num_slides="", section="", sections="", outline=""
+    ))
+    static_tokens += estimate_tokens(LLMConstants.SYSTEM_PROMPT)
+    return _CompiledSlidesPrompt(template=template, static_tokens=static_tokens)
+
+
+class PromptBuilder:
+    """Builds slide-generation prompts sized to the target model's context window"""
+
+    @staticmethod
+    def completion_budget(num_slides: int, fields: Tuple[str, ...] = SLIDE_FIELDS) -> int:
+        """Expected completion tokens for a deck with the requested fields"""
+        per_slide = LLMConstants.SLIDE_OVERHEAD_TOKENS + sum(
+            LLMConstants.SLIDE_FIELD_TOKENS.get(field, 0) for field in fields
+        )
+        budget = math.ceil(per_slide * num_slides * LLMConstants.COMPLETION_HEADROOM)
+        return max(LLMConstants.MIN_COMPLETION_TOKENS, min(budget, LLMConstants.MAX_COMPLETION_TOKENS))
+
+    def build_slides_prompt(
+        self,
+        topic: str,
+        content: str,
+        num_slides: int,
+        fields: Tuple[str, ...] = SLIDE_FIELDS,
+        model: Optional[str] = None
+    ) -> BuiltPrompt:
+        compiled = _compile_slides_prompt(tuple(fields))
+        window = context_window(model)
+        max_tokens = self.completion_budget(num_slides, fields)
+
+        topic, _ = trim_to_tokens(compact_text(topic), 64)
+        content_budget = (
+            window - max_tokens - compiled.static_tokens
+            - estimate_tokens(topic) - LLMConstants.PROMPT_SAFETY_MARGIN_TOKENS
+        )
+        # Small context windows: give up some completion room rather than all of the content
+        if content_budget < LLMConstants.MIN_COMPLETION_TOKENS:
+            max_tokens = max(LLMConstants.MIN_COMPLETION_TOKENS, max_tokens + content_budget - LLMConstants.MIN_COMPLETION_TOKENS)
+            content_budget = LLMConstants.MIN_COMPLETION_TOKENS
+
+        content, truncated = trim_to_tokens(compact_text(content), content_budget)
+        prompt = compiled.template.substitute(topic=topic, content=content, num_slides=num_slides)
+        return BuiltPrompt(
+            prompt=prompt,
+            system_prompt=LLMConstants.SYSTEM_PROMPT,
+            max_tokens=max_tokens,
+            prompt_tokens=compiled.static_tokens + estimate_tokens(topic) + estimate_tokens(content),
+            content_truncated=truncated
+        )
+
+    def build_section_prompt(
+        self,
+        topic: str,
+        content: str,
+        num_slides: int,
+        titles: List[str],
+        section: int,
+        sections: int,
+        fields: Tuple[str, ...] = SLIDE_FIELDS,
+        model: Optional[str] = None
+    ) -> BuiltPrompt:
+        """
+        Prompt for the next part of a deck generated in sections: the body
+        slides only, with the titles written so far so the model moves on
+        instead of starting the deck over. The latest titles are kept when
+        they do not all fit the outline budget.
+        """
+        compiled = _compile_slides_prompt(tuple(fields), section=True)
+        max_tokens = self.completion_budget(num_slides, fields)
+
+        lines = []
+        outline_tokens = 0
+        for position in range(len(titles) - 1, -1, -1):
+            line = f"{position + 1}. {titles[position]}"
+            outline_tokens += estimate_tokens(line)
+            if outline_tokens > LLMConstants.SECTION_OUTLINE_TOKENS:
+                break
+            lines.append(line)
+        outline = "\n".join(reversed(lines))
+
+        topic, _ = trim_to_tokens(compact_text(topic), 64)
+        content_budget = max(
+            LLMConstants.MIN_COMPLETION_TOKENS,
+            context_window(model) - max_tokens - compiled.static_tokens - estimate_tokens(topic)
+            - estimate_tokens(outline) - LLMConstants.PROMPT_SAFETY_MARGIN_TOKENS
+        )
+        content, truncated = trim_to_tokens(compact_text(content), content_budget)
+        prompt = compiled.template.substitute(
+            topic=topic, content=content, num_slides=num_slides,
+            section=section, sections=sections, outline=outline
+        )
+        return BuiltPrompt(
+            prompt=prompt,
+            system_prompt=LLMConstants.SYSTEM_PROMPT,
+            max_tokens=max_tokens,
+            prompt_tokens=compiled.static_tokens + estimate_tokens(topic) + estimate_tokens(content) + estimate_tokens(outline),
+            content_truncated=truncated
+        )
+
+    def build_slide_prompt(
+        self,
+        topic: str,
+        content: str,
+        slides: List[Dict[str, Any]],
+        index: int,
+        instructions: Optional[str] = None,
+        fields: Tuple[str, ...] = SLIDE_FIELDS,
+        model: Optional[str] = None
+    ) -> BuiltPrompt:
+        """Small prompt that regenerates one slide, with neighboring titles as context"""
+        first = max(0, index - LLMConstants.NEIGHBOR_SLIDES)
+        last = min(len(slides), index + LLMConstants.NEIGHBOR_SLIDES + 1)
+        outline = "\n".join(
+            f"{i + 1}. {slides[i].get('title', '')}" + (" <- this slide" if i == index else "")
+            for i in range(first, last)
+        )
+        current = json.dumps({field: slides[index].get(field) for field in fields if field in slides[index]})
+
+        topic, _ = trim_to_tokens(compact_text(topic), 64)
+        content, truncated = trim_to_tokens(compact_text(content), LLMConstants.SLIDE_CONTEXT_TOKENS)
+        instructions, _ = trim_to_tokens(compact_text(instructions or ""), 128)
+        prompt = _SLIDE_PROMPT.substitute(
+            position=index + 1,
+            slide_count=len(slides),
+            topic=topic,
+            outline=outline,
+            current=current,
+            instructions=f"Requested changes: {instructions}\n" if instructions else "",
+            content=content,
+            fields="\n".join(_FIELD_DESCRIPTIONS[field] for field in fields)
+        )
+        return BuiltPrompt(
+            prompt=prompt,
+            system_prompt=LLMConstants.SLIDE_SYSTEM_PROMPT,
+            max_tokens=self.completion_budget(1, fields),
+            prompt_tokens=estimate_tokens(prompt) + estimate_tokens(LLMConstants.SLIDE_SYSTEM_PROMPT),
+            content_truncated=truncated
+        )
+
+    def build_summary_prompt(self, topic: str, text: str, model: Optional[str] = None) -> BuiltPrompt:
+        """Prompt for one map (or reduce) step of long-document summarization"""
+        max_tokens = IngestionConstants.SUMMARY_TOKENS
+        text_budget = (
+            context_window(model) - max_tokens - _SUMMARY_STATIC_TOKENS
+            - LLMConstants.PROMPT_SAFETY_MARGIN_TOKENS
+        )
+        topic, _ = trim_to_tokens(compact_text(topic), 64)
+        text, truncated = trim_to_tokens(compact_text(text), text_budget)
+        prompt = _SUMMARY_PROMPT.substitute(
+            topic=topic,
+            text=text,
+            # Roughly 0.75 words per token
+            max_words=int(max_tokens * 0.75)
+        )
+        return BuiltPrompt(
+            prompt=prompt,
+            system_prompt=LLMConstants.SUMMARY_SYSTEM_PROMPT,
+            max_tokens=max_tokens,
+            prompt_tokens=_SUMMARY_STATIC_TOKENS + estimate_tokens(topic) + estimate_tokens(text),
+            content_truncated=truncated
+        )
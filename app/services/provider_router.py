@@ -0,0 +1,128 @@
+import os
+import random
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+from redis.exceptions import RedisError, WatchError
+from app.task_queue import redis_conn
+from app.services.metrics import record_route
+from app.constants.constants import ProviderRoutingConstants
+
+ROUTING_ENABLED = os.getenv("LLM_ROUTING_ENABLED", str(ProviderRoutingConstants.ENABLED)).lower() == "true"
+PREFERENCE = [name.strip() for name in os.getenv("LLM_PROVIDER_PREFERENCE", ProviderRoutingConstants.PREFERENCE).split(",") if name.strip()]
+MAX_COST_PER_1K_TOKENS = float(os.getenv("LLM_MAX_COST_PER_1K_TOKENS", ProviderRoutingConstants.MAX_COST_PER_1K_TOKENS))
+EXPLORE_RATE = float(os.getenv("LLM_ROUTING_EXPLORE_RATE", ProviderRoutingConstants.EXPLORE_RATE))
+
+FASTEST = "fastest"
+EXPLORE = "explore"
+PREFERENCE_ORDER = "preference"
+FAILOVER = "failover"
+
+
+def _stats_key(provider: str, model: str) -> str:
+    return f"{ProviderRoutingConstants.STATS_KEY_PREFIX}:{provider}:{model}"
+
+
+def _ewma(current: Optional[float], sample: float) -> float:
+    alpha = ProviderRoutingConstants.ALPHA
+    return sample if current is None else alpha * sample + (1 - alpha) * current
+
+
+class ProviderRouter:
+    """
+    Orders the LLM providers for each job by expected completion time: the
+    job's expected output tokens over the provider's measured throughput,
+    scaled up by its error rate, since a failed call is retried elsewhere.
+    Measurements are EWMAs per provider and model shared by all workers
+    through Redis. Less preferred providers (LLM_PROVIDER_PREFERENCE) must
+    be PREFERENCE_MARGIN faster per step to win, providers over the cost
+    limit are left out, and EXPLORE_RATE of jobs go to another provider
+    first so its measurements follow its recovery. Without Redis, or with
+    routing disabled, providers are tried in preference order.
+    """
+
+    def __init__(self, connection=None):
+        self.redis = connection or redis_conn
+
+    def record(self, provider: str, model: str, seconds: float, completion_tokens: int, success: bool):
+        """
+        Fold one provider call into the provider's and model's EWMAs. The
+        update is a WATCHed read-modify-write retried on conflict and calls
+        is counted with HINCRBY, so concurrent workers never drop samples.
+        """
+        key = _stats_key(provider, model)
+        try:
+            with self.redis.pipeline() as pipe:
+                while True:
+                    try:
+                        pipe.watch(key)
+                        current = {field.decode("utf-8"): float(value) for field, value in pipe.hgetall(key).items()}
+                        stats = {
+                            "latency": _ewma(current.get("latency"), seconds),
+                            "error_rate": _ewma(current.get("error_rate"), 0.0 if success else 1.0),
+                            "updated_at": time.time()
+                        }
+                        if success and completion_tokens and seconds > 0:
+                            stats["tokens_per_second"] = _ewma(current.get("tokens_per_second"), completion_tokens / seconds)
+                        pipe.multi()
+                        pipe.hset(key, mapping={field: round(value, 4) for field, value in stats.items()})
+                        pipe.hincrby(key, "calls", 1)
+                        pipe.sadd(ProviderRoutingConstants.MODELS_KEY, f"{provider}:{model}")
+                        pipe.execute()
+                        return
+                    except WatchError:
+                        # Another worker recorded a call in between; fold ours into theirs
+                        continue
+        except RedisError:
+            pass
+
+    def expected_seconds(self, provider: str, model: str, expected_tokens: int) -> float:
+        values = self.redis.hmget(_stats_key(provider, model), "tokens_per_second", "error_rate", "latency")
+        tokens_per_second, error_rate, latency = [float(value) if value is not None else None for value in values]
+        if tokens_per_second:
+            seconds = expected_tokens / tokens_per_second
+        elif latency is not None:
+            # Only failures so far: their latency is all there is to go on
+            seconds = max(latency, expected_tokens / ProviderRoutingConstants.DEFAULT_TOKENS_PER_SECOND)
+        else:
+            seconds = max(ProviderRoutingConstants.DEFAULT_LATENCY_SECONDS,
+                          expected_tokens / ProviderRoutingConstants.DEFAULT_TOKENS_PER_SECOND)
+        error_rate = min(error_rate or 0.0, ProviderRoutingConstants.MAX_ERROR_RATE)
+        return seconds / (1 - error_rate)
+
+    def rank(self, providers: Sequence, expected_tokens: int) -> Tuple[List, str]:
+        """
+        The providers (objects with name and model) to try for a job, best
+        first, and why the first one was chosen
+        """
+        allowed = [provider for provider in self._by_preference(providers) if self._within_cost(provider.name)]
+        if not ROUTING_ENABLED or len(allowed) < 2:
+            return allowed, PREFERENCE_ORDER
+        try:
+            scores: Dict[str, float] = {
+                provider.name: self.expected_seconds(provider.name, provider.model, expected_tokens)
+                * (1 + ProviderRoutingConstants.PREFERENCE_MARGIN) ** position
+                for position, provider in enumerate(allowed)
+            }
+        except RedisError as e:
+            print(f"Provider routing unavailable, using preference order: {str(e)}")
+            return allowed, PREFERENCE_ORDER
+
+        ranked = sorted(allowed, key=lambda provider: scores[provider.name])
+        if random.random() < EXPLORE_RATE:
+            ranked.insert(0, ranked.pop(random.randrange(1, len(ranked))))
+            return ranked, EXPLORE
+        return ranked, FASTEST
+
+    def record_decision(self, provider, reason: str):
+        record_route(provider.name, provider.model, reason, self.redis)
+
+    @staticmethod
+    def _by_preference(providers: Sequence) -> List:
+        """Providers in LLM_PROVIDER_PREFERENCE order; unlisted ones keep their order at the end"""
+        return sorted(providers, key=lambda provider: PREFERENCE.index(provider.name) if provider.name in PREFERENCE else len(PREFERENCE))
+
+    @staticmethod
+    def _within_cost(provider: str) -> bool:
+        if not MAX_COST_PER_1K_TOKENS:
+            return True
+        return ProviderRoutingConstants.COST_PER_1K_TOKENS.get(provider, 0.0) <= MAX_COST_PER_1K_TOKENS
@@ -0,0 +1,104 @@
+import hashlib
+import os
+from datetime import datetime
+from typing import Optional, Sequence, Tuple
+from redis.exceptions import RedisError, WatchError
+from app.task_queue import redis_conn
+from app.constants.constants import ResponseCacheConstants, PresentationStatus
+
+CACHE_TTL_SECONDS = int(os.getenv("PRESENTATION_CACHE_TTL_SECONDS", ResponseCacheConstants.TTL_SECONDS))
+
+
+def presentation_etag(presentation_id: str, updated_at: Optional[datetime], status: str,
+                      fields: Optional[Sequence[str]] = None) -> str:
+    """
+    Weak ETag of a presentation's JSON: every change bumps updated_at or the
+    status. A sparse fieldset is a different representation with its own tag.
+    """
+    version = f"{presentation_id}:{updated_at.isoformat() if updated_at else ''}:{PresentationStatus(status).value}"
+    if fields:
+        version += ":" + ",".join(fields)
+    return f'W/"{hashlib.sha1(version.encode("utf-8")).hexdigest()[:20]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match with weak comparison: W/ prefixes are ignored and lists are allowed"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if (candidate[2:] if candidate.startswith("W/") else candidate) == opaque:
+            return True
+    return False
+
+
+class PresentationCache:
+    """
+    Serialized GET /presentations/{id} responses of finished decks, with
+    their ETag, kept in Redis for a short TTL. Every code path that changes
+    a finished deck calls invalidate() after its commit, which also bumps
+    the deck's generation: a reader takes the generation before it reads
+    the row and put() only stores the body if it has not moved since, so a
+    response built from a row read before a change is never cached.
+    Redis errors are treated as cache misses.
+    """
+
+    def __init__(self, connection=None):
+        self.redis = connection or redis_conn
+
+    @staticmethod
+    def _key(presentation_id: str) -> str:
+        return f"{ResponseCacheConstants.KEY_PREFIX}:{presentation_id}"
+
+    @staticmethod
+    def _generation_key(presentation_id: str) -> str:
+        return f"{ResponseCacheConstants.KEY_PREFIX}:{presentation_id}:generation"
+
+    def get(self, presentation_id: str) -> Optional[Tuple[str, bytes]]:
+        """(etag, body) if cached"""
+        try:
+            cached = self.redis.hmget(self._key(presentation_id), "etag", "body")
+        except RedisError:
+            return None
+        if cached[0] is None or cached[1] is None:
+            return None
+        return cached[0].decode("utf-8"), cached[1]
+
+    def generation(self, presentation_id: str) -> Optional[int]:
+        """Current generation of a deck, to pass to put(); None if Redis is unavailable"""
+        try:
+            return int(self.redis.get(self._generation_key(presentation_id)) or 0)
+        except RedisError:
+            return None
+
+    def put(self, presentation_id: str, etag: str, body: bytes, generation: Optional[int]):
+        """Cache a body built from a row read at the given generation, unless the deck changed since"""
+        if generation is None:
+            return
+        generation_key = self._generation_key(presentation_id)
+        try:
+            with self.redis.pipeline() as pipe:
+                pipe.watch(generation_key)
+                if int(pipe.get(generation_key) or 0) != generation:
+                    return
+                pipe.multi()
+                pipe.hset(self._key(presentation_id), mapping={"etag": etag, "body": body})
+                pipe.expire(self._key(presentation_id), CACHE_TTL_SECONDS)
+                pipe.execute()
+        except WatchError:
+            pass
+        except RedisError:
+            pass
+
+    def invalidate(self, presentation_id: str):
+        try:
+            with self.redis.pipeline() as pipe:
+                pipe.incr(self._generation_key(presentation_id))
+                pipe.expire(self._generation_key(presentation_id), ResponseCacheConstants.GENERATION_TTL_SECONDS)
+                pipe.delete(self._key(presentation_id))
+                pipe.execute()
+        except RedisError as e:
+            print(f"Failed to invalidate cached presentation {presentation_id}: {str(e)}")
@@ -0,0 +1,170 @@
+import re
+from typing import Any, List, Optional, Tuple
+from sqlalchemy import text
+from sqlalchemy.orm import Session, load_only
+from app.models.presentation import Presentation
+from app.constants.constants import SearchConstants
+
+# -------------------------------
+# Schema
+# -------------------------------
+# SQLite: an FTS5 table whose rowids come from a small id map, since
+# presentations have string ids and FTS5 can only look rows up by rowid
+_SQLITE_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS presentation_search_ids ("
+    "rowid INTEGER PRIMARY KEY, presentation_id VARCHAR NOT NULL UNIQUE)",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS presentation_search USING fts5("
+    "topic, slides, content, tokenize='porter unicode61')"
+]
+# Postgres: one weighted tsvector per deck behind a GIN index
+_POSTGRES_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS presentation_search ("
+    "presentation_id VARCHAR PRIMARY KEY, document TSVECTOR NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS ix_presentation_search_document ON presentation_search USING GIN (document)"
+]
+
+
+def create_search_schema(target, connection, **kw):
+    """metadata after_create hook; other databases fall back to matching topics with LIKE"""
+    statements = {"sqlite": _SQLITE_SCHEMA, "postgresql": _POSTGRES_SCHEMA}.get(connection.dialect.name, [])
+    for statement in statements:
+        connection.execute(text(statement))
+
+
+def slides_text(slides_data: Any) -> str:
+    """The searchable text of generated slides: titles and bullets"""
+    if not isinstance(slides_data, list):
+        return ""
+    lines = []
+    for slide in slides_data:
+        lines.append(slide.get("title") or "")
+        lines.extend(item for item in slide.get("content") or [] if isinstance(item, str))
+    return "\n".join(line for line in lines if line)
+
+
+def _fts_query(query: str) -> Optional[str]:
+    """User input as an FTS5 query: every word must match, the last one as a prefix"""
+    terms = re.findall(r"\w+", query)
+    if not terms:
+        return None
+    return " ".join(f'"{term}"' for term in terms) + "*"
+
+
+class SearchIndex:
+    """
+    Full-text index over each deck's topic, generated slide titles and
+    bullets, and source content, ranked with bm25 on SQLite (FTS5) and
+    ts_rank_cd on Postgres. Decks are indexed when their slides are written
+    and removed with them; index() and remove() leave the commit to the
+    caller so the index changes with the rows it describes.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.dialect = db.get_bind().dialect.name
+
+    def index(self, presentation: Presentation):
+        params = {
+            "id": presentation.id,
+            "topic": presentation.topic or "",
+            "slides": slides_text(presentation.slides_data),
+            "content": (presentation.content or "")[:SearchConstants.MAX_CONTENT_CHARS]
+        }
+        if self.dialect == "sqlite":
+            self.db.execute(text("INSERT OR IGNORE INTO presentation_search_ids (presentation_id) VALUES (:id)"), params)
+            rowid = self.db.execute(
+                text("SELECT rowid FROM presentation_search_ids WHERE presentation_id = :id"), params
+            ).scalar()
+            self.db.execute(text("DELETE FROM presentation_search WHERE rowid = :rowid"), {"rowid": rowid})
+            self.db.execute(
+                text("INSERT INTO presentation_search (rowid, topic, slides, content) "
+                     "VALUES (:rowid, :topic, :slides, :content)"),
+                {**params, "rowid": rowid}
+            )
+        elif self.dialect == "postgresql":
+            self.db.execute(
+                text("INSERT INTO presentation_search (presentation_id, document) VALUES (:id, "
+                     "setweight(to_tsvector(CAST(:language AS regconfig), :topic), 'A') || "
+                     "setweight(to_tsvector(CAST(:language AS regconfig), :slides), 'B') || "
+                     "setweight(to_tsvector(CAST(:language AS regconfig), :content), 'D')) "
+                     "ON CONFLICT (presentation_id) DO UPDATE SET document = EXCLUDED.document"),
+                {**params, "language": SearchConstants.LANGUAGE}
+            )
+
+    def remove(self, presentation_ids: List[str]):
+        if not presentation_ids:
+            return
+        params = {f"id{i}": presentation_id for i, presentation_id in enumerate(presentation_ids)}
+        placeholders = ", ".join(f":{name}" for name in params)
+        if self.dialect == "sqlite":
+            self.db.execute(text(
+                "DELETE FROM presentation_search WHERE rowid IN "
+                f"(SELECT rowid FROM presentation_search_ids WHERE presentation_id IN ({placeholders}))"
+            ), params)
+            self.db.execute(text(f"DELETE FROM presentation_search_ids WHERE presentation_id IN ({placeholders})"), params)
+        elif self.dialect == "postgresql":
+            self.db.execute(text(f"DELETE FROM presentation_search WHERE presentation_id IN ({placeholders})"), params)
+
+    def search(self, query: str, skip: int = 0, limit: int = 20) -> List[Tuple[str, float]]:
+        """(presentation id, score) of the best matches, highest score first"""
+        if self.dialect == "sqlite":
+            match = _fts_query(query)
+            if match is None:
+                return []
+            # bm25 is lower for better matches
+            rows = self.db.execute(
+                text("SELECT i.presentation_id, -bm25(presentation_search, :topic, :slides, :content) AS score "
+                     "FROM presentation_search JOIN presentation_search_ids i ON i.rowid = presentation_search.rowid "
+                     "WHERE presentation_search MATCH :match ORDER BY score DESC LIMIT :limit OFFSET :skip"),
+                {
+                    "match": match, "limit": limit, "skip": skip,
+                    "topic": SearchConstants.TOPIC_WEIGHT,
+                    "slides": SearchConstants.SLIDES_WEIGHT,
+                    "content": SearchConstants.CONTENT_WEIGHT
+                }
+            )
+        elif self.dialect == "postgresql":
+            rows = self.db.execute(
+                text("SELECT presentation_id, ts_rank_cd(CAST(:weights AS float4[]), document, query) AS score "
+                     "FROM presentation_search, websearch_to_tsquery(CAST(:language AS regconfig), :query) query "
+                     "WHERE document @@ query ORDER BY score DESC LIMIT :limit OFFSET :skip"),
+                {
+                    "query": query, "limit": limit, "skip": skip,
+                    "language": SearchConstants.LANGUAGE,
+                    # D, C, B, A weights, normalized so the topic weighs 1
+                    "weights": "{%g,0,%g,1}" % (SearchConstants.CONTENT_WEIGHT / SearchConstants.TOPIC_WEIGHT,
+                                                SearchConstants.SLIDES_WEIGHT / SearchConstants.TOPIC_WEIGHT)
+                }
+            )
+        else:
+            matches = (
+                self.db.query(Presentation.id)
+                .filter(Presentation.topic.ilike(f"%{query}%"))
+                .order_by(Presentation.updated_at.desc())
+                .offset(skip)
+                .limit(limit)
+            )
+            rows = [(presentation_id, 0.0) for (presentation_id,) in matches]
+        return [(presentation_id, float(score)) for presentation_id, score in rows]
+
+    def rebuild(self, batch_size: int = SearchConstants.REINDEX_BATCH_SIZE) -> int:
+        """(Re)index every presentation with generated slides, one batch per transaction"""
+        indexed = 0
+        last_id = ""
+        while True:
+            batch = (
+                self.db.query(Presentation)
+                .options(load_only(Presentation.id, Presentation.topic, Presentation.content, Presentation.slides_data))
+                .filter(Presentation.id > last_id, Presentation.slides_data.isnot(None))
+                .order_by(Presentation.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not batch:
+                return indexed
+            for presentation in batch:
+                self.index(presentation)
+            self.db.commit()
+            indexed += len(batch)
+            last_id = batch[-1].id
+            self.db.expunge_all()
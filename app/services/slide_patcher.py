@@ -0,0 +1,185 @@
+import os
+import posixpath
+import zipfile
+import xml.etree.ElementTree as ET
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple
+from pptx import Presentation
+from sqlalchemy.orm import object_session
+from app.services.pptx_creator import PPTXCreator
+from app.services.thumbnail_renderer import ThumbnailRenderer
+from app.services.master_styler import MasterStyle
+from app.services.storage import get_storage
+from app.services.slide_store import store_slide
+from app.services.search_index import SearchIndex
+from app.utils.theme_resolver import ThemeResolver
+from app.utils.auto_layout import AutoLayout
+from app.constants.constants import SlideLayoutType
+
+_RELS_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+_REL_LAYOUT = "/slideLayout"
+_REL_NOTES = "/notesSlide"
+_THEME_PART = "ppt/theme/theme1.xml"
+
+
+class _RenderedPart:
+    """Serialized XML of one rendered slide and its notes, plus the layout it uses"""
+
+    def __init__(self, slide_xml: bytes, notes_xml: Optional[bytes], layout: str):
+        self.slide_xml = slide_xml
+        self.notes_xml = notes_xml
+        self.layout = layout
+
+
+def _render_parts(slide_data: Dict[str, Any], config: Dict[str, Any]) -> List[_RenderedPart]:
+    """
+    Render one slides_data entry into a scratch presentation. Some slide types
+    fall back to an extra bullet slide, so one entry can produce several parts.
+    """
+    creator = PPTXCreator()
+    creator.config = config
+    creator.presentation = Presentation()
+    creator._create_slide(slide_data)
+
+    parts = []
+    for slide in creator.presentation.slides:
+        notes_xml = slide.notes_slide.part.blob if slide.has_notes_slide else None
+        parts.append(_RenderedPart(
+            slide.part.blob, notes_xml, posixpath.basename(slide.slide_layout.part.partname)
+        ))
+    return parts
+
+
+@lru_cache(maxsize=None)
+def _part_count(slide_type: str) -> int:
+    """How many slide parts PPTXCreator emits for a slide type"""
+    sample = {"title": "", "slide_type": slide_type, "content": []}
+    return len(_render_parts(sample, {}))
+
+
+def part_counts(slides_data: List[Dict[str, Any]]) -> List[int]:
+    return [
+        _part_count(slide.get("slide_type", SlideLayoutType.BULLET_POINTS.value))
+        for slide in slides_data
+    ]
+
+
+def _read_slide_rels(package: zipfile.ZipFile, slide_name: str) -> Dict[str, str]:
+    """Map relationship type suffix -> target for a slide part"""
+    rels_name = posixpath.join(posixpath.dirname(slide_name), "_rels", posixpath.basename(slide_name) + ".rels")
+    root = ET.fromstring(package.read(rels_name))
+    targets = {}
+    for rel in root.iter(f"{_RELS_NS}Relationship"):
+        rel_type = rel.get("Type", "")
+        for suffix in (_REL_LAYOUT, _REL_NOTES):
+            if rel_type.endswith(suffix):
+                targets[suffix] = posixpath.normpath(posixpath.join(posixpath.dirname(slide_name), rel.get("Target")))
+    return targets
+
+
+class SlidePatcher:
+    """
+    Rewrites a single slide of a stored .pptx in place.
+
+    The edited entry is rendered on its own, and only its slide XML and notes
+    XML are swapped into the package; every other zip member is copied through
+    unchanged. When the edit changes the slide's structure (layout, number of
+    parts, or whether it has notes) or the deck was rendered with a different
+    master style, the caller has to do a full render.
+
+    The stored deck is fetched to a scratch file, patched there and put back.
+    """
+
+    def patch(self, key: str, slides_data: List[Dict[str, Any]], index: int,
+              slide_data: Dict[str, Any], config: Dict[str, Any]) -> bool:
+        """Patch slide `index` of the deck rendered from slides_data; False if not possible"""
+        storage = get_storage()
+        if not key or not storage.exists(key):
+            return False
+
+        counts = part_counts(slides_data)
+        new_parts = _render_parts(slide_data, config)
+        if len(new_parts) != counts[index]:
+            return False
+
+        file_path = storage.scratch_file(".pptx")
+        try:
+            storage.get_file(key, file_path)
+            if not self._patch_file(file_path, counts, index, new_parts, config):
+                return False
+            storage.put_file(key, file_path)
+        finally:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+        return True
+
+    @staticmethod
+    def _patch_file(file_path: str, counts: List[int], index: int, new_parts: List[_RenderedPart],
+                    config: Dict[str, Any]) -> bool:
+        with zipfile.ZipFile(file_path) as package:
+            slide_names = [name for name in package.namelist()
+                           if name.startswith("ppt/slides/slide") and name.endswith(".xml")]
+            if len(slide_names) != sum(counts):
+                return False
+            # Slides only carry what differs from the master style, so it has to match
+            if package.read(_THEME_PART) != MasterStyle.from_config(config).theme_xml():
+                return False
+
+            # Slides are only ever appended, so slideN.xml is the Nth slide
+            first = sum(counts[:index])
+            replacements = {}
+            for offset, part in enumerate(new_parts):
+                slide_name = f"ppt/slides/slide{first + offset + 1}.xml"
+                rels = _read_slide_rels(package, slide_name)
+                if posixpath.basename(rels.get(_REL_LAYOUT, "")) != part.layout:
+                    return False
+                if (_REL_NOTES in rels) != (part.notes_xml is not None):
+                    return False
+
+                replacements[slide_name] = part.slide_xml
+                if part.notes_xml is not None:
+                    replacements[rels[_REL_NOTES]] = part.notes_xml
+
+            partial_path = f"{file_path}.part"
+            try:
+                with zipfile.ZipFile(partial_path, "w") as patched:
+                    for item in package.infolist():
+                        patched.writestr(item, replacements.get(item.filename) or package.read(item))
+                os.replace(partial_path, file_path)
+            finally:
+                if os.path.exists(partial_path):
+                    os.remove(partial_path)
+        return True
+
+
+def apply_slide_update(presentation, index: int, slide_data: Dict[str, Any]) -> bool:
+    """
+    Replace one slides_data entry and its slides row and bring the .pptx,
+    thumbnails and search index up to date.
+    Returns True when the slide was patched in place, False after a full render.
+    The caller commits the session.
+    """
+    config = ThemeResolver.build_render_config(presentation.style_config)
+    # Refit the edited slide's text; splitting would shift every later slide
+    slide_data = AutoLayout(config["font"]).fit([slide_data], allow_split=False)[0]
+    old_slides = list(presentation.slides_data)
+    new_slides = old_slides[:index] + [slide_data] + old_slides[index + 1:]
+
+    patched = SlidePatcher().patch(presentation.file_path, old_slides, index, slide_data, config)
+    if not patched:
+        presentation.file_path = PPTXCreator().create_presentation(
+            slides_data=new_slides,
+            topic=presentation.topic,
+            config=config,
+            presentation_id=presentation.id
+        )
+
+    # Assign a new list so the JSON column is flagged as changed
+    presentation.slides_data = new_slides
+    store_slide(object_session(presentation), presentation.id, new_slides, index)
+    SearchIndex(object_session(presentation)).index(presentation)
+    try:
+        ThumbnailRenderer().write_thumbnail(presentation.id, index, slide_data, config)
+    except Exception as e:
+        print(f"Failed to update thumbnail {index} for {presentation.id}: {str(e)}")
+    return patched
@@ -0,0 +1,107 @@
+from typing import Any, Dict, List, Optional
+from sqlalchemy import delete, insert, update, select
+from sqlalchemy.orm import Session, load_only
+from app.models.presentation import Presentation, Slide
+from app.constants.constants import SlideStoreConstants
+
+
+def _slide_row(presentation_id: str, position: int, slide: Dict[str, Any]) -> Dict[str, Any]:
+    row = {"presentation_id": presentation_id, "position": position}
+    for name in SlideStoreConstants.TYPED_FIELDS:
+        row[name] = slide.get(name)
+    row["title"] = row["title"] or ""
+    extra = {key: value for key, value in slide.items() if key not in SlideStoreConstants.TYPED_FIELDS}
+    row["extra"] = extra or None
+    return row
+
+
+def slide_dict(slide: Slide) -> Dict[str, Any]:
+    """A slide row back in its slides_data form"""
+    data = {name: getattr(slide, name) for name in SlideStoreConstants.TYPED_FIELDS if getattr(slide, name) is not None}
+    data.update(slide.extra or {})
+    return data
+
+
+def replace_slides(db: Session, presentation_id: str, slides: List[Dict[str, Any]]):
+    """Write a deck's slides as rows in one bulk insert, replacing any it had; the caller commits"""
+    db.execute(delete(Slide).where(Slide.presentation_id == presentation_id))
+    if slides:
+        db.execute(insert(Slide), [_slide_row(presentation_id, position, slide)
+                                   for position, slide in enumerate(slides)])
+
+
+def store_slide(db: Session, presentation_id: str, slides: List[Dict[str, Any]], position: int):
+    """
+    Rewrite the row of slides[position] only; a deck that has no rows yet
+    (not backfilled) gets all of them. The caller commits.
+    """
+    row = _slide_row(presentation_id, position, slides[position])
+    result = db.execute(
+        update(Slide)
+        .where(Slide.presentation_id == presentation_id, Slide.position == position)
+        .values({key: value for key, value in row.items() if key not in ("presentation_id", "position")})
+    )
+    if result.rowcount == 0:
+        replace_slides(db, presentation_id, slides)
+
+
+def delete_slides(db: Session, presentation_ids: List[str]):
+    db.execute(delete(Slide).where(Slide.presentation_id.in_(presentation_ids)))
+
+
+def get_slides(db: Session, presentation_id: str, start: int = 0,
+               count: Optional[int] = None) -> Optional[List[Dict[str, Any]]]:
+    """
+    Slides start to start + count of a deck, read from their rows. Decks
+    written before the slides table existed are read from slides_data until
+    they are backfilled. None if the presentation does not exist.
+    """
+    query = (
+        db.query(Slide)
+        .filter(Slide.presentation_id == presentation_id, Slide.position >= start)
+        .order_by(Slide.position)
+    )
+    if count is not None:
+        query = query.limit(count)
+    slides = [slide_dict(slide) for slide in query.all()]
+    if slides:
+        return slides
+
+    presentation = (
+        db.query(Presentation)
+        .options(load_only(Presentation.id, Presentation.slides_data))
+        .filter(Presentation.id == presentation_id)
+        .first()
+    )
+    if presentation is None:
+        return None
+    blob = presentation.slides_data or []
+    return blob[start:start + count if count is not None else None]
+
+
+def backfill_slides(db: Session, batch_size: int = SlideStoreConstants.BACKFILL_BATCH_SIZE) -> int:
+    """
+    Copy the slides_data of every presentation without slide rows into the
+    slides table, one batch of decks per transaction. Safe to rerun and to
+    run while the service writes new decks. Returns the decks backfilled.
+    """
+    backfilled = 0
+    last_id = ""
+    while True:
+        has_rows = select(Slide.presentation_id).where(Slide.presentation_id == Presentation.id).exists()
+        batch = (
+            db.query(Presentation)
+            .options(load_only(Presentation.id, Presentation.slides_data))
+            .filter(Presentation.id > last_id, Presentation.slides_data.isnot(None), ~has_rows)
+            .order_by(Presentation.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not batch:
+            return backfilled
+        for presentation in batch:
+            if isinstance(presentation.slides_data, list):
+                replace_slides(db, presentation.id, presentation.slides_data)
+                backfilled += 1
+        db.commit()
+        last_id = batch[-1].id
@@ -0,0 +1,192 @@
+import re
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple
+from xml.sax.saxutils import escape
+from pptx import Presentation
+from pptx.util import Inches, Pt
+from app.constants.constants import PPTXConstants, SlideLayoutType
+from app.utils.theme_resolver import ThemeResolver
+
+# (slide XML, layout part name, notes XML or None), as PackageWriter.add_slide takes them
+SlidePart = Tuple[bytes, str, Optional[bytes]]
+
+_XML_DECL = "<?xml version='1.0' encoding='UTF-8' standalone='yes'?>\n"
+_NSDECLS = (
+    'xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main" '
+    'xmlns:p="http://schemas.openxmlformats.org/presentationml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"'
+)
+
+# -------------------------------
+# Templates, matching what python-pptx writes for the default template
+# -------------------------------
+_SLIDE = (
+    _XML_DECL + f'<p:sld {_NSDECLS}><p:cSld><p:spTree><p:nvGrpSpPr><p:cNvPr id="1" name=""/>'
+    '<p:cNvGrpSpPr/><p:nvPr/></p:nvGrpSpPr><p:grpSpPr/>{shapes}</p:spTree></p:cSld>'
+    '<p:clrMapOvr><a:masterClrMapping/></p:clrMapOvr></p:sld>'
+)
+_PLACEHOLDER = (
+    '<p:sp><p:nvSpPr><p:cNvPr id="{id}" name="{name}"/><p:cNvSpPr><a:spLocks noGrp="1"/></p:cNvSpPr>'
+    '<p:nvPr>{ph}</p:nvPr></p:nvSpPr><p:spPr/><p:txBody><a:bodyPr/><a:lstStyle/>{paragraphs}</p:txBody></p:sp>'
+)
+_TEXTBOX = (
+    '<p:sp><p:nvSpPr><p:cNvPr id="{id}" name="TextBox {number}"/><p:cNvSpPr txBox="1"/><p:nvPr/></p:nvSpPr>'
+    '<p:spPr><a:xfrm><a:off x="{x}" y="{y}"/><a:ext cx="{cx}" cy="{cy}"/></a:xfrm><a:prstGeom prst="rect"><a:avLst/>'
+    '</a:prstGeom><a:noFill/></p:spPr><p:txBody><a:bodyPr wrap="none"><a:spAutoFit/></a:bodyPr><a:lstStyle/>'
+    '{paragraphs}</p:txBody></p:sp>'
+)
+_NOTES = (
+    _XML_DECL + f'<p:notes {_NSDECLS}><p:cSld><p:spTree><p:nvGrpSpPr><p:cNvPr id="1" name=""/><p:cNvGrpSpPr/>'
+    '<p:nvPr/></p:nvGrpSpPr><p:grpSpPr><a:xfrm><a:off x="0" y="0"/><a:ext cx="0" cy="0"/><a:chOff x="0" y="0"/>'
+    '<a:chExt cx="0" cy="0"/></a:xfrm></p:grpSpPr><p:sp><p:nvSpPr><p:cNvPr id="2" name="Slide Image Placeholder 1"/>'
+    '<p:cNvSpPr><a:spLocks noGrp="1"/></p:cNvSpPr><p:nvPr><p:ph type="sldImg" idx="2"/></p:nvPr></p:nvSpPr>'
+    '<p:spPr/></p:sp><p:sp><p:nvSpPr><p:cNvPr id="3" name="Notes Placeholder 2"/><p:cNvSpPr><a:spLocks noGrp="1"/>'
+    '</p:cNvSpPr><p:nvPr><p:ph type="body" idx="3" sz="quarter"/></p:nvPr></p:nvSpPr><p:spPr/><p:txBody><a:bodyPr/>'
+    '<a:lstStyle/>{paragraphs}</p:txBody></p:sp><p:sp><p:nvSpPr><p:cNvPr id="4" name="Slide Number Placeholder 3"/>'
+    '<p:cNvSpPr><a:spLocks noGrp="1"/></p:cNvSpPr><p:nvPr><p:ph type="sldNum" idx="5" sz="quarter"/></p:nvPr>'
+    '</p:nvSpPr><p:spPr/></p:sp></p:spTree></p:cSld><p:clrMapOvr><a:masterClrMapping/></p:clrMapOvr></p:notes>'
+)
+_REFERENCE_PROPERTIES = '<a:rPr sz="{size}"><a:solidFill><a:srgbClr val="{color}"/></a:solidFill></a:rPr>'
+
+# Title placeholder and body placeholders of each layout, by layout index
+_TITLE_PLACEHOLDERS = {
+    PPTXConstants.TITLE_LAYOUT_INDEX: '<p:ph type="ctrTitle"/>'
+}
+_BODY_PLACEHOLDERS = {
+    PPTXConstants.TITLE_LAYOUT_INDEX: [("Subtitle 2", '<p:ph type="subTitle" idx="1"/>')],
+    PPTXConstants.CONTENT_LAYOUT_INDEX: [("Content Placeholder 2", '<p:ph idx="1"/>')],
+    PPTXConstants.TWO_COLUMN_LAYOUT_INDEX: [
+        ("Content Placeholder 2", '<p:ph idx="1" sz="half"/>'),
+        ("Content Placeholder 3", '<p:ph idx="2" sz="half"/>')
+    ],
+    PPTXConstants.PICTURE_LAYOUT_INDEX: []
+}
+
+# python-pptx turns these into <a:br/> within a paragraph, and escapes other control characters
+_LINE_BREAK = re.compile("\n|\v")
+_CONTROL_CHARS = re.compile(r"([\x00-\x08\x0B-\x1F])")
+
+
+@lru_cache(maxsize=None)
+def _layout_names() -> Dict[int, str]:
+    """Layout index -> slide layout part name in the default template"""
+    layouts = Presentation().slide_layouts
+    return {index: layouts[index].part.partname.split("/")[-1] for index in _BODY_PLACEHOLDERS}
+
+
+def _escape_text(text: str) -> str:
+    return escape(_CONTROL_CHARS.sub(lambda match: "_x%04X_" % ord(match.group(1)), text))
+
+
+class SlideXMLRenderer:
+    """
+    Renders the built-in slide types straight to slide XML from the templates
+    above, with no python-pptx objects involved. The output matches what
+    PPTXCreator builds shape by shape; slides with unexpected field types
+    return None so the caller renders them the slow way.
+
+    Colors, fonts and default sizes come from the master style, so only the
+    reference text and fitted font sizes carry run properties.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        colors = ThemeResolver.get_theme_colors(config or {})
+        self.reference_properties = _REFERENCE_PROPERTIES.format(
+            size=Pt(PPTXConstants.REFERENCE_FONT_SIZE).centipoints, color=ThemeResolver.get_reference_color(colors)
+        )
+
+    def render(self, slide_data: Dict[str, Any]) -> Optional[List[SlidePart]]:
+        """The slide parts for one slides_data entry, or None if it needs the python-pptx path"""
+        if not self._is_plain(slide_data):
+            return None
+
+        slide_type = slide_data.get("slide_type", SlideLayoutType.BULLET_POINTS.value)
+        content = slide_data.get("content", [])
+        font_size = slide_data.get("font_size")
+
+        if slide_type == SlideLayoutType.TITLE.value:
+            run_properties = self._size_properties(font_size, PPTXConstants.SUBTITLE_FONT_SIZE)
+            subtitle = self._paragraphs("\n".join(content).split("\n"), "", run_properties)
+            return [self._slide(slide_data, PPTXConstants.TITLE_LAYOUT_INDEX, [subtitle])]
+
+        if slide_type == SlideLayoutType.TWO_COLUMN.value:
+            mid_point = len(content) // 2
+            columns = [self._bullets(content[:mid_point], font_size), self._bullets(content[mid_point:], font_size)]
+            return [self._slide(slide_data, PPTXConstants.TWO_COLUMN_LAYOUT_INDEX, columns)]
+
+        bullets = self._slide(slide_data, PPTXConstants.CONTENT_LAYOUT_INDEX, [self._bullets(content, font_size)])
+        if slide_type == SlideLayoutType.CONTENT_WITH_IMAGE.value:
+            # The picture layout has no body placeholder, so PPTXCreator adds a bullet slide after it
+            return [self._slide(slide_data, PPTXConstants.PICTURE_LAYOUT_INDEX, []), bullets]
+        return [bullets]
+
+    @staticmethod
+    def _is_plain(slide_data: Dict[str, Any]) -> bool:
+        content = slide_data.get("content", [])
+        return (
+            isinstance(slide_data.get("title"), str)
+            and isinstance(content, list) and all(isinstance(item, str) for item in content)
+            and all(not slide_data.get(key) or isinstance(slide_data[key], str) for key in ("notes", "reference"))
+            and isinstance(slide_data.get("font_size") or 0, (int, float))
+        )
+
+    # -------------------------------
+    # Slide assembly
+    # -------------------------------
+    def _slide(self, slide_data: Dict[str, Any], layout_index: int, bodies: List[str]) -> SlidePart:
+        title = self._paragraphs(slide_data["title"].split("\n"), "", "")
+        shapes = [_PLACEHOLDER.format(
+            id=2, name="Title 1", ph=_TITLE_PLACEHOLDERS.get(layout_index, '<p:ph type="title"/>'), paragraphs=title
+        )]
+        for (name, ph), paragraphs in zip(_BODY_PLACEHOLDERS[layout_index], bodies):
+            shapes.append(_PLACEHOLDER.format(id=len(shapes) + 2, name=name, ph=ph, paragraphs=paragraphs))
+
+        if slide_data.get("reference"):
+            shape_id = len(shapes) + 2
+            shapes.append(_TEXTBOX.format(
+                id=shape_id, number=shape_id - 1,
+                x=Inches(PPTXConstants.REFERENCE_LEFT), y=Inches(PPTXConstants.REFERENCE_TOP),
+                cx=Inches(PPTXConstants.REFERENCE_WIDTH), cy=Inches(PPTXConstants.REFERENCE_HEIGHT),
+                # PPTXCreator only formats the reference's first run
+                paragraphs=self._paragraph(slide_data["reference"], '<a:pPr algn="r"/>', self.reference_properties, "")
+            ))
+
+        slide_xml = _SLIDE.format(shapes="".join(shapes))
+        notes_xml = None
+        if slide_data.get("notes"):
+            notes_xml = _NOTES.format(paragraphs=self._paragraphs(slide_data["notes"].split("\n"), "", "")).encode("utf-8")
+        return slide_xml.encode("utf-8"), _layout_names()[layout_index], notes_xml
+
+    # -------------------------------
+    # Text
+    # -------------------------------
+    def _bullets(self, items: List[str], font_size: Optional[float]) -> str:
+        if not items:
+            return "<a:p/>"
+        # Setting the paragraph level leaves an empty a:pPr behind
+        return self._paragraphs(items, "<a:pPr/>", self._size_properties(font_size, PPTXConstants.BULLET_FONT_SIZE))
+
+    def _paragraphs(self, lines: List[str], paragraph_properties: str, run_properties: str) -> str:
+        return "".join(self._paragraph(line, paragraph_properties, run_properties) for line in lines)
+
+    @staticmethod
+    def _paragraph(text: str, paragraph_properties: str, run_properties: str,
+                   later_run_properties: Optional[str] = None) -> str:
+        content = []
+        for i, part in enumerate(_LINE_BREAK.split(text)):
+            if i:
+                content.append("<a:br/>")
+            if part:
+                properties = run_properties if later_run_properties is None or len(content) == 0 else later_run_properties
+                content.append(f"<a:r>{properties}<a:t>{_escape_text(part)}</a:t></a:r>")
+
+        if not paragraph_properties and not content:
+            return "<a:p/>"
+        return f"<a:p>{paragraph_properties}{''.join(content)}</a:p>"
+
+    @staticmethod
+    def _size_properties(size: Optional[float], default: int) -> str:
+        """Run properties for a fitted font size; empty when the master default applies"""
+        if not size or size == default:
+            return ""
+        return f'<a:rPr sz="{Pt(size).centipoints}"/>'
@@ -0,0 +1,309 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from abc import ABC, abstractmethod
+from typing import BinaryIO, Iterator, NamedTuple, Optional
+from app.constants.constants import StorageConstants
+
+try:
+    import boto3
+    from boto3.s3.transfer import TransferConfig
+except ImportError:  # boto3 is only needed for the S3 backend
+    boto3 = None
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", StorageConstants.BACKEND).lower()
+STORAGE_LOCAL_ROOT = os.getenv("STORAGE_LOCAL_ROOT", StorageConstants.LOCAL_ROOT)
+S3_BUCKET = os.getenv("S3_BUCKET", StorageConstants.S3_BUCKET)
+S3_PREFIX = os.getenv("S3_PREFIX", StorageConstants.S3_PREFIX)
+# Point at MinIO or another S3-compatible server; unset for AWS
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL") or None
+
+
+def shard(name: str) -> str:
+    """Hash-derived directory path ("ab/cd") that spreads names across SHARD_DEPTH levels"""
+    digest = hashlib.sha1(name.encode("utf-8")).hexdigest()
+    return "/".join(digest[i * StorageConstants.SHARD_WIDTH:(i + 1) * StorageConstants.SHARD_WIDTH]
+                    for i in range(StorageConstants.SHARD_DEPTH))
+
+
+class StoredObject(NamedTuple):
+    key: str
+    size: int
+    modified: float  # seconds since the epoch
+
+
+class Storage(ABC):
+    """
+    Where rendered decks, their thumbnails and uploaded source documents
+    live, addressed by key. Decks have bare keys; thumbnails and uploads
+    are grouped under "thumbnails/<shard>/<id>/" and "uploads/<shard>/",
+    with the shard derived from the presentation id. Files are always
+    moved in and out through local scratch files and read back in
+    fixed-size chunks, so no backend holds a whole deck in memory.
+    """
+
+    @property
+    @abstractmethod
+    def scratch_dir(self) -> str:
+        """Local directory to render into before put_file"""
+        pass
+
+    @abstractmethod
+    def put_file(self, key: str, source_path: str) -> None:
+        """Store a finished local file under key, replacing any previous one. The source file is consumed."""
+        pass
+
+    @abstractmethod
+    def get_file(self, key: str, dest_path: str) -> None:
+        """Copy a stored file to a local path"""
+        pass
+
+    @abstractmethod
+    def open(self, key: str) -> BinaryIO:
+        """Binary stream of a stored file"""
+        pass
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        pass
+
+    @abstractmethod
+    def size(self, key: str) -> int:
+        pass
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Remove a stored file; missing keys are ignored"""
+        pass
+
+    @abstractmethod
+    def iter_objects(self, prefix: str = "") -> Iterator[StoredObject]:
+        """Every stored file whose key starts with prefix, listed lazily"""
+        pass
+
+    def sweep_scratch(self, older_than: float) -> int:
+        """Remove scratch files last modified before `older_than`; returns bytes reclaimed"""
+        return 0
+
+    def scratch_file(self, suffix: str = "") -> str:
+        """Path of a new, empty scratch file; the caller removes it or hands it to put_file"""
+        os.makedirs(self.scratch_dir, exist_ok=True)
+        handle, path = tempfile.mkstemp(suffix=suffix, dir=self.scratch_dir)
+        os.close(handle)
+        return path
+
+    def iter_chunks(self, key: str, chunk_size: int = StorageConstants.CHUNK_SIZE) -> Iterator[bytes]:
+        with self.open(key) as stream:
+            for chunk in iter(lambda: stream.read(chunk_size), b""):
+                yield chunk
+
+    def put_bytes(self, key: str, data: bytes) -> None:
+        """Store a small object, such as a thumbnail, held in memory"""
+        path = self.scratch_file()
+        with open(path, "wb") as f:
+            f.write(data)
+        self.put_file(key, path)
+
+    def read_bytes(self, key: str) -> bytes:
+        """Whole content of a small stored object"""
+        with self.open(key) as stream:
+            return stream.read()
+
+
+# -------------------------------
+# Local disk
+# -------------------------------
+class LocalStorage(Storage):
+    """
+    Files under a root directory. Bare keys are sharded by a hash of the key
+    (root/ab/cd/<key>) so no directory grows without bound; grouped keys
+    carry their shard in the key (thumbnails/ab/cd/<id>/slide_0.svg) and
+    are stored at that path, so a deck's group can be listed from one
+    directory. Writes land in a staging directory on the same
+    filesystem and are renamed into place, so readers never see a partial
+    file.
+    """
+
+    def __init__(self, root: str = STORAGE_LOCAL_ROOT):
+        self.root = root
+
+    @property
+    def scratch_dir(self) -> str:
+        return os.path.join(self.root, StorageConstants.STAGING_DIR)
+
+    def path(self, key: str) -> str:
+        # Decks stored before sharding kept their relative path as the key
+        if key.startswith(self.root + os.sep):
+            return key
+        if "/" in key:
+            return os.path.join(self.root, *key.split("/"))
+        return os.path.join(self.root, *shard(key).split("/"), key)
+
+    def put_file(self, key: str, source_path: str) -> None:
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            os.replace(source_path, path)
+        except OSError:
+            # Different filesystem: copy into staging first, then rename
+            partial_path = self.scratch_file()
+            try:
+                shutil.copyfile(source_path, partial_path)
+                os.replace(partial_path, path)
+            finally:
+                if os.path.exists(partial_path):
+                    os.remove(partial_path)
+            os.remove(source_path)
+
+    def get_file(self, key: str, dest_path: str) -> None:
+        shutil.copyfile(self.path(key), dest_path)
+
+    def open(self, key: str) -> BinaryIO:
+        return open(self.path(key), "rb")
+
+    def exists(self, key: str) -> bool:
+        return os.path.isfile(self.path(key))
+
+    def size(self, key: str) -> int:
+        return os.path.getsize(self.path(key))
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def iter_objects(self, prefix: str = "") -> Iterator[StoredObject]:
+        if "/" in prefix:
+            yield from self._iter_group(prefix)
+            return
+        if not os.path.isdir(self.root):
+            return
+        for entry in os.scandir(self.root):
+            if not entry.name.startswith(prefix):
+                continue
+            if entry.is_file():
+                # Flat files from before sharding
+                yield self._stored(entry, os.path.join(self.root, entry.name))
+            elif entry.is_dir() and self._is_shard(entry.name):
+                yield from self._iter_shard(entry.path, StorageConstants.SHARD_DEPTH - 1)
+
+    def sweep_scratch(self, older_than: float) -> int:
+        reclaimed = 0
+        if not os.path.isdir(self.scratch_dir):
+            return reclaimed
+        for entry in os.scandir(self.scratch_dir):
+            stat = entry.stat()
+            if entry.is_file() and stat.st_mtime < older_than:
+                os.remove(entry.path)
+                reclaimed += stat.st_size
+        return reclaimed
+
+    def _iter_shard(self, directory: str, depth: int) -> Iterator[StoredObject]:
+        for entry in os.scandir(directory):
+            if depth and entry.is_dir() and self._is_shard(entry.name):
+                yield from self._iter_shard(entry.path, depth - 1)
+            elif not depth and entry.is_file():
+                yield self._stored(entry, entry.name)
+
+    def _iter_group(self, prefix: str) -> Iterator[StoredObject]:
+        """Grouped keys under the directory part of prefix"""
+        group = prefix.rsplit("/", 1)[0]
+        directory = os.path.join(self.root, *group.split("/"))
+        for dirpath, _, names in os.walk(directory):
+            relative = os.path.relpath(dirpath, self.root).replace(os.sep, "/")
+            for name in names:
+                key = f"{relative}/{name}"
+                if key.startswith(prefix):
+                    stat = os.stat(os.path.join(dirpath, name))
+                    yield StoredObject(key, stat.st_size, stat.st_mtime)
+
+    @staticmethod
+    def _is_shard(name: str) -> bool:
+        return len(name) == StorageConstants.SHARD_WIDTH and all(c in "0123456789abcdef" for c in name)
+
+    @staticmethod
+    def _stored(entry: os.DirEntry, key: str) -> StoredObject:
+        stat = entry.stat()
+        return StoredObject(key, stat.st_size, stat.st_mtime)
+
+
+# -------------------------------
+# S3-compatible object storage
+# -------------------------------
+class S3Storage(Storage):
+    """
+    Objects in an S3 bucket (or MinIO and other S3-compatible servers via
+    S3_ENDPOINT_URL). Uploads and downloads go through boto3's managed
+    transfers, which stream in multipart chunks; an object only becomes
+    visible once its upload completes.
+    """
+
+    def __init__(self, bucket: str = S3_BUCKET, prefix: str = S3_PREFIX, endpoint_url: Optional[str] = S3_ENDPOINT_URL,
+                 client=None):
+        if client is None:
+            if boto3 is None:
+                raise RuntimeError("The S3 storage backend requires boto3 (pip install boto3)")
+            client = boto3.client("s3", endpoint_url=endpoint_url)
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+        self.transfer_config = TransferConfig(
+            multipart_threshold=StorageConstants.MULTIPART_THRESHOLD,
+            multipart_chunksize=StorageConstants.CHUNK_SIZE
+        ) if boto3 is not None else None
+
+    @property
+    def scratch_dir(self) -> str:
+        return tempfile.gettempdir()
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    def put_file(self, key: str, source_path: str) -> None:
+        try:
+            self.client.upload_file(source_path, self.bucket, self._key(key), Config=self.transfer_config)
+        finally:
+            os.remove(source_path)
+
+    def get_file(self, key: str, dest_path: str) -> None:
+        self.client.download_file(self.bucket, self._key(key), dest_path, Config=self.transfer_config)
+
+    def open(self, key: str) -> BinaryIO:
+        return self.client.get_object(Bucket=self.bucket, Key=self._key(key))["Body"]
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.size(key)
+            return True
+        except self.client.exceptions.ClientError:
+            return False
+
+    def size(self, key: str) -> int:
+        return self.client.head_object(Bucket=self.bucket, Key=self._key(key))["ContentLength"]
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+    def iter_objects(self, prefix: str = "") -> Iterator[StoredObject]:
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self._key(prefix)):
+            for item in page.get("Contents", []):
+                yield StoredObject(item["Key"][len(self.prefix):], item["Size"], item["LastModified"].timestamp())
+
+
+_storage: Optional[Storage] = None
+
+
+def get_storage() -> Storage:
+    """The process-wide storage backend selected by STORAGE_BACKEND"""
+    global _storage
+    if _storage is None:
+        if STORAGE_BACKEND == StorageConstants.S3:
+            _storage = S3Storage()
+        elif STORAGE_BACKEND == StorageConstants.LOCAL:
+            _storage = LocalStorage()
+        else:
+            raise ValueError(f"Unknown storage backend '{STORAGE_BACKEND}'")
+    return _storage
@@ -0,0 +1,168 @@
+from html import escape
+from typing import List, Dict, Any, Optional, Tuple
+from app.constants.constants import PPTXConstants, SlideLayoutType, FilePaths
+from app.utils.theme_resolver import ThemeResolver
+from app.utils.slide_geometry import layout_geometry
+from app.services.storage import Storage, get_storage, shard
+
+THUMBNAIL_WIDTH = 320
+SLIDE_HEIGHT_IN = 7.5
+SLIDE_WIDTHS_IN = {"16:9": 13.33, "4:3": 10.0}
+
+# Average glyph advance as a fraction of the font size, for truncating text
+AVERAGE_CHAR_WIDTH = 0.5
+MIN_TEXT_PX = 3.0
+
+
+def _fit(text: str, width_px: float, size_px: float) -> str:
+    """Truncate a line so it roughly fits the box at the given font size"""
+    max_chars = max(1, int(width_px / (size_px * AVERAGE_CHAR_WIDTH)))
+    return text if len(text) <= max_chars else text[:max_chars - 1].rstrip() + "…"
+
+
+class ThumbnailRenderer:
+    """
+    Draws simplified SVG thumbnails straight from slides_data and the layout
+    geometry, so listing pages never need the .pptx or an office suite.
+    Thumbnails are kept in the storage backend under thumbnails/<shard>/<id>/.
+    """
+
+    def __init__(self, storage: Optional[Storage] = None):
+        self.storage = storage or get_storage()
+
+    @staticmethod
+    def thumbnail_prefix(presentation_id: str) -> str:
+        return f"{FilePaths.THUMBNAILS_DIR}/{shard(presentation_id)}/{presentation_id}/"
+
+    @classmethod
+    def thumbnail_key(cls, presentation_id: str, slide_index: int) -> str:
+        return f"{cls.thumbnail_prefix(presentation_id)}slide_{slide_index}.svg"
+
+    @classmethod
+    def slide_count(cls, presentation_id: str, storage: Optional[Storage] = None) -> int:
+        storage = storage or get_storage()
+        return sum(1 for stored in storage.iter_objects(cls.thumbnail_prefix(presentation_id))
+                   if stored.key.endswith(".svg"))
+
+    def write_thumbnails(self, presentation_id: str, slides_data: List[Dict[str, Any]], config: Optional[Dict[str, Any]] = None) -> List[str]:
+        """Render every slide in one batch, replacing the deck's thumbnails and dropping any past its last slide"""
+        context = self._context(config or {})
+        keys = []
+        for index, slide_data in enumerate(slides_data):
+            key = self.thumbnail_key(presentation_id, index)
+            self.storage.put_bytes(key, self._render_slide(slide_data, context).encode("utf-8"))
+            keys.append(key)
+
+        current = set(keys)
+        for stored in list(self.storage.iter_objects(self.thumbnail_prefix(presentation_id))):
+            if stored.key not in current:
+                self.storage.delete(stored.key)
+        return keys
+
+    def write_thumbnail(self, presentation_id: str, slide_index: int, slide_data: Dict[str, Any], config: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """Redraw a single slide of a deck that already has thumbnails"""
+        if not self.storage.exists(self.thumbnail_key(presentation_id, 0)):
+            return None
+        key = self.thumbnail_key(presentation_id, slide_index)
+        self.storage.put_bytes(key, self.render_slide(slide_data, config).encode("utf-8"))
+        return key
+
+    def render_slide(self, slide_data: Dict[str, Any], config: Optional[Dict[str, Any]] = None) -> str:
+        return self._render_slide(slide_data, self._context(config or {}))
+
+    def _context(self, config: Dict[str, Any]) -> Dict[str, Any]:
+        colors = ThemeResolver.get_theme_colors(config)
+        slide_width = SLIDE_WIDTHS_IN.get(config.get("aspect_ratio", PPTXConstants.DEFAULT_ASPECT_RATIO), SLIDE_WIDTHS_IN["16:9"])
+        background = ThemeResolver.parse_hex_color(config.get("background_color"))
+        scale = THUMBNAIL_WIDTH / slide_width  # px per inch
+        return {
+            "scale": scale,
+            "width": THUMBNAIL_WIDTH,
+            "height": round(SLIDE_HEIGHT_IN * scale),
+            "background": f"#{background}" if background else "#FFFFFF",
+            "primary": f"#{colors['primary']}",
+            "secondary": f"#{colors['secondary']}",
+            "text": f"#{colors.get('text', colors['secondary'])}",
+            "accent": f"#{colors['accent']}",
+            "reference": f"#{ThemeResolver.get_reference_color(colors)}",
+            "font": escape(ThemeResolver.get_font_name(config), quote=True),
+            "geometry": layout_geometry()
+        }
+
+    def _render_slide(self, slide_data: Dict[str, Any], ctx: Dict[str, Any]) -> str:
+        slide_type = slide_data.get("slide_type", SlideLayoutType.BULLET_POINTS.value)
+        if slide_type not in ctx["geometry"]:
+            slide_type = SlideLayoutType.BULLET_POINTS.value
+        boxes = ctx["geometry"][slide_type]
+        content = [str(item) for item in (slide_data.get("content") or [])]
+        scale = ctx["scale"]
+
+        parts = [
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{ctx["width"]}" height="{ctx["height"]}" '
+            f'viewBox="0 0 {ctx["width"]} {ctx["height"]}" font-family="{ctx["font"]}">',
+            f'<rect width="100%" height="100%" fill="{ctx["background"]}"/>'
+        ]
+
+        # Auto-layout may have scaled the body text down to fit
+        body_pt = slide_data.get("font_size") or PPTXConstants.BULLET_FONT_SIZE
+        is_title_slide = slide_type == SlideLayoutType.TITLE.value
+        title_pt = PPTXConstants.TITLE_SLIDE_FONT_SIZE if is_title_slide else PPTXConstants.TITLE_FONT_SIZE
+        parts.append(self._text_block(
+            [str(slide_data.get("title", ""))], boxes["title"], title_pt, scale,
+            ctx["primary"], anchor="middle", bold=True, valign="middle"
+        ))
+
+        if is_title_slide:
+            parts.append(self._text_block(
+                content, boxes["subtitle"], slide_data.get("font_size") or PPTXConstants.SUBTITLE_FONT_SIZE, scale,
+                ctx["secondary"], anchor="middle"
+            ))
+        elif slide_type == SlideLayoutType.TWO_COLUMN.value:
+            mid_point = len(content) // 2
+            parts.append(self._text_block(content[:mid_point], boxes["left"], body_pt, scale, ctx["text"], bullets=True))
+            parts.append(self._text_block(content[mid_point:], boxes["right"], body_pt, scale, ctx["text"], bullets=True))
+        elif slide_type == SlideLayoutType.CONTENT_WITH_IMAGE.value:
+            left, top, width, height = boxes["body"]
+            text_box = (left, top, width * 0.6, height)
+            image_box = (left + width * 0.62, top, width * 0.38, height)
+            parts.append(self._text_block(content, text_box, body_pt, scale, ctx["text"], bullets=True))
+            x, y, w, h = (v * scale for v in image_box)
+            parts.append(
+                f'<rect x="{x:.1f}" y="{y:.1f}" width="{w:.1f}" height="{h:.1f}" fill="none" '
+                f'stroke="{ctx["accent"]}" stroke-dasharray="4 3"/>'
+            )
+        else:
+            parts.append(self._text_block(content, boxes["body"], body_pt, scale, ctx["text"], bullets=True))
+
+        reference = slide_data.get("reference")
+        if reference:
+            box = (PPTXConstants.REFERENCE_LEFT, PPTXConstants.REFERENCE_TOP,
+                   PPTXConstants.REFERENCE_WIDTH, PPTXConstants.REFERENCE_HEIGHT)
+            parts.append(self._text_block([str(reference)], box, PPTXConstants.REFERENCE_FONT_SIZE, scale, ctx["reference"], anchor="end"))
+
+        parts.append("</svg>")
+        return "".join(parts)
+
+    def _text_block(self, lines: List[str], box: Tuple[float, float, float, float], font_pt: float, scale: float,
+                    color: str, anchor: str = "start", bold: bool = False, bullets: bool = False, valign: str = "top") -> str:
+        left, top, width, height = (v * scale for v in box)
+        size = max(MIN_TEXT_PX, font_pt / 72.0 * scale)
+        line_height = size * 1.2
+        max_lines = max(1, int(height / line_height))
+        lines = lines[:max_lines]
+        if not lines:
+            return ""
+
+        x = {"start": left, "middle": left + width / 2, "end": left + width}[anchor]
+        if valign == "middle":
+            y = top + (height - line_height * len(lines)) / 2 + size
+        else:
+            y = top + size
+
+        prefix = "• " if bullets else ""
+        weight = ' font-weight="bold"' if bold else ""
+        spans = "".join(
+            f'<tspan x="{x:.1f}" y="{y + i * line_height:.1f}">{escape(_fit(prefix + line, width, size))}</tspan>'
+            for i, line in enumerate(lines)
+        )
+        return f'<text font-size="{size:.1f}" fill="{color}" text-anchor="{anchor}"{weight}>{spans}</text>'
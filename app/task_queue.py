@@ -1,7 +1,11 @@
 import redis
+import re
+import time
 from rq import Queue
 import os
+from typing import List, Optional
 from dotenv import load_dotenv
+from app.constants.constants import JobPriority, SchedulingConstants, ErrorMessages
 
 load_dotenv()
 
@@ -10,8 +14,72 @@ redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 redis_conn = redis.from_url(redis_url)
 
 # Create queue
-presentation_queue = Queue("presentations", connection=redis_conn)
+presentation_queue = Queue(SchedulingConstants.QUEUE_NAME, connection=redis_conn)
 
-def get_queue():
-    """Get the presentation queue"""
-    return presentation_queue 
\ No newline at end of file
+_TENANT_PATTERN = re.compile(SchedulingConstants.TENANT_PATTERN)
+
+
+def normalize_tenant(tenant: Optional[str]) -> str:
+    """Tenant key of a request; requests without one share the default tenant"""
+    if not tenant:
+        return SchedulingConstants.DEFAULT_TENANT
+    if not _TENANT_PATTERN.match(tenant):
+        raise ValueError(ErrorMessages.INVALID_TENANT)
+    return tenant
+
+
+def queue_name(priority: str, tenant: str = SchedulingConstants.DEFAULT_TENANT) -> str:
+    name = f"{SchedulingConstants.QUEUE_NAME}:{priority}"
+    return name if tenant == SchedulingConstants.DEFAULT_TENANT else f"{name}:{tenant}"
+
+
+def queue_priority(name: str) -> str:
+    """Priority class of a queue name; the original single queue counts as standard"""
+    parts = name.split(":")
+    return parts[1] if len(parts) > 1 else JobPriority.STANDARD.value
+
+
+def _tenants_key(priority: str) -> str:
+    return f"{SchedulingConstants.TENANTS_KEY_PREFIX}:{priority}"
+
+
+def get_queue(priority: Optional[str] = None, tenant: Optional[str] = None) -> Queue:
+    """
+    Get the presentation queue. With a priority, get that class's queue for
+    the tenant instead; tenant queues are registered so workers find them.
+    """
+    if priority is None:
+        return presentation_queue
+    tenant = tenant or SchedulingConstants.DEFAULT_TENANT
+    if tenant != SchedulingConstants.DEFAULT_TENANT:
+        redis_conn.zadd(_tenants_key(priority), {tenant: time.time()})
+    return Queue(queue_name(priority, tenant), connection=redis_conn)
+
+
+def default_queues() -> List[Queue]:
+    """Queues every worker listens on from startup (and which RQ's scheduler serves)"""
+    queues = [Queue(queue_name(priority.value), connection=redis_conn) for priority in JobPriority]
+    return queues + [presentation_queue]
+
+
+def tenant_queues(priority: str, connection=None) -> List[Queue]:
+    """The default queue of a class plus every registered tenant queue, forgetting idle empty ones"""
+    connection = connection or redis_conn
+    queues = [Queue(queue_name(priority), connection=connection)]
+    if priority == JobPriority.STANDARD.value:
+        # Maintenance jobs and jobs queued before priority classes existed
+        queues.append(Queue(SchedulingConstants.QUEUE_NAME, connection=connection))
+    idle_before = time.time() - SchedulingConstants.TENANT_IDLE_SECONDS
+    for raw_tenant, last_enqueued in connection.zrange(_tenants_key(priority), 0, -1, withscores=True):
+        tenant = raw_tenant.decode("utf-8")
+        queue = Queue(queue_name(priority, tenant), connection=connection)
+        if last_enqueued < idle_before and queue.count == 0:
+            connection.zrem(_tenants_key(priority), tenant)
+            continue
+        queues.append(queue)
+    return queues
+
+
+def queued_count(tenant: str) -> int:
+    """Jobs a tenant has waiting across all priority classes"""
+    return sum(len(Queue(queue_name(priority.value, tenant), connection=redis_conn)) for priority in JobPriority)
@@ -0,0 +1,152 @@
+import time
+from typing import List, Dict, Any, Optional, Tuple
+from app.constants.constants import PPTXConstants, SlideLayoutType, AutoLayoutConstants
+from app.utils.layout_picker import LayoutPicker
+from app.utils.slide_geometry import layout_geometry
+from app.utils.text_metrics import TextMeasurer
+
+Box = Tuple[float, float, float, float]
+
+
+class AutoLayout:
+    """
+    Fits slide text into its placeholders before rendering.
+
+    Every bullet in the deck is measured in one batch against glyph-width
+    tables, then each slide gets, in order of preference: its normal font
+    size, a smaller font size, a two-column layout, or continuation slides.
+    The chosen size is stored as the slide's "font_size".
+    """
+
+    def __init__(self, font_name: str = PPTXConstants.DEFAULT_FONT):
+        self.measurer = TextMeasurer(font_name)
+        self.geometry = layout_geometry()
+        self.last_report: Dict[str, Any] = {}
+
+    def fit(self, slides_data: List[Dict[str, Any]], allow_split: bool = True) -> List[Dict[str, Any]]:
+        started = time.monotonic()
+        self.last_report = {"scaled": 0, "two_column": 0, "continuation_slides": 0, "overflowing": 0}
+
+        # Cap the bullet count first so no slide carries an unreadable list
+        slides = []
+        for slide in slides_data:
+            slide = {key: value for key, value in slide.items() if key != "font_size"}
+            slide["content"] = [str(item) for item in (slide.get("content") or [])]
+            is_title = slide.get("slide_type") == SlideLayoutType.TITLE.value
+            if allow_split and not is_title and LayoutPicker.should_split_content(slide["content"], AutoLayoutConstants.MAX_BULLETS):
+                slides.extend(self._continuations(slide, LayoutPicker.split_content(slide["content"], AutoLayoutConstants.MAX_BULLETS)))
+            else:
+                slides.append(slide)
+
+        words = self.measurer.word_widths([item for slide in slides for item in slide["content"]])
+
+        fitted = []
+        position = 0
+        for slide in slides:
+            count = len(slide["content"])
+            fitted.extend(self._fit_slide(slide, words[position:position + count], allow_split))
+            position += count
+
+        self.last_report["continuation_slides"] = len(fitted) - len(slides_data)
+        self.last_report["seconds"] = round(time.monotonic() - started, 4)
+        return fitted
+
+    # -------------------------------
+    # Per-slide decisions
+    # -------------------------------
+    def _fit_slide(self, slide: Dict[str, Any], words: List[List[int]], allow_split: bool) -> List[Dict[str, Any]]:
+        slide_type = slide.get("slide_type", SlideLayoutType.BULLET_POINTS.value)
+
+        if slide_type == SlideLayoutType.TITLE.value:
+            size = self._largest_fitting([(words, self.geometry[slide_type]["subtitle"])], PPTXConstants.SUBTITLE_FONT_SIZE, bullets=False)
+            return [self._with_size(slide, size, PPTXConstants.SUBTITLE_FONT_SIZE)]
+
+        base = PPTXConstants.BULLET_FONT_SIZE
+        size = self._largest_fitting(self._columns(slide_type, words), base)
+        if size:
+            return [self._with_size(slide, size, base)]
+
+        # Many short bullets: halving the column height beats shrinking the text
+        if slide_type == SlideLayoutType.BULLET_POINTS.value and len(words) >= AutoLayoutConstants.TWO_COLUMN_MIN_BULLETS:
+            size = self._largest_fitting(self._columns(SlideLayoutType.TWO_COLUMN.value, words), base)
+            if size:
+                self.last_report["two_column"] += 1
+                return [self._with_size(dict(slide, slide_type=SlideLayoutType.TWO_COLUMN.value), size, base)]
+
+        if not allow_split or len(words) <= 1:
+            return [self._with_size(slide, None, base)]
+
+        # Continuation slides, packed at the normal size and then fitted on their own
+        box = self._text_box(slide_type)
+        columns = 2 if slide_type == SlideLayoutType.TWO_COLUMN.value else 1
+        heights = [self._paragraph_height(w, base, box[2]) for w in words]
+        chunks = LayoutPicker.pack_by_height(heights, self._available_height(box) * columns)
+        parts = self._continuations(slide, [[slide["content"][i] for i in chunk] for chunk in chunks])
+
+        fitted = []
+        for part, chunk in zip(parts, chunks):
+            fitted.extend(self._fit_slide(part, [words[i] for i in chunk], allow_split=False))
+        return fitted
+
+    def _with_size(self, slide: Dict[str, Any], size: Optional[int], base: int) -> Dict[str, Any]:
+        if size is None:
+            # Still overflows at the minimum size; render it as small as allowed
+            self.last_report["overflowing"] += 1
+            size = AutoLayoutConstants.MIN_FONT_SIZE
+        if size != base:
+            self.last_report["scaled"] += 1
+            slide["font_size"] = size
+        return slide
+
+    def _continuations(self, slide: Dict[str, Any], chunks: List[List[str]]) -> List[Dict[str, Any]]:
+        parts = []
+        for i, chunk in enumerate(chunks):
+            part = dict(slide, content=chunk)
+            if i > 0:
+                part["title"] = f"{slide.get('title', '')}{AutoLayoutConstants.CONTINUATION_SUFFIX}"
+                # Speaker notes stay with the first slide of the run
+                part["notes"] = ""
+            parts.append(part)
+        return parts
+
+    # -------------------------------
+    # Geometry
+    # -------------------------------
+    def _text_box(self, slide_type: str) -> Box:
+        boxes = self.geometry.get(slide_type, self.geometry[SlideLayoutType.BULLET_POINTS.value])
+        return boxes["left"] if slide_type == SlideLayoutType.TWO_COLUMN.value else boxes["body"]
+
+    def _columns(self, slide_type: str, words: List[List[int]]) -> List[Tuple[List[List[int]], Box]]:
+        """Split measured bullets into the text boxes PPTXCreator will fill"""
+        if slide_type == SlideLayoutType.TWO_COLUMN.value:
+            boxes = self.geometry[slide_type]
+            mid_point = len(words) // 2
+            return [(words[:mid_point], boxes["left"]), (words[mid_point:], boxes["right"])]
+        return [(words, self._text_box(slide_type))]
+
+    def _largest_fitting(self, columns: List[Tuple[List[List[int]], Box]], base: int, bullets: bool = True) -> Optional[int]:
+        for size in range(base, AutoLayoutConstants.MIN_FONT_SIZE - 1, -AutoLayoutConstants.FONT_SIZE_STEP):
+            if all(self._fits(words, size, box, bullets) for words, box in columns):
+                return size
+        return None
+
+    def _fits(self, words: List[List[int]], size: int, box: Box, bullets: bool) -> bool:
+        available = self._available_height(box)
+        used = 0.0
+        for paragraph in words:
+            used += self._paragraph_height(paragraph, size, box[2], bullets)
+            if used > available:
+                return False
+        return True
+
+    def _paragraph_height(self, words: List[int], size: int, box_width: float, bullets: bool = True) -> float:
+        """Height in points of one paragraph, including the space before it"""
+        width = box_width - 2 * AutoLayoutConstants.TEXT_INSET_X
+        if bullets:
+            width -= AutoLayoutConstants.BULLET_INDENT
+        lines = self.measurer.line_count(words, size, width)
+        return size * (lines * AutoLayoutConstants.LINE_SPACING + AutoLayoutConstants.PARAGRAPH_SPACING)
+
+    @staticmethod
+    def _available_height(box: Box) -> float:
+        return (box[3] - 2 * AutoLayoutConstants.TEXT_INSET_Y) * 72.0
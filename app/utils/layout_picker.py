@@ -50,4 +50,19 @@ class LayoutPicker:
         chunks = []
         for i in range(0, len(content), max_bullets):
             chunks.append(content[i:i + max_bullets])
-        return chunks 
\ No newline at end of file
+        return chunks
+    
+    @staticmethod
+    def pack_by_height(heights: list, max_height: float) -> list:
+        """Group consecutive items into chunks whose total height fits max_height"""
+        chunks = []
+        current, current_height = [], 0.0
+        for i, height in enumerate(heights):
+            if current and current_height + height > max_height:
+                chunks.append(current)
+                current, current_height = [], 0.0
+            current.append(i)
+            current_height += height
+        if current:
+            chunks.append(current)
+        return chunks
@@ -0,0 +1,48 @@
+from functools import lru_cache
+from typing import Dict, Tuple
+from pptx import Presentation
+from pptx.util import Emu
+from app.constants.constants import PPTXConstants, SlideLayoutType
+
+# Which template layout and placeholder indices each slide type is drawn into,
+# matching PPTXCreator. content_with_image has no body placeholder on its
+# layout, so its bullets use the Title and Content body like PPTXCreator's fallback.
+_LAYOUT_BOXES = {
+    SlideLayoutType.TITLE.value: [
+        ("title", PPTXConstants.TITLE_LAYOUT_INDEX, 0),
+        ("subtitle", PPTXConstants.TITLE_LAYOUT_INDEX, 1)
+    ],
+    SlideLayoutType.BULLET_POINTS.value: [
+        ("title", PPTXConstants.CONTENT_LAYOUT_INDEX, 0),
+        ("body", PPTXConstants.CONTENT_LAYOUT_INDEX, 1)
+    ],
+    SlideLayoutType.TWO_COLUMN.value: [
+        ("title", PPTXConstants.TWO_COLUMN_LAYOUT_INDEX, 0),
+        ("left", PPTXConstants.TWO_COLUMN_LAYOUT_INDEX, 1),
+        ("right", PPTXConstants.TWO_COLUMN_LAYOUT_INDEX, 2)
+    ],
+    SlideLayoutType.CONTENT_WITH_IMAGE.value: [
+        ("title", PPTXConstants.PICTURE_LAYOUT_INDEX, 0),
+        ("body", PPTXConstants.CONTENT_LAYOUT_INDEX, 1)
+    ]
+}
+
+
+@lru_cache(maxsize=1)
+def layout_geometry() -> Dict[str, Dict[str, Tuple[float, float, float, float]]]:
+    """
+    Placeholder boxes (left, top, width, height in inches) per slide type,
+    read once per process from the same default template python-pptx renders with.
+    """
+    layouts = Presentation().slide_layouts
+    geometry = {}
+    for slide_type, boxes in _LAYOUT_BOXES.items():
+        geometry[slide_type] = {}
+        for role, layout_index, placeholder_idx in boxes:
+            for placeholder in layouts[layout_index].placeholders:
+                if placeholder.placeholder_format.idx == placeholder_idx:
+                    geometry[slide_type][role] = tuple(
+                        Emu(value).inches for value in
+                        (placeholder.left, placeholder.top, placeholder.width, placeholder.height)
+                    )
+    return geometry
@@ -0,0 +1,141 @@
+import codecs
+from functools import lru_cache
+from typing import List, Sequence, Tuple
+
+# Advance widths in 1/1000 em for printable ASCII (0x20-0x7E), per font family.
+# Helvetica and Times come from the Adobe core-font AFM files; Calibri is
+# taken from the font's hmtx table and rounded.
+_ASCII_WIDTHS = {
+    "helvetica": (
+        "278 278 355 556 556 889 667 191 333 333 389 584 278 333 278 278 "
+        "556 556 556 556 556 556 556 556 556 556 278 278 584 584 584 556 "
+        "1015 667 667 722 722 667 611 778 722 278 500 667 556 833 722 778 "
+        "667 778 722 667 611 722 667 944 667 667 611 278 278 278 469 556 "
+        "333 556 556 500 556 556 278 556 556 222 222 500 222 833 556 556 "
+        "556 556 333 500 278 556 500 722 500 500 500 334 260 334 584"
+    ),
+    "times": (
+        "250 333 408 500 500 833 778 180 333 333 500 564 250 333 250 278 "
+        "500 500 500 500 500 500 500 500 500 500 278 278 564 564 564 444 "
+        "921 722 667 667 722 611 556 722 722 333 389 722 611 889 722 722 "
+        "556 722 667 556 611 722 722 944 722 722 611 333 278 333 469 500 "
+        "333 444 500 444 500 444 333 500 500 278 278 500 278 778 500 500 "
+        "500 500 333 389 278 500 500 722 500 500 444 480 200 480 541"
+    ),
+    "calibri": (
+        "226 326 401 498 507 715 682 221 303 303 498 498 250 306 252 386 "
+        "507 507 507 507 507 507 507 507 507 507 268 268 498 498 498 463 "
+        "894 579 544 533 615 488 459 631 623 252 319 520 420 855 646 662 "
+        "517 673 543 459 487 642 567 890 519 487 468 307 386 307 498 498 "
+        "291 479 525 423 525 498 305 471 525 230 239 455 230 799 525 527 "
+        "525 525 349 391 335 525 452 715 433 453 395 314 460 314 498"
+    )
+}
+
+# Common font names mapped to the closest measured family; unknown fonts use
+# Helvetica, which is wider than most UI fonts and so errs towards fitting
+_FONT_FAMILIES = {
+    "calibri": "calibri",
+    "candara": "calibri",
+    "segoe ui": "calibri",
+    "arial": "helvetica",
+    "helvetica": "helvetica",
+    "helvetica neue": "helvetica",
+    "verdana": "helvetica",
+    "roboto": "helvetica",
+    "times": "times",
+    "times new roman": "times",
+    "georgia": "times",
+    "garamond": "times",
+    "cambria": "times"
+}
+DEFAULT_FAMILY = "helvetica"
+BOLD_WIDTH_FACTOR = 1.06
+
+# Characters outside cp1252 (CJK, emoji, ...) are measured as a wide glyph
+_WIDE_GLYPH = "M"
+_ERROR_HANDLER = "text_metrics_wide"
+codecs.register_error(_ERROR_HANDLER, lambda error: (_WIDE_GLYPH * (error.end - error.start), error.end))
+
+MAX_CACHED_WORDS = 50000
+
+
+@lru_cache(maxsize=None)
+def _width_table(family: str) -> Tuple[int, ...]:
+    """256-entry width table indexed by cp1252 byte"""
+    ascii_widths = [int(w) for w in _ASCII_WIDTHS[family].split()]
+    average = ascii_widths[ord("n") - 0x20]
+    table = [0] * 0x20 + ascii_widths + [average] * (0x100 - 0x7F)
+    # Dashes, quotes and bullets that LLM output uses a lot
+    table[0x96] = 500                           # en dash
+    table[0x97] = 1000                          # em dash
+    table[0x91] = table[0x92] = table[ord("'")]  # curly single quotes
+    table[0x93] = table[0x94] = table[ord('"')]  # curly double quotes
+    table[0x95] = table[ord("-")]               # bullet
+    return tuple(table)
+
+
+def font_family(font_name: str) -> str:
+    return _FONT_FAMILIES.get((font_name or "").strip().lower(), DEFAULT_FAMILY)
+
+
+class _WordWidths(dict):
+    """Word -> width cache; natural text repeats words, so most lookups are hits"""
+
+    def __init__(self, table: Tuple[int, ...], factor: float):
+        super().__init__()
+        self.table = table
+        self.factor = factor
+
+    def __missing__(self, word: str) -> int:
+        encoded = word.encode("cp1252", _ERROR_HANDLER)
+        width = int(sum(map(self.table.__getitem__, encoded)) * self.factor)
+        if len(self) < MAX_CACHED_WORDS:
+            self[word] = width
+        return width
+
+
+@lru_cache(maxsize=None)
+def _word_widths(family: str, bold: bool) -> _WordWidths:
+    """Process-wide cache per font family, shared by every measurer"""
+    return _WordWidths(_width_table(family), BOLD_WIDTH_FACTOR if bold else 1.0)
+
+
+class TextMeasurer:
+    """
+    Measures text with precomputed per-font glyph-width tables instead of a
+    trial render. A whole deck is measured in one call; widths are summed
+    with C-level map() over the table and cached per word.
+    """
+
+    def __init__(self, font_name: str):
+        self.family = font_family(font_name)
+        self.table = _width_table(self.family)
+        self.space = self.table[ord(" ")]
+        self._widths = _word_widths(self.family, False)
+        self._bold_widths = _word_widths(self.family, True)
+
+    def word_widths(self, texts: Sequence[str], bold: bool = False) -> List[List[int]]:
+        """Widths (1/1000 em) of the whitespace-separated words of every text"""
+        lookup = (self._bold_widths if bold else self._widths).__getitem__
+        return [list(map(lookup, text.split())) for text in texts]
+
+    def line_count(self, words: Sequence[int], size_pt: float, width_in: float) -> int:
+        """Lines a paragraph wraps to at a font size, using greedy word wrap"""
+        max_units = width_in * 72.0 * 1000.0 / size_pt
+        if sum(words) + self.space * (len(words) - 1) <= max_units:
+            return 1
+        lines, current = 1, 0
+        for width in words:
+            if current == 0:
+                current = width
+            elif current + self.space + width <= max_units:
+                current += self.space + width
+            else:
+                lines += 1
+                current = width
+            # A single word wider than the box is broken across lines
+            while current > max_units:
+                lines += 1
+                current -= max_units
+        return lines
@@ -0,0 +1,159 @@
+from pptx.dml.color import RGBColor
+from typing import Dict, Any, Optional
+from app.constants.constants import PPTXConstants, PresentationTheme
+
+
+class ThemeResolver:
+    """Resolves a render config into concrete colors and fonts, shared by every renderer"""
+    
+    @staticmethod
+    def build_render_config(style_config: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Build the renderer config from a presentation's stored style_config"""
+        style_config = style_config or {}
+        config = {
+            "theme": style_config.get("theme", PPTXConstants.DEFAULT_THEME),
+            "font": style_config.get("font", PPTXConstants.DEFAULT_FONT),
+            "background_color": style_config.get("background_color", PPTXConstants.DEFAULT_BACKGROUND_COLOR),
+            "aspect_ratio": PPTXConstants.DEFAULT_ASPECT_RATIO
+        }
+        
+        # Add custom colors if specified
+        for key in ("title_color", "content_color", "accent_color"):
+            if key in style_config:
+                config[key] = style_config[key]
+        
+        return config
+    
+    @staticmethod
+    def get_theme_colors(config: Optional[Dict[str, Any]]) -> Dict[str, RGBColor]:
+        """Get theme colors based on config or defaults"""
+        config = config or {}
+        theme_name = config.get('theme', PresentationTheme.PROFESSIONAL.value)
+        
+        # Default professional colors
+        colors = {
+            'primary': RGBColor(31, 73, 125),     # Dark blue
+            'secondary': RGBColor(68, 114, 196),  # Medium blue
+            'accent': RGBColor(237, 125, 49),     # Orange
+            'text': RGBColor(68, 84, 106),        # Dark gray-blue
+            'background': RGBColor(255, 255, 255) # White
+        }
+        
+        # Apply theme-specific colors first
+        if isinstance(theme_name, str):
+            theme_lower = theme_name.lower()
+            if theme_lower == PresentationTheme.CORPORATE.value:
+                colors['primary'] = RGBColor(0, 50, 98)      # Dark blue
+                colors['secondary'] = RGBColor(0, 118, 189)  # Medium blue
+                colors['accent'] = RGBColor(242, 80, 34)     # Red/orange
+            elif theme_lower == PresentationTheme.CREATIVE.value:
+                colors['primary'] = RGBColor(185, 9, 11)     # Dark red
+                colors['secondary'] = RGBColor(247, 150, 70) # Orange
+                colors['accent'] = RGBColor(75, 172, 198)    # Light blue
+            elif theme_lower == PresentationTheme.ACADEMIC.value:
+                colors['primary'] = RGBColor(80, 16, 22)     # Maroon
+                colors['secondary'] = RGBColor(155, 155, 155) # Gray
+                colors['accent'] = RGBColor(200, 178, 115)   # Gold
+            elif theme_lower == PresentationTheme.DARK.value or 'dark mode' in theme_lower:
+                colors['primary'] = RGBColor(45, 45, 45)     # Dark gray
+                colors['secondary'] = RGBColor(210, 210, 210) # Light gray
+                colors['accent'] = RGBColor(52, 152, 219)    # Blue
+                colors['text'] = RGBColor(240, 240, 240)     # Almost white
+                colors['background'] = RGBColor(25, 25, 25)  # Almost black
+            elif theme_lower == PresentationTheme.MINIMAL.value:
+                colors['primary'] = RGBColor(40, 40, 40)     # Dark gray
+                colors['secondary'] = RGBColor(120, 120, 120) # Medium gray
+                colors['accent'] = RGBColor(200, 200, 200)   # Light gray
+            elif PresentationTheme.MODERN_STARTUP.value in theme_lower:
+                colors['primary'] = RGBColor(41, 128, 185)   # Bright blue
+                colors['secondary'] = RGBColor(52, 73, 94)   # Dark blue-gray
+                colors['accent'] = RGBColor(243, 156, 18)    # Orange
+            elif PresentationTheme.YOUTHFUL.value in theme_lower:
+                colors['primary'] = RGBColor(155, 89, 182)   # Purple
+                colors['secondary'] = RGBColor(52, 152, 219) # Blue
+                colors['accent'] = RGBColor(46, 204, 113)    # Green
+        
+        # Override with custom colors if specified
+        if 'background_color' in config:
+            bg_color = config['background_color'].lstrip('#')
+            if len(bg_color) == 6:
+                try:
+                    r = int(bg_color[0:2], 16)
+                    g = int(bg_color[2:4], 16)
+                    b = int(bg_color[4:6], 16)
+                    colors['background'] = RGBColor(r, g, b)
+                    
+                    # If background is dark, use light text by default
+                    brightness = (r * 299 + g * 587 + b * 114) / 1000
+                    if brightness < 128:  # Dark background
+                        colors['text'] = RGBColor(240, 240, 240)  # Light text
+                except ValueError:
+                    pass
+        
+        # Apply custom title color (maps to primary)
+        if 'title_color' in config:
+            title_color = config['title_color'].lstrip('#')
+            if len(title_color) == 6:
+                try:
+                    r = int(title_color[0:2], 16)
+                    g = int(title_color[2:4], 16)
+                    b = int(title_color[4:6], 16)
+                    colors['primary'] = RGBColor(r, g, b)
+                except ValueError:
+                    pass
+        
+        # Apply custom content color (maps to text)
+        if 'content_color' in config:
+            content_color = config['content_color'].lstrip('#')
+            if len(content_color) == 6:
+                try:
+                    r = int(content_color[0:2], 16)
+                    g = int(content_color[2:4], 16)
+                    b = int(content_color[4:6], 16)
+                    colors['text'] = RGBColor(r, g, b)
+                    colors['secondary'] = RGBColor(r, g, b)  # Also update secondary
+                except ValueError:
+                    pass
+        
+        # Apply custom accent color
+        if 'accent_color' in config:
+            accent_color = config['accent_color'].lstrip('#')
+            if len(accent_color) == 6:
+                try:
+                    r = int(accent_color[0:2], 16)
+                    g = int(accent_color[2:4], 16)
+                    b = int(accent_color[4:6], 16)
+                    colors['accent'] = RGBColor(r, g, b)
+                except ValueError:
+                    pass
+        
+        return colors
+    
+    @staticmethod
+    def get_font_name(config: Optional[Dict[str, Any]]) -> str:
+        """Get font name from config or default"""
+        config = config or {}
+        return config.get('font', config.get('font_name', PPTXConstants.DEFAULT_FONT))
+    
+    @staticmethod
+    def get_reference_color(colors: Dict[str, RGBColor]) -> RGBColor:
+        """Reference text is drawn slightly lighter than body text"""
+        if 'text' in colors:
+            text_color = colors['text']
+            # RGBColor is a tuple, so access values by index
+            r = min(255, text_color[0] + 40)
+            g = min(255, text_color[1] + 40)
+            b = min(255, text_color[2] + 40)
+            return RGBColor(r, g, b)
+        return colors['secondary']
+    
+    @staticmethod
+    def parse_hex_color(value: Optional[str]) -> Optional[RGBColor]:
+        """Parse '#RRGGBB' into an RGBColor, or None if it is not a valid hex color"""
+        color = (value or '').lstrip('#')
+        if len(color) != 6:
+            return None
+        try:
+            return RGBColor(int(color[0:2], 16), int(color[2:4], 16), int(color[4:6], 16))
+        except ValueError:
+            return None
@@ -0,0 +1,117 @@
+import math
+import random
+import time
+from typing import List, Optional, Tuple
+from rq import Worker, Queue
+from rq.job import Job
+from rq.exceptions import NoSuchJobError
+from rq.utils import utcnow
+from app.task_queue import default_queues, tenant_queues, queue_priority
+from app.services.metrics import record_queue_wait
+from app.workers.resource_meter import ResourceMeter, current_rss_mb, SOFT_LIMIT_MB
+from app.constants.constants import JobPriority, SchedulingConstants
+
+
+def weighted_order(queues_by_priority, weights=None, rng=random) -> List[Queue]:
+    """
+    Order queues for one dequeue. Each class's weight is split evenly among
+    its tenants' queues and the order is a weighted random permutation, so
+    when several queues have work a queue is taken first with probability
+    proportional to its share.
+    """
+    weights = weights or SchedulingConstants.PRIORITY_WEIGHTS
+    keyed = []
+    for priority, queues in queues_by_priority.items():
+        share = weights[priority] / len(queues)
+        for queue in queues:
+            # Efraimidis-Spirakis: sorting by u ** (1 / w) samples without replacement by weight
+            keyed.append((rng.random() ** (1.0 / share), queue))
+    keyed.sort(key=lambda item: item[0], reverse=True)
+    return [queue for _, queue in keyed]
+
+
+class FairWorker(Worker):
+    """
+    RQ worker for the priority classes. Before every dequeue it re-reads the
+    registered tenant queues and orders them with weighted_order, so
+    interactive work goes ahead of bulk work and no tenant can monopolize a
+    class. An idle worker wakes every REFRESH_SECONDS to pick up queues of
+    new tenants. The time each job spent queued is recorded per class.
+    
+    Each job's CPU time and memory are stored in its meta (see
+    ResourceMeter). When a job's work horse, or the worker itself, has grown
+    past the soft memory limit the worker stops after the job with
+    `recycled` set; its process then exits with RECYCLE_EXIT_CODE so the
+    parent (start_worker.py, worker_safe.py or the supervisor) starts a
+    fresh one.
+    """
+
+    def __init__(self, queues=None, *args, **kwargs):
+        super().__init__(queues or default_queues(), *args, **kwargs)
+        self.recycled = False
+
+    def refresh_queues(self):
+        queues_by_priority = {
+            priority.value: tenant_queues(priority.value, self.connection) for priority in JobPriority
+        }
+        self._ordered_queues = weighted_order(queues_by_priority)
+        self.queues = self._ordered_queues[:]
+
+    def reorder_queues(self, reference_queue: Queue):
+        # Ordering happens in dequeue_job_and_maintain_ttl, before each dequeue
+        pass
+
+    def dequeue_job_and_maintain_ttl(self, timeout: Optional[int],
+                                     max_idle_time: Optional[int] = None) -> Optional[Tuple[Job, Queue]]:
+        idle_since = time.monotonic()
+        while True:
+            self.refresh_queues()
+            if timeout is None:
+                # Burst mode never blocks
+                result = super().dequeue_job_and_maintain_ttl(None, max_idle_time)
+                break
+
+            wait = SchedulingConstants.REFRESH_SECONDS
+            if max_idle_time is not None:
+                idle_left = max_idle_time - (time.monotonic() - idle_since)
+                if idle_left <= 0:
+                    return None
+                wait = min(wait, math.ceil(idle_left))
+            # Returns None once idle for `wait` seconds, so the queue list is refreshed
+            result = super().dequeue_job_and_maintain_ttl(min(timeout, wait), wait)
+            if result is not None:
+                break
+
+        if result is not None:
+            job, queue = result
+            if job.enqueued_at:
+                record_queue_wait(queue_priority(queue.name), (utcnow() - job.enqueued_at).total_seconds(), self.connection)
+        return result
+
+    def perform_job(self, job: Job, queue: Queue) -> bool:
+        # Runs in the work horse
+        meter = ResourceMeter()
+        with meter:
+            result = super().perform_job(job, queue)
+        # The task may have saved meta of its own meanwhile
+        job.get_meta(refresh=True)
+        job.meta["resources"] = meter.report
+        job.save_meta()
+        if meter.report["soft_limit_exceeded"]:
+            print(f"Job {job.id} peaked at {meter.report['rss_peak_mb']} MB, above the worker soft memory limit")
+        return result
+
+    def execute_job(self, job: Job, queue: Queue):
+        super().execute_job(job, queue)
+        if not SOFT_LIMIT_MB:
+            return
+        # The job ran in the work horse, so its peak is the one the horse reported in the job's meta
+        try:
+            horse_peak = (job.get_meta(refresh=True).get("resources") or {}).get("rss_peak_mb")
+        except NoSuchJobError:
+            horse_peak = None
+        rss = max((mb for mb in (horse_peak, current_rss_mb()) if mb is not None), default=None)
+        if rss is not None and rss > SOFT_LIMIT_MB:
+            print(f"Worker {self.name} reached {rss:.0f} MB, above the soft limit of {SOFT_LIMIT_MB:g} MB; recycling")
+            self.recycled = True
+            self._stop_requested = True
@@ -0,0 +1,131 @@
+import os
+import resource
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Dict, Any, List, Optional
+from app.constants.constants import WorkerResourceConstants
+
+SOFT_LIMIT_MB = float(os.getenv("WORKER_MEMORY_SOFT_LIMIT_MB", WorkerResourceConstants.SOFT_LIMIT_MB))
+HARD_LIMIT_MB = float(os.getenv("WORKER_MEMORY_HARD_LIMIT_MB", WorkerResourceConstants.HARD_LIMIT_MB))
+TRACEMALLOC_ENABLED = os.getenv("WORKER_TRACEMALLOC", str(WorkerResourceConstants.TRACEMALLOC)).lower() == "true"
+
+_PAGE_MB = os.sysconf("SC_PAGE_SIZE") / (1024 * 1024) if hasattr(os, "sysconf") else 0
+# ru_maxrss is in kilobytes on Linux and in bytes on macOS
+_MAXRSS_MB = 1 / (1024 * 1024) if sys.platform == "darwin" else 1 / 1024
+
+
+class MemoryLimitExceededError(MemoryError):
+    pass
+
+
+def current_rss_mb() -> Optional[float]:
+    """Resident set size of this process; None where /proc is not available"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * _PAGE_MB
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _MAXRSS_MB
+
+
+class ResourceMeter:
+    """
+    Measures one job in the work horse: CPU time, RSS at the start and at
+    its peak, and optionally the largest allocation sites via tracemalloc.
+    A sampler thread watches RSS; past the hard limit it signals the main
+    thread, which raises MemoryLimitExceededError inside the job so it
+    fails with a reason instead of the horse being killed by the OS.
+    """
+
+    def __init__(self, soft_limit_mb: float = SOFT_LIMIT_MB, hard_limit_mb: float = HARD_LIMIT_MB,
+                 trace: bool = TRACEMALLOC_ENABLED):
+        self.soft_limit_mb = soft_limit_mb
+        self.hard_limit_mb = hard_limit_mb
+        self.trace = trace
+        self.report: Dict[str, Any] = {}
+        self._sampled_peak_mb = 0.0
+        self._hard_limit_hit = False
+        self._done = threading.Event()
+
+    def __enter__(self) -> "ResourceMeter":
+        self._started = time.monotonic()
+        self._usage = resource.getrusage(resource.RUSAGE_SELF)
+        self._maxrss_mb = peak_rss_mb()
+        self._rss_mb = current_rss_mb()
+        self._sampled_peak_mb = self._rss_mb or 0.0
+        if self.trace:
+            tracemalloc.start()
+        # Signal handlers can only be installed from the main thread
+        self._guarded = threading.current_thread() is threading.main_thread()
+        if self._rss_mb is not None:
+            if self._guarded:
+                self._previous_handler = signal.signal(signal.SIGUSR1, self._on_hard_limit)
+            self._sampler = threading.Thread(target=self._sample, daemon=True)
+            self._sampler.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._done.set()
+        if self._rss_mb is not None:
+            self._sampler.join()
+            if self._guarded:
+                signal.signal(signal.SIGUSR1, self._previous_handler)
+        self.report = self._build_report()
+        if self.trace:
+            tracemalloc.stop()
+        return False
+
+    def _sample(self):
+        while not self._done.wait(WorkerResourceConstants.SAMPLE_SECONDS):
+            rss = current_rss_mb() or 0.0
+            self._sampled_peak_mb = max(self._sampled_peak_mb, rss)
+            if self._guarded and self.hard_limit_mb and rss > self.hard_limit_mb and not self._hard_limit_hit:
+                self._hard_limit_hit = True
+                os.kill(os.getpid(), signal.SIGUSR1)
+
+    def _on_hard_limit(self, signum, frame):
+        raise MemoryLimitExceededError(
+            f"Job exceeded the worker memory hard limit of {self.hard_limit_mb:g} MB "
+            f"(RSS {self._sampled_peak_mb:.0f} MB)"
+        )
+
+    def _build_report(self) -> Dict[str, Any]:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        start_mb = self._rss_mb if self._rss_mb is not None else self._maxrss_mb
+        # ru_maxrss only says something about this job if the job raised it
+        maxrss_mb = peak_rss_mb()
+        peak_mb = max(self._sampled_peak_mb, maxrss_mb if maxrss_mb > self._maxrss_mb else 0.0, start_mb)
+        report = {
+            "wall_seconds": round(time.monotonic() - self._started, 3),
+            "cpu_user_seconds": round(usage.ru_utime - self._usage.ru_utime, 3),
+            "cpu_system_seconds": round(usage.ru_stime - self._usage.ru_stime, 3),
+            "rss_start_mb": round(start_mb, 1),
+            "rss_peak_mb": round(peak_mb, 1),
+            "rss_delta_mb": round(peak_mb - start_mb, 1),
+            "soft_limit_exceeded": bool(self.soft_limit_mb and peak_mb > self.soft_limit_mb),
+            "hard_limit_exceeded": self._hard_limit_hit
+        }
+        if self.trace:
+            report["top_allocations"] = self._top_allocations()
+        return report
+
+    @staticmethod
+    def _top_allocations() -> List[Dict[str, Any]]:
+        stats = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__)
+        ]).statistics("lineno")
+        cwd = os.getcwd() + os.sep
+        return [
+            {
+                "location": f"{stat.traceback[0].filename.replace(cwd, '', 1)}:{stat.traceback[0].lineno}",
+                "size_kb": round(stat.size / 1024, 1),
+                "count": stat.count
+            }
+            for stat in stats[:WorkerResourceConstants.TRACEMALLOC_TOP]
+        ]
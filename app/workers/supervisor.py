@@ -0,0 +1,270 @@
+import json
+import math
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import time
+import uuid
+from typing import Dict, Any, List, Optional
+from redis.exceptions import RedisError
+from rq import Worker
+from rq.worker import WorkerStatus
+from app.task_queue import redis_conn, tenant_queues
+from app.services.metrics import oldest_wait
+from app.workers.fair_worker import FairWorker
+from app.constants.constants import SupervisorConstants, WorkerResourceConstants, JobPriority
+
+MIN_WORKERS = int(os.getenv("SUPERVISOR_MIN_WORKERS", SupervisorConstants.MIN_WORKERS))
+MAX_WORKERS = int(os.getenv("SUPERVISOR_MAX_WORKERS", SupervisorConstants.MAX_WORKERS)) or os.cpu_count() or 1
+JOBS_PER_WORKER = int(os.getenv("SUPERVISOR_JOBS_PER_WORKER", SupervisorConstants.JOBS_PER_WORKER))
+SCALE_UP_WAIT_SECONDS = float(os.getenv("SUPERVISOR_SCALE_UP_WAIT_SECONDS", SupervisorConstants.SCALE_UP_WAIT_SECONDS))
+SCALE_DOWN_DELAY_SECONDS = float(os.getenv("SUPERVISOR_SCALE_DOWN_DELAY_SECONDS", SupervisorConstants.SCALE_DOWN_DELAY_SECONDS))
+DRAIN_TIMEOUT_SECONDS = float(os.getenv("SUPERVISOR_DRAIN_TIMEOUT_SECONDS", SupervisorConstants.DRAIN_TIMEOUT_SECONDS))
+
+
+def run_worker(name: str):
+    """Entry point of a pooled worker process"""
+    # Own process group: a Ctrl+C in the terminal reaches only the
+    # supervisor, which then drains each worker with a single SIGTERM
+    os.setpgrp()
+    worker = FairWorker(connection=redis_conn, name=name)
+    worker.work(with_scheduler=True)
+    if worker.recycled:
+        sys.exit(WorkerResourceConstants.RECYCLE_EXIT_CODE)
+
+
+def desired_workers(current: int, busy: int, depth: int, wait_seconds: float, headroom: bool,
+                    minimum: int = MIN_WORKERS, maximum: int = MAX_WORKERS) -> int:
+    """
+    Workers needed for the busy ones plus one per JOBS_PER_WORKER queued
+    jobs, and at least one more than now while the oldest job waits past
+    SCALE_UP_WAIT_SECONDS. Without CPU/memory headroom the pool only grows
+    back to the minimum.
+    """
+    target = busy + math.ceil(depth / JOBS_PER_WORKER)
+    if depth and wait_seconds > SCALE_UP_WAIT_SECONDS:
+        target = max(target, current + 1)
+    target = min(max(target, minimum), maximum)
+    if target > current and not headroom:
+        target = max(current, minimum)
+    return target
+
+
+def _load_per_cpu() -> Optional[float]:
+    try:
+        return os.getloadavg()[0] / (os.cpu_count() or 1)
+    except (AttributeError, OSError):
+        return None
+
+
+def _available_memory_mb() -> Optional[float]:
+    """MemAvailable from /proc/meminfo; None where there is no such file"""
+    try:
+        with open("/proc/meminfo") as meminfo:
+            for line in meminfo:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def has_headroom() -> bool:
+    """Whether the host can take one more worker; unknown measurements don't block"""
+    load = _load_per_cpu()
+    if load is not None and load >= SupervisorConstants.MAX_LOAD_PER_CPU:
+        return False
+    memory = _available_memory_mb()
+    if memory is not None and memory - SupervisorConstants.WORKER_MEMORY_MB < SupervisorConstants.MIN_FREE_MEMORY_MB:
+        return False
+    return True
+
+
+def live_supervisors(connection=None) -> List[Dict[str, Any]]:
+    """Heartbeats of every running supervisor, forgetting those that stopped reporting"""
+    connection = connection or redis_conn
+    heartbeats = []
+    for raw_id in connection.zrange(SupervisorConstants.REGISTRY_KEY, 0, -1):
+        supervisor_id = raw_id.decode("utf-8")
+        heartbeat = connection.get(f"{SupervisorConstants.HEARTBEAT_KEY_PREFIX}:{supervisor_id}")
+        if heartbeat is None:
+            connection.zrem(SupervisorConstants.REGISTRY_KEY, supervisor_id)
+            continue
+        heartbeats.append(json.loads(heartbeat))
+    return heartbeats
+
+
+class PooledWorker:
+    """One worker process of the pool and its lifecycle timestamps"""
+
+    def __init__(self, process: multiprocessing.Process, name: str):
+        self.process = process
+        self.name = name
+        self.started_at = time.time()
+        self.draining_since: Optional[float] = None
+
+    def state(self, connection) -> Optional[str]:
+        worker = Worker.find_by_key(Worker.redis_worker_namespace_prefix + self.name, connection=connection)
+        return worker.get_state() if worker else None
+
+
+class WorkerSupervisor:
+    """
+    Runs a pool of FairWorker processes on one host and sizes it from the
+    queue every INTERVAL_SECONDS (see desired_workers). Crashed workers are
+    replaced with exponential backoff, recycled ones (past their memory soft
+    limit) right away; on scale-down an idle worker is
+    preferred and is drained with SIGTERM, which lets RQ finish the current
+    job. Each loop writes a heartbeat with the pool's state to Redis (see
+    live_supervisors). If Redis is unreachable the pool keeps its size.
+    """
+
+    def __init__(self, minimum: int = MIN_WORKERS, maximum: int = MAX_WORKERS, connection=None):
+        self.minimum = minimum
+        self.maximum = max(maximum, minimum)
+        self.redis = connection or redis_conn
+        self.id = f"{socket.gethostname()}:{os.getpid()}"
+        self.workers: List[PooledWorker] = []
+        self.draining: List[PooledWorker] = []
+        self.crashes = 0
+        self.restart_not_before = 0.0
+        self.low_since: Optional[float] = None
+        self.target = minimum
+        self.stopping = False
+        # macOS cannot safely fork a process that has used Objective-C APIs
+        self.context = multiprocessing.get_context("spawn" if sys.platform == "darwin" else "fork")
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+        print(f"Supervisor {self.id} running {self.minimum}-{self.maximum} workers")
+        while not self.stopping:
+            self._reap()
+            self._scale()
+            self._heartbeat()
+            time.sleep(SupervisorConstants.INTERVAL_SECONDS)
+        self._shutdown()
+
+    def _request_stop(self, signum, frame):
+        self.stopping = True
+
+    # -------------------------------
+    # Process lifecycle
+    # -------------------------------
+    def _start_worker(self):
+        name = f"{socket.gethostname()}.{os.getpid()}.{uuid.uuid4().hex[:8]}"
+        process = self.context.Process(target=run_worker, args=(name,), daemon=False)
+        process.start()
+        self.workers.append(PooledWorker(process, name))
+        print(f"Started worker {name} (pid {process.pid})")
+
+    def _drain(self, worker: PooledWorker):
+        self.workers.remove(worker)
+        worker.draining_since = time.time()
+        self.draining.append(worker)
+        os.kill(worker.process.pid, signal.SIGTERM)
+        print(f"Draining worker {worker.name}")
+
+    def _reap(self):
+        now = time.time()
+        for worker in list(self.workers):
+            if worker.process.is_alive():
+                continue
+            self.workers.remove(worker)
+            if worker.process.exitcode == WorkerResourceConstants.RECYCLE_EXIT_CODE:
+                print(f"Worker {worker.name} recycled after reaching its memory soft limit")
+                continue
+            # A worker that stayed up long enough starts a fresh backoff series
+            self.crashes = 1 if now - worker.started_at >= SupervisorConstants.STABLE_SECONDS else self.crashes + 1
+            backoff = min(SupervisorConstants.RESTART_BASE_BACKOFF_SECONDS * 2 ** (self.crashes - 1),
+                          SupervisorConstants.RESTART_MAX_BACKOFF_SECONDS)
+            self.restart_not_before = now + backoff
+            print(f"Worker {worker.name} exited with code {worker.process.exitcode}; replacing it in {backoff}s")
+
+        for worker in list(self.draining):
+            if not worker.process.is_alive():
+                self.draining.remove(worker)
+            elif now - worker.draining_since > DRAIN_TIMEOUT_SECONDS:
+                print(f"Worker {worker.name} did not drain in time, killing it")
+                worker.process.kill()
+
+    # -------------------------------
+    # Sizing
+    # -------------------------------
+    def _scale(self):
+        current = len(self.workers)
+        try:
+            self.target = self._desired(current)
+        except RedisError as e:
+            print(f"Queue unavailable, keeping {current} workers: {str(e)}")
+            self.target = max(current, self.minimum)
+
+        now = time.time()
+        if self.target > current:
+            self.low_since = None
+            if now >= self.restart_not_before:
+                for _ in range(self.target - current):
+                    self._start_worker()
+        elif self.target < current:
+            self.low_since = self.low_since or now
+            if now - self.low_since >= SCALE_DOWN_DELAY_SECONDS:
+                self._drain(self._drain_candidate())
+                self.low_since = now
+        else:
+            self.low_since = None
+
+    def _desired(self, current: int) -> int:
+        queues = [queue for priority in JobPriority for queue in tenant_queues(priority.value, self.redis)]
+        depth = sum(queue.count for queue in queues)
+        busy = sum(1 for worker in self.workers if worker.state(self.redis) == WorkerStatus.BUSY)
+        return desired_workers(current, busy, depth, oldest_wait(queues) if depth else 0.0, has_headroom(),
+                               self.minimum, self.maximum)
+
+    def _drain_candidate(self) -> PooledWorker:
+        """An idle worker if there is one, else the newest"""
+        for worker in reversed(self.workers):
+            try:
+                if worker.state(self.redis) == WorkerStatus.IDLE:
+                    return worker
+            except RedisError:
+                break
+        return self.workers[-1]
+
+    # -------------------------------
+    # Heartbeat registry
+    # -------------------------------
+    def _heartbeat(self):
+        heartbeat = {
+            "id": self.id,
+            "target": self.target,
+            "minimum": self.minimum,
+            "maximum": self.maximum,
+            "workers": [{"name": w.name, "pid": w.process.pid, "started_at": w.started_at} for w in self.workers],
+            "draining": [w.name for w in self.draining],
+            "crashes": self.crashes,
+            "updated_at": time.time()
+        }
+        try:
+            self.redis.set(f"{SupervisorConstants.HEARTBEAT_KEY_PREFIX}:{self.id}", json.dumps(heartbeat),
+                           ex=SupervisorConstants.HEARTBEAT_TTL_SECONDS)
+            self.redis.zadd(SupervisorConstants.REGISTRY_KEY, {self.id: heartbeat["updated_at"]})
+        except RedisError:
+            pass
+
+    def _shutdown(self):
+        """Drain every worker, waiting for their current jobs, then leave the registry"""
+        print(f"Supervisor {self.id} stopping, draining {len(self.workers)} workers")
+        for worker in list(self.workers):
+            self._drain(worker)
+        deadline = time.time() + DRAIN_TIMEOUT_SECONDS
+        for worker in self.draining:
+            worker.process.join(max(0.0, deadline - time.time()))
+            if worker.process.is_alive():
+                worker.process.kill()
+        try:
+            self.redis.delete(f"{SupervisorConstants.HEARTBEAT_KEY_PREFIX}:{self.id}")
+            self.redis.zrem(SupervisorConstants.REGISTRY_KEY, self.id)
+        except RedisError:
+            pass
@@ -1,19 +1,86 @@
 from app.database import get_db
-from app.models.presentation import Presentation, PresentationStatus
+from app.models.presentation import Presentation, PresentationStatus, Job
 from app.services.llm_client import LLMClient
 from app.services.pptx_creator import PPTXCreator
+from app.services.thumbnail_renderer import ThumbnailRenderer
+from app.services.document_ingestor import DocumentSummarizer, local_upload
+from app.services.storage import get_storage
+from app.services.slide_patcher import apply_slide_update
+from app.services.artifact_sweeper import ArtifactSweeper
+from app.services.admission import record_job_duration
+from app.services.cancellation import CancellationToken, JobCancelledError
+from app.services.response_cache import PresentationCache
+from app.services.slide_store import replace_slides
+from app.services.search_index import SearchIndex
+from app.task_queue import get_queue, redis_conn
+from app.utils.auto_layout import AutoLayout
+from app.utils.theme_resolver import ThemeResolver
+from app.constants.constants import SweeperConstants
+from rq import get_current_job
 import time
 import os
 import traceback
-from datetime import datetime
+from datetime import datetime, timedelta
 
-def generate_presentation_task(presentation_id):
-    """Task to generate a presentation"""
+SWEEP_INTERVAL_SECONDS = int(os.getenv("SWEEP_INTERVAL_SECONDS", SweeperConstants.INTERVAL_SECONDS))
+
+
+def _record_job_meta(**fields):
+    """Store accounting data with the running RQ job (no-op outside a worker)"""
+    job = get_current_job()
+    if job is None:
+        return
+    job.meta.update(fields)
+    job.save_meta()
+
+
+def _update_job_row(db, status, error=None):
+    """Mirror the running RQ job's state in its Job row, if it has one"""
+    job = get_current_job()
+    if job is None:
+        return
+    row = db.query(Job).filter(Job.id == job.id).first()
+    if row:
+        row.status = status.value
+        row.error = error
+        db.commit()
+
+
+def _mark_cancelled(db, presentation_id):
+    """Record a cancelled job; its presentation may already have been deleted"""
+    db.rollback()
+    _record_job_meta(cancelled=True)
+    presentation = db.query(Presentation).filter(Presentation.id == presentation_id).first()
+    if presentation and presentation.status in (PresentationStatus.PENDING, PresentationStatus.PROCESSING):
+        presentation.status = PresentationStatus.CANCELLED
+        presentation.updated_at = datetime.utcnow()
+    db.commit()
+    PresentationCache().invalidate(presentation_id)
+    _update_job_row(db, PresentationStatus.CANCELLED)
+
+
+def generate_presentation_task(presentation_id, source_key=None, fast=False):
+    """
+    Task to generate a presentation.
+    
+    When source_key names an uploaded document in storage, it is first summarized
+    with map-reduce and the summary replaces the presentation content.
+    In fast mode (set by admission control under load) no speaker notes are
+    generated and the deck is written with the direct XML renderer.
+    
+    The job's cancellation flag is checked between stages and per slide,
+    and in-flight provider calls are aborted once it is set.
+    """
     
     # Get database session
     db = next(get_db())
+    started = time.monotonic()
+    cancel_token = CancellationToken.for_current_job()
     
     try:
+        # A job cancelled while it was being dequeued stops here
+        cancel_token.check()
+        
         # Get presentation from database
         presentation = db.query(Presentation).filter(Presentation.id == presentation_id).first()
         
@@ -24,27 +91,64 @@ def generate_presentation_task(presentation_id):
         # Update status to processing
         presentation.status = PresentationStatus.PROCESSING
         db.commit()
+        # A retried job may start from a failed deck whose response is cached
+        PresentationCache().invalidate(presentation_id)
+        _update_job_row(db, PresentationStatus.PROCESSING)
         
         # Initialize services
-        llm_client = LLMClient()
-        pptx_creator = PPTXCreator()
+        llm_client = LLMClient(cancel_token)
+        pptx_creator = PPTXCreator(cancel_token)
+        
+        # Summarize long source documents before generating slides
+        if source_key:
+            summarizer = DocumentSummarizer(llm_client)
+            with local_upload(source_key) as source_path:
+                result = summarizer.summarize(
+                    source_path,
+                    presentation.topic,
+                    progress=lambda state: _record_job_meta(ingestion_progress=state)
+                )
+            print(f"Summarized {result['chunks']} chunks in {result['seconds']}s "
+                  f"({result['reduce_rounds']} reduce rounds)")
+            _record_job_meta(ingestion={k: v for k, v in result.items() if k != "summary"})
+            
+            presentation.content = result["summary"]
+            db.commit()
+            get_storage().delete(source_key)
+            cancel_token.check()
         
         # Generate slide content using LLM with the provided content
         slides_data = llm_client.generate_slide_content(
             topic=presentation.topic,
             content=presentation.content,
-            num_slides=presentation.num_slides
+            num_slides=presentation.num_slides,
+            config={"include_speaker_notes": False} if fast else None
         )
         
-        # Store the generated slides data in the database
+        # Record prompt/completion token usage for this job
+        if llm_client.last_usage:
+            print(f"LLM usage for {presentation_id}: {llm_client.last_usage}")
+            _record_job_meta(llm_usage=llm_client.last_usage)
+        
+        # Fit long bullets before rendering, measured in the deck's font: smaller text, two columns or continuation slides
+        font = ThemeResolver.build_render_config(presentation.style_config)["font"]
+        auto_layout = AutoLayout(font)
+        slides_data = auto_layout.fit(slides_data)
+        print(f"Auto-layout: {auto_layout.last_report}")
+        _record_job_meta(auto_layout=auto_layout.last_report)
+        cancel_token.check()
+        
+        # Store the generated slides data in the database, as the deck blob and one row per slide, and index it
         presentation.slides_data = slides_data
+        replace_slides(db, presentation_id, slides_data)
+        SearchIndex(db).index(presentation)
         db.commit()
         
         # Define preset template configuration based on slide types
         # This allows for easy customization and consistent styling
         preset_config = {
             "theme": "professional",
-            "font": "Calibri",
+            "font": font,
             "background_color": "#FFFFFF",
             "aspect_ratio": "16:9",
             # Preset templates determine layout and design
@@ -76,17 +180,38 @@ def generate_presentation_task(presentation_id):
         file_path = pptx_creator.create_presentation(
             slides_data=slides_data,
             topic=presentation.topic,
-            config=preset_config
+            config=preset_config,
+            fast=True if fast else None,
+            presentation_id=presentation.id
         )
+        _record_job_meta(artifact=pptx_creator.last_report, fast_mode=fast)
+        print(f"Wrote {file_path}: {pptx_creator.last_report}")
+        
+        # Thumbnails are drawn from slides_data, so a failure here never fails the deck
+        cancel_token.check()
+        try:
+            ThumbnailRenderer().write_thumbnails(presentation.id, slides_data, preset_config)
+        except Exception as e:
+            print(f"Failed to generate thumbnails for {presentation.id}: {str(e)}")
         
         # Update presentation record with file path
         presentation.file_path = file_path
         presentation.status = PresentationStatus.COMPLETED
         presentation.updated_at = datetime.utcnow()
         db.commit()
+        PresentationCache().invalidate(presentation_id)
+        _update_job_row(db, PresentationStatus.COMPLETED)
+        
+        # Document jobs run longer by design; only direct requests set the drain rate
+        if not source_key:
+            record_job_duration(time.monotonic() - started)
         
         print(f"Successfully generated presentation: {file_path}")
         
+    except JobCancelledError:
+        print(f"Generation of {presentation_id} cancelled")
+        _mark_cancelled(db, presentation_id)
+        
     except Exception as e:
         # Log error and update presentation status
         error_msg = f"Error generating presentation: {str(e)}"
@@ -98,8 +223,123 @@ def generate_presentation_task(presentation_id):
             presentation.status = PresentationStatus.FAILED
             presentation.updated_at = datetime.utcnow()
             db.commit()
+            PresentationCache().invalidate(presentation_id)
+            _update_job_row(db, PresentationStatus.FAILED, str(e))
         except:
             print("Failed to update presentation status")
         
     finally:
-        db.close() 
\ No newline at end of file
+        db.close() 
+
+
+def regenerate_slide_task(presentation_id, slide_index, instructions=None):
+    """
+    Task to regenerate a single slide with the LLM.
+    
+    The new slide is merged back through the partial-render path, so the rest
+    of the deck and its .pptx parts are left untouched.
+    """
+    
+    db = next(get_db())
+    cancel_token = CancellationToken.for_current_job()
+    
+    try:
+        cancel_token.check()
+        presentation = db.query(Presentation).filter(Presentation.id == presentation_id).first()
+        
+        if not presentation or not presentation.slides_data:
+            print(f"Presentation with ID {presentation_id} not found or has no slides")
+            _record_job_meta(slide_regenerated=False)
+            _update_job_row(db, PresentationStatus.FAILED)
+            return
+        if not 0 <= slide_index < len(presentation.slides_data):
+            print(f"Slide {slide_index} out of range for presentation {presentation_id}")
+            _record_job_meta(slide_regenerated=False)
+            _update_job_row(db, PresentationStatus.FAILED)
+            return
+        
+        _update_job_row(db, PresentationStatus.PROCESSING)
+        llm_client = LLMClient(cancel_token)
+        slide = llm_client.regenerate_slide(
+            topic=presentation.topic,
+            content=presentation.content,
+            slides=presentation.slides_data,
+            index=slide_index,
+            instructions=instructions,
+            config={"include_speaker_notes": presentation.has_speaker_notes}
+        )
+        _record_job_meta(llm_usage=llm_client.last_usage)
+        
+        if slide is None:
+            # Keep the existing slide rather than replacing it with placeholder content
+            print(f"Could not regenerate slide {slide_index} of {presentation_id}")
+            _record_job_meta(slide_regenerated=False)
+            _update_job_row(db, PresentationStatus.FAILED)
+            return
+        
+        cancel_token.check()
+        patched = apply_slide_update(presentation, slide_index, slide)
+        presentation.updated_at = datetime.utcnow()
+        db.commit()
+        PresentationCache().invalidate(presentation_id)
+        _update_job_row(db, PresentationStatus.COMPLETED)
+        
+        _record_job_meta(slide_regenerated=True, patched_in_place=patched)
+        print(f"Regenerated slide {slide_index} of {presentation_id} ({'patched in place' if patched else 'full render'})")
+        
+    except JobCancelledError:
+        print(f"Regeneration of slide {slide_index} of {presentation_id} cancelled")
+        _mark_cancelled(db, presentation_id)
+        
+    except Exception as e:
+        print(f"Error regenerating slide: {str(e)}")
+        print(traceback.format_exc())
+        db.rollback()
+        _record_job_meta(slide_regenerated=False, error=str(e))
+        _update_job_row(db, PresentationStatus.FAILED, str(e))
+        
+    finally:
+        db.close()
+
+
+def sweep_artifacts_task():
+    """
+    Task to run one retention sweep, then schedule the next one.
+    
+    See ArtifactSweeper; the report (bytes reclaimed, rows and files
+    deleted) is stored in the job's metadata.
+    """
+    
+    db = next(get_db())
+    
+    try:
+        report = ArtifactSweeper(db).sweep()
+        _record_job_meta(sweep=report)
+        print(f"Sweep reclaimed {report['bytes_reclaimed']} bytes: {report}")
+        
+    except Exception as e:
+        print(f"Error sweeping artifacts: {str(e)}")
+        print(traceback.format_exc())
+        db.rollback()
+        
+    finally:
+        db.close()
+        schedule_sweeper(SWEEP_INTERVAL_SECONDS, force=True)
+
+
+def schedule_sweeper(delay_seconds=0, force=False):
+    """
+    Schedule the next sweep with RQ's scheduler. Workers call this at
+    startup; the Redis key marks a chain as scheduled, so only one runs no
+    matter how many workers start, and a broken chain is restarted once it
+    expires. Returns whether a sweep was scheduled.
+    """
+    expires = int(delay_seconds + 2 * SWEEP_INTERVAL_SECONDS)
+    if not redis_conn.set(SweeperConstants.SCHEDULE_KEY, 1, ex=expires, nx=not force):
+        return False
+    get_queue().enqueue_in(
+        timedelta(seconds=delay_seconds),
+        sweep_artifacts_task,
+        job_timeout=SweeperConstants.JOB_TIMEOUT
+    )
+    return True
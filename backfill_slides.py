@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+Migration script that copies each presentation's slides_data blob into the
+slides table, one row per slide. Creates the table if it is missing. Safe
+to rerun and to run while the API and workers are up: decks that already
+have rows are skipped, and until a deck is backfilled its slides are read
+from the blob.
+
+Usage: python backfill_slides.py [batch size]
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.database import SessionLocal, create_tables
+from app.services.slide_store import backfill_slides
+from app.constants.constants import SlideStoreConstants
+
+if __name__ == "__main__":
+    batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else SlideStoreConstants.BACKFILL_BATCH_SIZE
+    create_tables()
+    db = SessionLocal()
+    try:
+        print(f"Backfilled the slides of {backfill_slides(db, batch_size)} presentations")
+    finally:
+        db.close()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark script comparing the .pptx writers: python-pptx in memory,
+python-pptx streamed slide by slide, and the XML template fast path.
+Each case runs in its own process so peak memory is measured per deck.
+
+Usage: python benchmark.py [slide counts...]
+"""
+
+import sys
+import os
+import json
+import resource
+import subprocess
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_SLIDE_COUNTS = [50, 200, 500, 1000]
+
+
+def build_slides(count):
+    """Bullet-heavy slides with notes, cycling through the text layouts"""
+    slide_types = ["bullet_points", "two_column", "quote", "bullet_points"]
+    slides_data = [{"title": "Benchmark Deck", "content": ["Generated for benchmarking"], "slide_type": "title", "notes": "Intro"}]
+    for i in range(1, count):
+        slides_data.append({
+            "title": f"Section {i}",
+            "content": [f"Point {j} of slide {i} with a little more text to wrap" for j in range(5)],
+            "slide_type": slide_types[i % len(slide_types)],
+            "notes": f"Speaker notes for slide {i}"
+        })
+    return slides_data
+
+
+WRITERS = {
+    "full": {"streaming": False, "fast": False},
+    "streaming": {"streaming": True, "fast": False},
+    "fast": {"fast": True}
+}
+
+
+def run_case(count, writer):
+    """Render one deck in this process and print its stats as JSON"""
+    from app.services.pptx_creator import PPTXCreator
+    from app.services.storage import get_storage
+
+    slides_data = build_slides(count)
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    key = PPTXCreator().create_presentation(slides_data, f"benchmark {count} {writer}", **WRITERS[writer])
+    elapsed = time.perf_counter() - started
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    print(json.dumps({
+        "seconds": round(elapsed, 2),
+        "peak_mb": round(peak / 1024, 1),
+        "growth_mb": round((peak - baseline) / 1024, 1),
+        "file_kb": get_storage().size(key) // 1024
+    }))
+    get_storage().delete(key)
+
+
+def main():
+    """Run every case in a fresh interpreter and print a table"""
+    counts = [int(arg) for arg in sys.argv[1:]] or DEFAULT_SLIDE_COUNTS
+
+    print(f"{'slides':>7} {'writer':>10} {'seconds':>8} {'peak MB':>8} {'growth MB':>10} {'size KB':>8}")
+    for count in counts:
+        for writer in WRITERS:
+            output = subprocess.run(
+                [sys.executable, __file__, "--case", str(count), writer],
+                capture_output=True, text=True, check=True
+            ).stdout
+            stats = json.loads(output.strip().splitlines()[-1])
+            print(f"{count:>7} {writer:>10} {stats['seconds']:>8} {stats['peak_mb']:>8} {stats['growth_mb']:>10} {stats['file_kb']:>8}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "--case":
+        run_case(int(sys.argv[2]), sys.argv[3])
+    else:
+        main()
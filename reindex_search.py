@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""
+Script that (re)builds the full-text search index from every presentation
+with generated slides. Creates the index tables if they are missing. New
+and edited decks are indexed as they are written; run this once after
+upgrading an existing database, or after changing the search settings.
+
+Usage: python reindex_search.py [batch size]
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.database import SessionLocal, create_tables
+from app.services.search_index import SearchIndex
+from app.constants.constants import SearchConstants
+
+if __name__ == "__main__":
+    batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else SearchConstants.REINDEX_BATCH_SIZE
+    create_tables()
+    db = SessionLocal()
+    try:
+        print(f"Indexed {SearchIndex(db).rebuild(batch_size)} presentations")
+    finally:
+        db.close()
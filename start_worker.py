@@ -33,6 +33,15 @@ def check_redis():
         print(f"❌ Redis connection failed: {e}")
         return False
 
+def run_script(script):
+    """Run a worker script, starting it again whenever it exits to be recycled"""
+    from app.constants.constants import WorkerResourceConstants
+    while True:
+        result = subprocess.run([sys.executable, script])
+        if result.returncode != WorkerResourceConstants.RECYCLE_EXIT_CODE:
+            return result
+        print(f"{script} exited past its memory soft limit; starting a fresh worker")
+
 def start_worker():
     """Start the appropriate worker based on the system"""
     system = detect_system()
@@ -70,14 +79,14 @@ def start_worker():
             print(f"Safe worker failed: {e}")
             print("Falling back to standard worker...")
             try:
-                subprocess.run([sys.executable, "worker.py"])
+                run_script("worker.py")
             except KeyboardInterrupt:
                 print("\nWorker stopped")
     
     else:
         print(f"\n🐧 Starting standard worker for {system}...")
         try:
-            subprocess.run([sys.executable, "worker.py"])
+            run_script("worker.py")
         except KeyboardInterrupt:
             print("\nWorker stopped")
     
@@ -93,9 +102,12 @@ if __name__ == "__main__":
             subprocess.run([sys.executable, "worker_safe.py"])
         elif worker_type == 'standard':
             print("⚡ Using standard worker")
-            subprocess.run([sys.executable, "worker.py"])
+            run_script("worker.py")
+        elif worker_type == 'pool':
+            print("🧮 Using autoscaling worker pool")
+            subprocess.run([sys.executable, "supervisor.py"])
         else:
-            print("Usage: python start_worker.py [safe|standard]")
+            print("Usage: python start_worker.py [safe|standard|pool]")
             sys.exit(1)
     else:
         start_worker() 
\ No newline at end of file
@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+Supervisor script that runs a pool of presentation workers on this host.
+The pool grows and shrinks with the queue between SUPERVISOR_MIN_WORKERS
+and SUPERVISOR_MAX_WORKERS (default: one per CPU core).
+"""
+
+import os
+import sys
+
+# Fix for macOS forking issue with Objective-C runtime
+os.environ['OBJC_DISABLE_INITIALIZE_FORK_SAFETY'] = 'YES'
+
+from app.workers.tasks import schedule_sweeper
+from app.workers.supervisor import WorkerSupervisor
+
+if __name__ == "__main__":
+    supervisor = WorkerSupervisor()
+    
+    if schedule_sweeper():
+        print("Scheduled the retention sweeper")
+    
+    print("Starting presentation worker pool...")
+    print("Press Ctrl+C to drain the workers and stop")
+    
+    supervisor.run()
+    print("Worker pool stopped")
+    sys.exit(0)
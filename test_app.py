@@ -10,6 +10,7 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from app.services.llm_client import LLMClient
 from app.services.pptx_creator import PPTXCreator
+from app.services.storage import get_storage
 
 
 def test_llm_fallback():
@@ -65,14 +66,15 @@ def test_pptx_creation():
     
     # Create presentation
     pptx_creator = PPTXCreator()
-    file_path = pptx_creator.create_presentation(slides_data, "Test AI Presentation")
+    key = pptx_creator.create_presentation(slides_data, "Test AI Presentation")
     
-    print(f"Created presentation: {file_path}")
+    print(f"Created presentation: {key}")
     
     # Check if file exists
-    if os.path.exists(file_path):
+    storage = get_storage()
+    if storage.exists(key):
         print("✅ PowerPoint file created successfully!")
-        file_size = os.path.getsize(file_path)
+        file_size = storage.size(key)
         print(f"File size: {file_size} bytes")
         return True
     else:
@@ -80,6 +82,597 @@ def test_pptx_creation():
         return False
 
 
+def test_fast_renderer_equivalence():
+    """Test that the XML fast path writes the same slides as python-pptx"""
+    print("\nTesting fast renderer equivalence...")
+    
+    from lxml import etree
+    from pptx import Presentation
+    
+    slides_data = [
+        {"title": "Fast & <Safe>", "content": ["Line one", "Line\ntwo"], "slide_type": "title", "notes": "Intro"},
+        {"title": "Bullets", "content": ["A \"quoted\" point", "Soft\vbreak", ""], "slide_type": "bullet_points",
+         "reference": "Source: somewhere", "font_size": 16},
+        {"title": "Columns", "content": ["Left", "Right", "More right"], "slide_type": "two_column", "notes": "Two\nlines"},
+        {"title": "Image", "content": ["Caption"], "slide_type": "content_with_image", "notes": "Picture"},
+        {"title": "Unknown type", "content": [], "slide_type": "conclusion"}
+    ]
+    config = {"theme": "dark", "font": "Georgia", "background_color": "#202020"}
+    
+    def slide_xml(key):
+        canonical = lambda blob: etree.tostring(etree.fromstring(blob), method="c14n")
+        with get_storage().open(key) as stream:
+            slides = Presentation(stream).slides
+        return [
+            (canonical(slide.part.blob), slide.slide_layout.name,
+             canonical(slide.notes_slide.part.blob) if slide.has_notes_slide else None)
+            for slide in slides
+        ]
+    
+    expected = slide_xml(PPTXCreator().create_presentation(slides_data, "Test Fast Reference", config, streaming=False, fast=False))
+    actual = slide_xml(PPTXCreator().create_presentation(slides_data, "Test Fast Render", config, fast=True))
+    
+    print(f"Compared {len(expected)} slides")
+    assert expected == actual, "Fast renderer output differs from python-pptx"
+    print("✅ Fast renderer matches python-pptx output!")
+    return True
+
+
+class InMemoryS3Client:
+    """Stand-in for a boto3 S3 client (as served by MinIO), keeping objects in a dict"""
+    
+    class exceptions:
+        class ClientError(Exception):
+            pass
+    
+    def __init__(self):
+        from datetime import datetime, timezone
+        self.objects = {}
+        self.now = lambda: datetime.now(timezone.utc)
+    
+    def upload_file(self, filename, bucket, key, Config=None):
+        with open(filename, "rb") as f:
+            self.objects[(bucket, key)] = (f.read(), self.now())
+    
+    def download_file(self, bucket, key, filename, Config=None):
+        with open(filename, "wb") as f:
+            f.write(self._get(bucket, key))
+    
+    def get_object(self, Bucket, Key):
+        import io
+        return {"Body": io.BytesIO(self._get(Bucket, Key))}
+    
+    def head_object(self, Bucket, Key):
+        return {"ContentLength": len(self._get(Bucket, Key))}
+    
+    def delete_object(self, Bucket, Key):
+        self.objects.pop((Bucket, Key), None)
+    
+    def get_paginator(self, operation):
+        client = self
+        
+        class Paginator:
+            def paginate(self, Bucket, Prefix=""):
+                # One object per page, so listing has to follow the pages
+                for (bucket, key), (body, modified) in sorted(client.objects.items()):
+                    if bucket == Bucket and key.startswith(Prefix):
+                        yield {"Contents": [{"Key": key, "Size": len(body), "LastModified": modified}]}
+                yield {}
+        
+        return Paginator()
+    
+    def _get(self, bucket, key):
+        if (bucket, key) not in self.objects:
+            raise self.exceptions.ClientError(f"NoSuchKey: {key}")
+        return self.objects[(bucket, key)][0]
+
+
+def test_s3_storage():
+    """Test the S3 backend's put, get, delete, exists and listing against a stand-in client"""
+    print("\nTesting S3 storage...")
+    
+    import tempfile
+    from app.services.storage import S3Storage
+    from app.services.thumbnail_renderer import ThumbnailRenderer
+    from app.services.document_ingestor import upload_key
+    
+    client = InMemoryS3Client()
+    storage = S3Storage(bucket="test-bucket", prefix="decks/", client=client)
+    
+    source = storage.scratch_file(".pptx")
+    with open(source, "wb") as f:
+        f.write(b"deck bytes" * 1000)
+    storage.put_file("deck-1.pptx", source)
+    assert not os.path.exists(source), "put_file must consume the source file"
+    assert ("test-bucket", "decks/deck-1.pptx") in client.objects
+    
+    assert storage.exists("deck-1.pptx") and not storage.exists("missing.pptx")
+    assert storage.size("deck-1.pptx") == 10000
+    assert b"".join(storage.iter_chunks("deck-1.pptx", chunk_size=4096)) == b"deck bytes" * 1000
+    with tempfile.TemporaryDirectory() as directory:
+        copy = os.path.join(directory, "copy.pptx")
+        storage.get_file("deck-1.pptx", copy)
+        with open(copy, "rb") as f:
+            assert f.read() == b"deck bytes" * 1000
+    
+    slides = [{"title": "One", "slide_type": "title"}, {"title": "Two", "content": ["A"], "slide_type": "bullet_points"}]
+    renderer = ThumbnailRenderer(storage)
+    renderer.write_thumbnails("p1", slides)
+    storage.put_bytes(upload_key("p1"), b"source")
+    assert ThumbnailRenderer.slide_count("p1", storage) == 2
+    assert storage.read_bytes(ThumbnailRenderer.thumbnail_key("p1", 1)).startswith(b"<svg")
+    renderer.write_thumbnails("p1", slides[:1])
+    assert ThumbnailRenderer.slide_count("p1", storage) == 1, "thumbnails past the last slide must be dropped"
+    
+    listed = sorted(stored.key for stored in storage.iter_objects())
+    assert listed == ["deck-1.pptx", ThumbnailRenderer.thumbnail_key("p1", 0), upload_key("p1")], listed
+    assert [stored.key for stored in storage.iter_objects(ThumbnailRenderer.thumbnail_prefix("p1"))] == [
+        ThumbnailRenderer.thumbnail_key("p1", 0)]
+    
+    storage.delete("deck-1.pptx")
+    storage.delete("deck-1.pptx")  # missing keys are ignored
+    assert not storage.exists("deck-1.pptx")
+    print("✅ S3 storage works!")
+    return True
+
+
+def test_cancellation_aborts_provider_stream():
+    """Test that cancelling a job closes a provider's streamed response instead of waiting it out"""
+    print("\nTesting cancellation of a provider call...")
+    
+    import json
+    import time
+    import fakeredis
+    import httpx
+    from app.services.llm_client import OllamaProvider
+    from app.services.cancellation import CancellationToken, JobCancelledError, request_cancel
+    from app.constants.constants import CancellationConstants
+    
+    closed = []
+    
+    class SlowBody(httpx.SyncByteStream):
+        """A generation that would take 20 seconds to finish"""
+        def __iter__(self):
+            for _ in range(2000):
+                time.sleep(0.01)
+                yield (json.dumps({"response": "x", "done": False}) + "\n").encode()
+        
+        def close(self):
+            closed.append(True)
+    
+    provider = OllamaProvider()
+    provider.client = httpx.Client(transport=httpx.MockTransport(lambda request: httpx.Response(200, stream=SlowBody())))
+    connection = fakeredis.FakeRedis()
+    token = CancellationToken("job-1", connection)
+    request_cancel("job-1", connection)
+    
+    started = time.monotonic()
+    try:
+        provider.generate_completion("prompt", "system", cancel_token=token)
+        raise AssertionError("cancelled call ran to completion")
+    except JobCancelledError:
+        pass
+    elapsed = time.monotonic() - started
+    assert elapsed < CancellationConstants.POLL_SECONDS + 1, f"cancellation took {elapsed:.1f}s"
+    assert closed, "the streamed response was not closed"
+    print(f"✅ Cancelled provider call aborted in {elapsed:.2f}s!")
+    return True
+
+
+def test_idempotency_replay_and_conflict():
+    """Test that a repeated Idempotency-Key replays per tenant and a reused one is refused"""
+    print("\nTesting idempotency keys...")
+    
+    import fakeredis
+    from app.services.idempotency import SingleFlight, IdempotencyKeyReusedError, dedup_key, request_fingerprint
+    
+    single_flight = SingleFlight(fakeredis.FakeRedis())
+    fingerprint = request_fingerprint("Topic", "Content", 5)
+    key, ttl = dedup_key(fingerprint, "key-1", "acme")
+    other_key, _ = dedup_key(fingerprint, "key-1", "globex")
+    assert key != other_key, "tenants share idempotency keys"
+    
+    assert single_flight.claim(key, ttl, "deck-1", fingerprint) is None, "first request does not own its key"
+    assert single_flight.claim(key, ttl, "deck-2", fingerprint) == "deck-1", "retry was not replayed"
+    assert single_flight.claim(other_key, ttl, "deck-3", fingerprint) is None, "another tenant got a replay"
+    try:
+        single_flight.claim(key, ttl, "deck-4", request_fingerprint("Other topic", "Content", 5))
+        raise AssertionError("a reused key was accepted for a different request")
+    except IdempotencyKeyReusedError:
+        pass
+    
+    single_flight.release(key, "deck-1")
+    assert single_flight.claim(key, ttl, "deck-5", fingerprint) is None, "released key is still bound"
+    print("✅ Idempotency keys replay and conflict correctly!")
+    return True
+
+
+def test_circuit_breaker_state_machine():
+    """Test that the circuit breaker opens, allows a single probe and closes again"""
+    print("\nTesting circuit breaker state machine...")
+    
+    import threading
+    import fakeredis
+    from app.services import circuit_breaker
+    from app.services.circuit_breaker import CircuitBreaker
+    from app.constants.constants import CircuitState
+    
+    connection = fakeredis.FakeRedis()
+    breaker = CircuitBreaker("test-provider", connection)
+    assert breaker.allow_request(), "closed circuit refused a call"
+    
+    # Concurrent failures from several workers are all counted and open the circuit once
+    errors = [RuntimeError("boom")] * circuit_breaker.CONSECUTIVE_FAILURE_THRESHOLD
+    threads = [threading.Thread(target=breaker.record_failure, args=(error,)) for error in errors]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    state = breaker._load()
+    assert state["state"] == CircuitState.OPEN.value, f"circuit did not open: {state}"
+    assert state["open_count"] == "1", f"circuit opened {state['open_count']} times"
+    assert breaker.is_open() and not breaker.allow_request(), "open circuit allowed a call"
+    
+    # Backoff elapsed: exactly one probe, and its success closes the circuit
+    connection.hset(breaker.state_key, "open_until", 0)
+    assert breaker.allow_request(), "no probe after the backoff"
+    assert breaker._load()["state"] == CircuitState.HALF_OPEN.value
+    assert not breaker.allow_request(), "a second probe was allowed"
+    breaker.record_success(0.1)
+    assert breaker._load()["state"] == CircuitState.CLOSED.value, "successful probe did not close the circuit"
+    
+    # Slow calls trip it too
+    for _ in range(circuit_breaker.MIN_CALLS_IN_WINDOW):
+        breaker.record_success(circuit_breaker.SLOW_CALL_SECONDS + 1)
+    assert breaker._load()["state"] == CircuitState.OPEN.value, "slow calls did not open the circuit"
+    print("✅ Circuit breaker state machine works!")
+    return True
+
+
+def test_admission_rejects_when_overloaded():
+    """Test that admission control degrades, then refuses with a Retry-After, as the wait grows"""
+    print("\nTesting admission control...")
+    
+    import time
+    import fakeredis
+    from app.services import admission, circuit_breaker
+    from app.services.admission import AdmissionController, ADMIT, DEGRADE, REJECT
+    from app.constants.constants import AdmissionConstants, JobPriority
+    
+    connection = fakeredis.FakeRedis()
+    saved = circuit_breaker.redis_conn, dict(circuit_breaker._breakers)
+    circuit_breaker.redis_conn = connection
+    circuit_breaker._breakers.clear()
+    try:
+        controller = AdmissionController(connection)
+        assert controller.check(JobPriority.STANDARD.value).action == ADMIT, "idle service refused a deck"
+        
+        # One job ahead that takes longer than the degrade threshold: fast mode
+        connection.set(AdmissionConstants.JOB_SECONDS_KEY, admission.DEGRADE_WAIT_SECONDS + 1)
+        decision = controller.check(JobPriority.STANDARD.value)
+        assert decision.action == DEGRADE and decision.fast, f"expected fast mode, got {decision}"
+        
+        # Longer than the refusal threshold: 429 with a bounded Retry-After
+        connection.set(AdmissionConstants.JOB_SECONDS_KEY, admission.REJECT_WAIT_SECONDS + 60)
+        decision = controller.check(JobPriority.STANDARD.value)
+        assert decision.action == REJECT and decision.reason == "queue_wait", f"expected a refusal, got {decision}"
+        assert AdmissionConstants.MIN_RETRY_AFTER_SECONDS <= decision.retry_after <= AdmissionConstants.MAX_RETRY_AFTER_SECONDS
+        
+        # Every provider's circuit open: refused until the first one may be probed
+        connection.delete(AdmissionConstants.JOB_SECONDS_KEY)
+        for breaker in circuit_breaker.get_all_circuit_breakers().values():
+            breaker._open(time.time(), reason="down")
+        decision = controller.check(JobPriority.STANDARD.value)
+        assert decision.action == REJECT and decision.reason == "providers_unavailable", f"got {decision}"
+        assert decision.retry_after >= AdmissionConstants.MIN_RETRY_AFTER_SECONDS
+    finally:
+        circuit_breaker.redis_conn = saved[0]
+        circuit_breaker._breakers.clear()
+        circuit_breaker._breakers.update(saved[1])
+    print("✅ Admission control degrades and refuses under load!")
+    return True
+
+
+def _memory_db():
+    """A session on a fresh in-memory SQLite database with every table and the search index"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from app.database import Base
+    
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)()
+
+
+def test_slide_rows_match_slides_data():
+    """Test that the slides table reads back exactly what slides_data holds"""
+    print("\nTesting slides table consistency...")
+    
+    from app.models.presentation import Presentation
+    from app.services.slide_store import replace_slides, store_slide, get_slides, backfill_slides
+    
+    db = _memory_db()
+    slides_data = [
+        {"title": "Intro", "slide_type": "title", "content": ["Subtitle"], "notes": "Hello"},
+        {"title": "Points", "slide_type": "bullet_points", "content": ["One", "Two"], "font_size": 18},
+        {"title": "End", "slide_type": "bullet_points", "content": [], "reference": "Source"}
+    ]
+    db.add(Presentation(id="deck", topic="Topic", content="Content", slides_data=slides_data))
+    replace_slides(db, "deck", slides_data)
+    db.commit()
+    assert get_slides(db, "deck") == slides_data, "slide rows differ from slides_data"
+    assert get_slides(db, "deck", start=1, count=1) == slides_data[1:2], "slide range is wrong"
+    
+    # A single-slide update only rewrites its own row
+    edited = slides_data[:1] + [{"title": "Edited", "slide_type": "two_column", "content": ["L", "R"]}] + slides_data[2:]
+    store_slide(db, "deck", edited, 1)
+    db.commit()
+    assert get_slides(db, "deck") == edited, "single-slide update left the rows out of step"
+    
+    # Decks from before the table are read from slides_data, then backfilled once
+    db.add(Presentation(id="legacy", topic="Old", content="Content", slides_data=slides_data))
+    db.commit()
+    assert get_slides(db, "legacy") == slides_data, "legacy deck not read from slides_data"
+    assert backfill_slides(db, batch_size=1) == 1 and backfill_slides(db) == 0, "backfill is not idempotent"
+    assert get_slides(db, "legacy") == slides_data, "backfilled rows differ from slides_data"
+    assert get_slides(db, "missing") is None
+    print("✅ Slide rows match slides_data!")
+    return True
+
+
+def test_search_index():
+    """Test that search ranks topic matches first, matches slide text and forgets deleted decks"""
+    print("\nTesting full-text search...")
+    
+    from app.models.presentation import Presentation
+    from app.services.search_index import SearchIndex
+    
+    db = _memory_db()
+    index = SearchIndex(db)
+    decks = [
+        Presentation(id="topic", topic="Renewable energy", content="Policy overview",
+                     slides_data=[{"title": "Wind", "content": ["Turbines"]}]),
+        Presentation(id="slides", topic="Quarterly report", content="Numbers",
+                     slides_data=[{"title": "Energy costs", "content": ["Renewable contracts signed"]}]),
+        Presentation(id="other", topic="Team offsite", content="Agenda",
+                     slides_data=[{"title": "Schedule", "content": ["Hiking"]}])
+    ]
+    for presentation in decks:
+        db.add(presentation)
+        index.index(presentation)
+    db.commit()
+    
+    matches = [presentation_id for presentation_id, _ in index.search("renewable energy")]
+    assert matches == ["topic", "slides"], f"unexpected ranking: {matches}"
+    assert [presentation_id for presentation_id, _ in index.search("turb")] == ["topic"], "prefix search failed"
+    assert index.search("!!!") == [], "a query without words matched"
+    
+    # Reindexing replaces a deck's entry rather than adding another
+    decks[2].topic = "Renewable offsite"
+    index.index(decks[2])
+    index.remove(["slides"])
+    db.commit()
+    matches = [presentation_id for presentation_id, _ in index.search("renewable")]
+    assert sorted(matches) == ["other", "topic"], f"index not updated: {matches}"
+    print("✅ Full-text search works!")
+    return True
+
+
+def test_slide_patch_byte_identity():
+    """Test that patching one slide leaves every other part of the .pptx byte for byte as it was"""
+    print("\nTesting single-slide patch...")
+    
+    import io
+    import zipfile
+    from app.services.slide_patcher import SlidePatcher
+    from app.utils.theme_resolver import ThemeResolver
+    
+    slides_data = [
+        {"title": "Patch test", "slide_type": "title", "content": ["Subtitle"], "notes": "Intro"},
+        {"title": "Before", "slide_type": "bullet_points", "content": ["Old point"], "notes": "Old notes"},
+        {"title": "After", "slide_type": "bullet_points", "content": ["Unchanged"], "notes": "Keep"}
+    ]
+    edited = {"title": "Edited", "slide_type": "bullet_points", "content": ["New point"], "notes": "New notes"}
+    config = ThemeResolver.build_render_config({"theme": "corporate"})
+    storage = get_storage()
+    
+    def members(key):
+        with zipfile.ZipFile(io.BytesIO(storage.read_bytes(key))) as package:
+            return {name: package.read(name) for name in package.namelist()}
+    
+    key = PPTXCreator().create_presentation(slides_data, "Test Patch", config, presentation_id="patch-test")
+    before = members(key)
+    assert SlidePatcher().patch(key, slides_data, 1, edited, config), "slide was not patched in place"
+    after = members(key)
+    
+    changed = sorted(name for name in before if before[name] != after.get(name))
+    assert set(after) == set(before), "patching added or dropped package parts"
+    assert changed == ["ppt/notesSlides/notesSlide2.xml", "ppt/slides/slide2.xml"], f"unexpected changes: {changed}"
+    assert b"Edited" in after["ppt/slides/slide2.xml"] and b"New notes" in after["ppt/notesSlides/notesSlide2.xml"]
+    
+    # A structural change (another layout) needs a full render
+    assert not SlidePatcher().patch(key, slides_data, 1, dict(edited, slide_type="title"), config)
+    storage.delete(key)
+    print("✅ Patch rewrote only the edited slide!")
+    return True
+
+
+def test_sweeper_batches():
+    """Test that the sweeper expires old decks in bounded batches and resumes on the next run"""
+    print("\nTesting retention sweeper batching...")
+    
+    import shutil
+    import tempfile
+    from datetime import datetime, timedelta
+    import fakeredis
+    from app.models.presentation import Presentation
+    from app.services import response_cache
+    from app.services.artifact_sweeper import ArtifactSweeper
+    from app.services.storage import LocalStorage
+    from app.services.thumbnail_renderer import ThumbnailRenderer
+    from app.constants.constants import SweeperConstants
+    
+    db = _memory_db()
+    storage = LocalStorage(tempfile.mkdtemp())
+    old = datetime.utcnow() - timedelta(days=10)
+    for i in range(5):
+        storage.put_bytes(f"old-{i}.pptx", b"deck")
+        storage.put_bytes(ThumbnailRenderer.thumbnail_key(f"old-{i}", 0), b"<svg/>")
+        db.add(Presentation(id=f"old-{i}", topic="Old", content="c", file_path=f"old-{i}.pptx", updated_at=old))
+    storage.put_bytes("new.pptx", b"deck")
+    db.add(Presentation(id="new", topic="New", content="c", file_path="new.pptx"))
+    db.commit()
+    
+    saved = response_cache.redis_conn, SweeperConstants.MAX_BATCHES, SweeperConstants.BATCH_PAUSE_SECONDS
+    response_cache.redis_conn = fakeredis.FakeRedis()
+    SweeperConstants.MAX_BATCHES, SweeperConstants.BATCH_PAUSE_SECONDS = 2, 0
+    try:
+        sweeper = ArtifactSweeper(db, storage, retention_days=1, batch_size=2)
+        first = sweeper.sweep()
+        assert first["presentations_expired"] == 4 and first["truncated"], f"batch budget not applied: {first}"
+        assert first["batches"] == 2
+        second = sweeper.sweep()
+        assert second["presentations_expired"] == 1, f"next run did not resume: {second}"
+    finally:
+        response_cache.redis_conn = saved[0]
+        SweeperConstants.MAX_BATCHES, SweeperConstants.BATCH_PAUSE_SECONDS = saved[1], saved[2]
+    
+    assert [row.id for row in db.query(Presentation)] == ["new"], "wrong decks expired"
+    assert [stored.key for stored in storage.iter_objects()] == ["new.pptx"], "expired files were left behind"
+    shutil.rmtree(storage.root)
+    print("✅ Sweeper works in bounded batches!")
+    return True
+
+
+def test_sectioned_deck_continues():
+    """Test that a deck generated in sections has one title slide and no repeated slide titles"""
+    print("\nTesting sectioned deck generation...")
+    
+    import re
+    import json
+    import fakeredis
+    from app.services.llm_client import LLMClient, LLMProvider, Completion
+    from app.services.circuit_breaker import CircuitBreaker
+    from app.services.provider_router import ProviderRouter
+    from app.services.prompt_builder import PromptBuilder
+    
+    class ScriptedProvider(LLMProvider):
+        """Opens every answer with a title slide and numbers slides after the titles it was given"""
+        name = "scripted"
+        model = "scripted"
+        
+        def generate_completion(self, prompt, system_prompt, max_tokens=0, partial="", cancel_token=None):
+            count = int(re.search(r"Generate exactly (\d+) slides", prompt).group(1))
+            outline = prompt.split("Slides written so far:\n")[1].split("\n\n")[0] if "so far:" in prompt else ""
+            written = len(outline.splitlines())
+            slides = [{"title": "Welcome", "slide_type": "title", "content": ["Overview"]}]
+            slides += [{"title": f"Point {written + i}", "slide_type": "bullet_points", "content": ["Detail"],
+                        "reference": f"ref: {written + i}"} for i in range(1, count)]
+            return Completion(json.dumps(slides), finish_reason="stop")
+        
+        def is_available(self):
+            return True
+    
+    connection = fakeredis.FakeRedis()
+    client = LLMClient.__new__(LLMClient)
+    client.cancel_token = None
+    client.providers = [ScriptedProvider()]
+    client.active_provider = client.providers[0]
+    client.breakers = {"scripted": CircuitBreaker("scripted", connection)}
+    client.router = ProviderRouter(connection)
+    client.prompt_builder = PromptBuilder()
+    client.last_usage = None
+    
+    slides = client.generate_slide_content("Big deck", "Source material", 75)
+    titles = [slide["title"] for slide in slides]
+    assert len(slides) == 75, f"expected 75 slides, got {len(slides)}"
+    assert len(set(titles)) == len(titles), f"repeated titles: {sorted(t for t in titles if titles.count(t) > 1)}"
+    assert [slide["slide_type"] for slide in slides].count("title") == 1, "sections kept their title slides"
+    assert slides[0]["slide_type"] == "title" and titles[-1] == "References"
+    assert client.last_usage["sections"] == 4
+    print("✅ Sectioned deck continues across sections!")
+    return True
+
+
+def test_grouped_keys_are_sharded():
+    """Test that thumbnails and uploads are sharded by deck id and their orphans are still found"""
+    print("\nTesting sharded thumbnail and upload keys...")
+    
+    import shutil
+    import tempfile
+    import fakeredis
+    from app.models.presentation import Presentation
+    from app.services import response_cache
+    from app.services.artifact_sweeper import ArtifactSweeper
+    from app.services.document_ingestor import upload_key
+    from app.services.storage import LocalStorage
+    from app.services.thumbnail_renderer import ThumbnailRenderer
+    
+    db = _memory_db()
+    storage = LocalStorage(tempfile.mkdtemp())
+    renderer = ThumbnailRenderer(storage)
+    slides = [{"title": "One", "slide_type": "title", "content": []}, {"title": "Two", "content": ["Point"]}]
+    for presentation_id in ("live", "gone"):
+        renderer.write_thumbnails(presentation_id, slides)
+        storage.put_bytes(upload_key(presentation_id), b"source")
+    storage.put_bytes("thumbnails/legacy/slide_0.svg", b"<svg/>")
+    db.add(Presentation(id="live", topic="Live", content="c", status="pending"))
+    db.commit()
+    
+    # Only the shard directories sit directly under thumbnails/ and uploads/
+    for group in ("thumbnails", "uploads"):
+        names = [name for name in os.listdir(os.path.join(storage.root, group)) if name != "legacy"]
+        assert names and all(LocalStorage._is_shard(name) for name in names), f"{group}/ is not sharded: {names}"
+    assert ThumbnailRenderer.slide_count("live", storage) == 2, "a deck's thumbnails are not listed together"
+    
+    saved = response_cache.redis_conn
+    response_cache.redis_conn = fakeredis.FakeRedis()
+    try:
+        for stored in storage.iter_objects("thumbnails/"):
+            os.utime(storage.path(stored.key), (0, 0))
+        for stored in storage.iter_objects("uploads/"):
+            os.utime(storage.path(stored.key), (0, 0))
+        report = ArtifactSweeper(db, storage).sweep()
+    finally:
+        response_cache.redis_conn = saved
+    
+    assert report["thumbnails_deleted"] == 3 and report["uploads_deleted"] == 1, f"orphans missed: {report}"
+    remaining = sorted(stored.key for stored in storage.iter_objects("thumbnails/")) + [
+        stored.key for stored in storage.iter_objects("uploads/")]
+    assert remaining == [ThumbnailRenderer.thumbnail_key("live", 0), ThumbnailRenderer.thumbnail_key("live", 1),
+                         upload_key("live")], f"live deck's objects were swept: {remaining}"
+    shutil.rmtree(storage.root)
+    print("✅ Thumbnails and uploads are sharded!")
+    return True
+
+
+def test_router_stats_under_concurrency():
+    """Test that concurrent provider calls are all counted in the routing stats"""
+    print("\nTesting provider routing stats...")
+    
+    import threading
+    import fakeredis
+    from app.services.provider_router import ProviderRouter, _stats_key
+    
+    connection = fakeredis.FakeRedis()
+    router = ProviderRouter(connection)
+    threads = [
+        threading.Thread(target=lambda: [router.record("openai", "gpt", 2.0, 100, success=True) for _ in range(25)])
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    stats = {field.decode(): float(value) for field, value in connection.hgetall(_stats_key("openai", "gpt")).items()}
+    assert stats["calls"] == 200, f"lost calls: {stats['calls']}"
+    assert stats["tokens_per_second"] == 50.0 and stats["error_rate"] == 0.0, stats
+    print("✅ Routing stats count every call!")
+    return True
+
+
 def main():
     """Run all tests"""
     print("🧪 Running Slide Generator Tests\n")
@@ -89,7 +682,13 @@ def main():
         slides = test_llm_fallback()
         
         # Test PowerPoint creation
-        success = test_pptx_creation()
+        success = (test_pptx_creation() and test_fast_renderer_equivalence() and test_s3_storage()
+                   and test_cancellation_aborts_provider_stream() and test_idempotency_replay_and_conflict()
+                   and test_circuit_breaker_state_machine() and test_admission_rejects_when_overloaded()
+                   and test_slide_rows_match_slides_data() and test_search_index()
+                   and test_slide_patch_byte_identity() and test_sweeper_batches()
+                   and test_sectioned_deck_continues() and test_grouped_keys_are_sharded()
+                   and test_router_stats_under_concurrency())
         
         if success:
             print("\n✅ All tests passed! The application is working correctly.")
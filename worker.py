@@ -10,25 +10,35 @@ import sys
 # Fix for macOS forking issue with Objective-C runtime
 os.environ['OBJC_DISABLE_INITIALIZE_FORK_SAFETY'] = 'YES'
 
-from rq import Worker
 from app.task_queue import redis_conn
+from app.workers.tasks import schedule_sweeper
+from app.workers.fair_worker import FairWorker
+from app.constants.constants import WorkerResourceConstants
 
-if __name__ == "__main__":
+def create_worker():
     # Create worker with fork safety disabled for macOS
-    worker = Worker(
-        ["presentations"], 
+    # Listens on every priority class and tenant queue, weighted so bulk work never starves interactive work
+    return FairWorker(
         connection=redis_conn,
         # Use spawn instead of fork on macOS to avoid Objective-C issues
         # job_timeout='15m',  # 15 minute timeout for long-running tasks
         # result_ttl=86400,   # Keep results for 24 hours
     )
+
+if __name__ == "__main__":
+    if schedule_sweeper():
+        print("Scheduled the retention sweeper")
     
     print("Starting presentation worker...")
-    print("Listening for jobs on 'presentations' queue")
+    print("Listening for jobs on the interactive, standard and bulk queues")
     print("Press Ctrl+C to stop")
     
     try:
+        worker = create_worker()
         worker.work(with_scheduler=True)
     except KeyboardInterrupt:
         print("\nWorker stopped by user")
-        sys.exit(0) 
\ No newline at end of file
+        sys.exit(0)
+    # Past the soft memory limit: exit so the parent starts a fresh process
+    if worker.recycled:
+        sys.exit(WorkerResourceConstants.RECYCLE_EXIT_CODE)
\ No newline at end of file
@@ -15,19 +15,25 @@ if sys.platform == 'darwin':  # macOS
 # Fix for macOS forking issue with Objective-C runtime
 os.environ['OBJC_DISABLE_INITIALIZE_FORK_SAFETY'] = 'YES'
 
-from rq import Worker
 from app.task_queue import redis_conn
+from app.workers.tasks import schedule_sweeper
+from app.workers.fair_worker import FairWorker
+from app.constants.constants import WorkerResourceConstants
 
 def run_worker():
     """Run the worker in a separate process"""
-    worker = Worker(
-        ["presentations"],
+    worker = FairWorker(
         connection=redis_conn,
         # job_timeout='15m',
         # result_ttl=86400,
     )
+    if schedule_sweeper():
+        print("Scheduled the retention sweeper")
     print(f"Worker {os.getpid()} started...")
     worker.work(with_scheduler=True)
+    # Past the soft memory limit: exit so a fresh process takes over
+    if worker.recycled:
+        sys.exit(WorkerResourceConstants.RECYCLE_EXIT_CODE)
 
 if __name__ == "__main__":
     print("Starting safe presentation worker for macOS...")
@@ -36,9 +42,12 @@ if __name__ == "__main__":
     
     try:
         # Run worker in a separate process
-        worker_process = multiprocessing.Process(target=run_worker)
-        worker_process.start()
-        worker_process.join()
+        while True:
+            worker_process = multiprocessing.Process(target=run_worker)
+            worker_process.start()
+            worker_process.join()
+            if worker_process.exitcode != WorkerResourceConstants.RECYCLE_EXIT_CODE:
+                break
     except KeyboardInterrupt:
         print("\nStopping worker...")
         if 'worker_process' in locals():